@@ -0,0 +1,432 @@
+import io
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import closing, redirect_stdout
+from datetime import datetime, timezone
+
+import main
+
+# versions used in the synthetic issue bodies
+VERSIONS = [f'{major}.{minor}.{patch}' for major in (9, 10, 11, 12) for minor in range(0, 7) for patch in range(0, 12)]
+# what went wrong, one per issue in turn, so phrase and multi-word searches have matches
+SYMPTOMS = [
+    'Dashboard fails to load',
+    'Panel shows no data',
+    'Alert rule is stuck in pending',
+    'Query editor crashes the browser tab',
+    'Legend overlaps the graph',
+]
+
+def make_issue_body(rng, index):
+    """
+    Make a synthetic issue body with one of the `Grafana:` variants seen in real issues:
+    the old template line, the issue form heading, `v` prefixes, security suffixes, free text or no version at all.
+    """
+    version = rng.choice(VERSIONS)
+    kind = rng.random()
+    if kind < 0.35:
+        version_text = f'- Grafana: {version}\n'
+    elif kind < 0.45:
+        version_text = f'- Grafana Version: v{version}\n'
+    elif kind < 0.50:
+        version_text = f'**Grafana version:** {version}+security-01\n'
+    elif kind < 0.75:
+        version_text = f'### Grafana version\n\n{version}\n\n'
+    elif kind < 0.85:
+        version_text = f'- Grafana: {rng.choice(["latest", "main", "cloud", "the one from last week"])}\n'
+    elif kind < 0.90:
+        version_text = '### Grafana version\n\n_No response_\n\n'
+    else:
+        version_text = ''
+
+    words = ['panel', 'dashboard', 'query', 'datasource', 'alert', 'legend', 'variable', 'crash', 'timeout', 'render']
+    text = ' '.join(rng.choice(words) for _ in range(rng.randint(20, 200)))
+    return (
+        f'### What happened?\n\n{SYMPTOMS[index % len(SYMPTOMS)]} after the upgrade. {text}\n\n'
+        f'### What did you expect to happen?\n\nIssue {index} should not happen, it worked in 1.2.3\n\n'
+        f'{version_text}'
+        f'### Operating system\n\nLinux 5.15.0\n\n'
+        f'### Browser\n\nChrome {rng.randint(100, 130)}.0.0\n'
+    )
+
+def generate_issue_pages(size, seed=0, page_size=1000):
+    """
+    Generate synthetic bug issues in pages, in the shape fetch_github_issues yields them,
+    so large corpora never have to be held in memory at once.
+    """
+    rng = random.Random(seed)
+    page = []
+    for index in range(size):
+        page.append({
+            'url': f'https://github.com/grafana/grafana/issues/{index + 1}',
+            'title': f'Bug {rng.randint(0, size)} in {rng.choice(["panel", "dashboard", "alerting", "explore"])}',
+            'body': make_issue_body(rng, index),
+            'state': rng.choice(['OPEN', 'CLOSED']),
+            'updatedAt': f'2026-{rng.randint(1, 9):02d}-{rng.randint(1, 28):02d}T00:00:00Z',
+        })
+        if len(page) == page_size:
+            yield page
+            page = []
+    if page:
+        yield page
+
+def make_issues(size, seed=0):
+    """
+    Make a list of synthetic bug issues in the shape fetch_github_issues returns them.
+    """
+    return [issue for page in generate_issue_pages(size, seed) for issue in page]
+
+def benchmark_extract(size, workers):
+    """
+    Measure found_in extraction in bodies per second, in this process and through find_grafana_version's process pool.
+    """
+    issues = make_issues(size)
+    bodies = [issue['body'] for issue in issues]
+
+    start = time.perf_counter()
+    for body in bodies:
+        main.extract_found_in(body)
+    elapsed = time.perf_counter() - start
+    print(f'extract_found_in: {size} bodies in {elapsed:.2f}s ({size / elapsed:,.0f} bodies/s)')
+
+    # find_grafana_version works on the issue store, so run it in a temporary directory
+    cwd = os.getcwd()
+    directory = tempfile.mkdtemp()
+    try:
+        os.chdir(directory)
+        main.update_issues_json_with_new_issues([issues])
+        for pool_workers in sorted({1, workers}):
+            start = time.perf_counter()
+            main.find_grafana_version(workers=pool_workers)
+            elapsed = time.perf_counter() - start
+            print(f'find_grafana_version ({pool_workers} workers): {size} bodies in {elapsed:.2f}s ({size / elapsed:,.0f} bodies/s)')
+        with closing(main.open_issue_store()) as store:
+            found = store.execute('SELECT COUNT(*) FROM issues WHERE found_in IS NOT NULL').fetchone()[0]
+        print(f'found_in extracted for {found}/{size} issues')
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(directory)
+
+def make_release_tags(size, seed=0):
+    """
+    Make a list of synthetic release tags like the ones of grafana/grafana, including security and preview releases.
+    """
+    rng = random.Random(seed)
+    tags = []
+    major = 1
+    while len(tags) < size:
+        for minor in range(rng.randint(1, 12)):
+            for patch in range(rng.randint(1, 20)):
+                tags.append(f'v{major}.{minor}.{patch}')
+                if rng.random() < 0.2:
+                    tags.append(f'v{major}.{minor}.{patch}+security-0{rng.randint(1, 3)}')
+                if patch == 0 and rng.random() < 0.3:
+                    tags.append(f'v{major}.{minor}.{patch}-preview')
+        major += 1
+    tags = tags[:size]
+    rng.shuffle(tags)
+    return tags
+
+def benchmark_releases(size):
+    """
+    Measure prior-release lookups for every release with the release index against the linear get_prior_release.
+    """
+    releases = sorted(make_release_tags(size), key=main.parse_version_for_sorting, reverse=True)
+
+    start = time.perf_counter()
+    release_index = main.build_release_index(releases)
+    indexed = [main.find_prior_release(release, release_index) for release in releases]
+    elapsed = time.perf_counter() - start
+    print(f'find_prior_release: {size} releases in {elapsed * 1000:.1f}ms (index build included)')
+
+    # the linear scan is quadratic, so only time a sample of the releases and extrapolate
+    sample = releases[::max(1, size // 500)]
+    start = time.perf_counter()
+    linear = {release: main.get_prior_release(release, releases) for release in sample}
+    elapsed = (time.perf_counter() - start) * size / len(sample)
+    print(f'get_prior_release: {size} releases in ~{elapsed * 1000:.1f}ms (extrapolated from {len(sample)} releases)')
+
+    mismatches = [release for release, prior in zip(releases, indexed) if release in linear and linear[release] != prior]
+    print(f'mismatches: {len(mismatches)}')
+
+def benchmark_reports(size):
+    """
+    Measure writing the open, closed and all reports with one create_report_md call each against a single
+    render_reports pass, and check that both write the same bytes.
+    """
+    cwd = os.getcwd()
+    workdir = tempfile.mkdtemp()
+    try:
+        os.chdir(workdir)
+        with redirect_stdout(io.StringIO()):
+            prepare_synthetic_workdir(size)
+            main.find_grafana_version()
+        aggregate = main.build_issue_aggregate()
+
+        start = time.perf_counter()
+        for view in main.REPORT_VIEWS:
+            main.create_report_md(view['showClosed'], view['showOpen'], view['filename'], aggregate)
+        elapsed = time.perf_counter() - start
+        print(f'create_report_md: {len(main.REPORT_VIEWS)} reports of {size} issues in {elapsed:.3f}s')
+        expected = {}
+        for view in main.REPORT_VIEWS:
+            with open(f'reports/{view["filename"]}', 'rb') as file:
+                expected[view['filename']] = file.read()
+
+        start = time.perf_counter()
+        main.render_reports(aggregate)
+        elapsed = time.perf_counter() - start
+        print(f'render_reports: {len(main.REPORT_VIEWS)} reports of {size} issues in {elapsed:.3f}s')
+
+        # a run without changes copies every section from the previous reports and leaves the files alone
+        start = time.perf_counter()
+        main.render_reports(aggregate)
+        elapsed = time.perf_counter() - start
+        print(f'render_reports: {len(main.REPORT_VIEWS)} unchanged reports of {size} issues in {elapsed:.3f}s')
+
+        mismatches = []
+        for view in main.REPORT_VIEWS:
+            with open(f'reports/{view["filename"]}', 'rb') as file:
+                if file.read() != expected[view['filename']]:
+                    mismatches.append(view['filename'])
+        print(f'mismatches: {mismatches or 0}')
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir)
+
+def benchmark_snapshot(size):
+    """
+    Measure building the aggregate of the stats and reports from the issue store against building it from
+    the memory-mapped snapshot, and check that both give the same aggregate.
+    """
+    cwd = os.getcwd()
+    workdir = tempfile.mkdtemp()
+    try:
+        os.chdir(workdir)
+        with redirect_stdout(io.StringIO()):
+            prepare_synthetic_workdir(size)
+            main.find_grafana_version()
+
+        start = time.perf_counter()
+        expected = main.build_issue_aggregate()
+        elapsed = time.perf_counter() - start
+        print(f'issue store: aggregate of {size} issues in {elapsed:.3f}s ({os.path.getsize(main.ISSUE_STORE) / 1024 / 1024:.1f} MiB)')
+
+        start = time.perf_counter()
+        main.write_issue_snapshot()
+        elapsed = time.perf_counter() - start
+        print(f'write_issue_snapshot: {size} issues in {elapsed:.3f}s ({os.path.getsize(main.ISSUE_SNAPSHOT) / 1024 / 1024:.1f} MiB)')
+
+        start = time.perf_counter()
+        snapshot = main.read_current_issue_snapshot()
+        loaded = time.perf_counter() - start
+        aggregate = main.build_issue_aggregate(snapshot)
+        elapsed = time.perf_counter() - start
+        main.close_issue_snapshot(snapshot)
+        print(f'snapshot: mapped in {loaded * 1000:.1f}ms, aggregate of {size} issues in {elapsed:.3f}s')
+        print(f'mismatches: {0 if aggregate == expected else 1}')
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir)
+
+def benchmark_search(size, queries=('panel', '"panel shows no data"', 'linux crashes', '"stuck in pending" alert', 'nothingmatches')):
+    """
+    Measure building the full-text index of a synthetic corpus and searching it, with and without filters.
+    """
+    cwd = os.getcwd()
+    workdir = tempfile.mkdtemp()
+    try:
+        os.chdir(workdir)
+        start = time.perf_counter()
+        with redirect_stdout(io.StringIO()):
+            prepare_synthetic_workdir(size)
+            main.find_grafana_version()
+        elapsed = time.perf_counter() - start
+        print(f'corpus of {size} issues stored and indexed in {elapsed:.2f}s')
+
+        filters = [{}, {'state': 'open'}, {'major_minor': '11.4'}, {'found_in': '12.0.1', 'state': 'closed'}]
+        for query in queries:
+            for options in filters:
+                timings = []
+                for _ in range(5):
+                    start = time.perf_counter()
+                    results = main.search_issues(query, **options)
+                    timings.append(time.perf_counter() - start)
+                print(f'search {query} {options or ""}: {len(results)} results in {min(timings) * 1000:.2f}ms')
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir)
+
+def benchmark_replay(directory, latency):
+    """
+    Time the network-bound stages end to end against a recording made with `python main.py --no-cache --record=DIR`,
+    every response is served from the recording after `latency` milliseconds. The stages run with the options and
+    from the caches and issue store the recorded run started from, so they make the same requests.
+    """
+    directory = os.path.abspath(directory)
+    state = os.path.join(directory, 'initial-state')
+    options = []
+    if os.path.exists(os.path.join(state, 'options.json')):
+        with open(os.path.join(state, 'options.json')) as file:
+            options = json.load(file)
+    sys.argv = [sys.argv[0]] + options + ['--no-cache', f'--replay={directory}', f'--replay-latency={latency}']
+    main._github_session = None
+
+    cwd = os.getcwd()
+    workdir = tempfile.mkdtemp()
+    try:
+        os.chdir(workdir)
+        os.makedirs('reports')
+        # start from the caches the recorded run started from
+        for filename in main.RECORDED_STATE_FILES + [main.ISSUE_STORE]:
+            path = os.path.join(state, filename)
+            if os.path.exists(path):
+                shutil.copy(path, filename)
+
+        stage_names = ['fetch', 'fixed-in', 'extract', 'tags', 'releases']
+        main._run_metrics['stages'].clear()
+        main.run_repository_pipeline(stage_names)
+        for name in stage_names:
+            print(f'{name}: {main._run_metrics["stages"].get(name, 0):.2f}s')
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir)
+
+def prepare_synthetic_workdir(size, seed=0):
+    """
+    Fill the issue store of the current directory with a synthetic corpus, as if fetch_github_issues and
+    find_fixed_in_version had run, and add the tags and cached commit counts so review_release_info needs no network.
+    """
+    os.makedirs('reports', exist_ok=True)
+    main.update_issues_json_with_new_issues(generate_issue_pages(size, seed))
+
+    rng = random.Random(seed)
+    with closing(main.open_issue_store()) as store:
+        with store:
+            closed = [row['url'] for row in store.execute("SELECT url FROM issues WHERE state = 'CLOSED'")]
+            store.executemany('UPDATE issues SET fixed_in = ? WHERE url = ?', [
+                (rng.choice(VERSIONS) if rng.random() < 0.6 else None, url) for url in closed
+            ])
+
+    tags = sorted({f'v{version}' for version in VERSIONS}, key=main.parse_version_for_sorting, reverse=True)
+    with open('tags.json', 'w') as file:
+        json.dump({'complete': True, 'tags': tags, 'dates': {}}, file)
+    release_index = main.build_release_index(tags)
+    commit_counts = {}
+    for tag in tags:
+        prior = main.find_prior_release(tag, release_index)
+        if prior:
+            main.store_commit_count(commit_counts, tag, prior, rng.randint(10, 2000))
+    main.write_commit_counts_cache(commit_counts)
+
+def measure(function):
+    """
+    Run a function and return its result, wall time in seconds and peak traced memory in bytes.
+    Memory used by worker processes is not included.
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        result = function()
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return result, elapsed, peak
+
+def get_git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def benchmark_stages(sizes, output):
+    """
+    Time find_grafana_version, organize_issues_by_version, log_stats, create_report_md and review_release_info
+    separately on synthetic corpora of the given sizes, and append wall time and peak memory per stage to `output`.
+    """
+    commit = get_git_commit()
+    run_at = datetime.now(timezone.utc).isoformat()
+    results = []
+    cwd = os.getcwd()
+    for size in sizes:
+        workdir = tempfile.mkdtemp()
+        try:
+            os.chdir(workdir)
+            _, elapsed, _ = measure(lambda: prepare_synthetic_workdir(size))
+            print(f'{size} issues: corpus generated in {elapsed:.2f}s')
+
+            aggregate = None
+            stages = [
+                ('find_grafana_version', lambda: main.find_grafana_version()),
+                ('organize_issues_by_version', lambda: main.organize_issues_by_version()),
+                ('log_stats', lambda: main.log_stats(aggregate)),
+                ('create_report_md', lambda: [
+                    main.create_report_md(view['showClosed'], view['showOpen'], view['filename'], aggregate) for view in main.REPORT_VIEWS
+                ]),
+                ('review_release_info', lambda: main.review_release_info(aggregate)),
+            ]
+            for name, stage in stages:
+                # the stages print their results, keep the benchmark output readable
+                with redirect_stdout(io.StringIO()):
+                    result, elapsed, peak = measure(stage)
+                    if name == 'organize_issues_by_version':
+                        # the later stages take the aggregate like the pipeline passes it, building it is not part of them
+                        aggregate = main.build_issue_aggregate()
+                print(f'{size} issues: {name} {elapsed:.3f}s, peak {peak / 1024 / 1024:.1f} MiB')
+                results.append({
+                    'commit': commit,
+                    'run_at': run_at,
+                    'size': size,
+                    'stage': name,
+                    'wall_seconds': round(elapsed, 6),
+                    'peak_memory_bytes': peak,
+                })
+        finally:
+            os.chdir(cwd)
+            shutil.rmtree(workdir)
+
+    # keep the results of earlier runs, so regressions between commits show up
+    previous = []
+    if os.path.exists(output):
+        with open(output, 'r') as file:
+            previous = json.load(file)
+    with open(output, 'w') as file:
+        json.dump(previous + results, file, indent=4)
+    print(f'Results written to {output}')
+
+if __name__ == '__main__':
+    command = sys.argv[1] if len(sys.argv) > 1 else ''
+    if command == 'extract':
+        # parallel extraction only kicks in above PARALLEL_EXTRACT_MIN_ISSUES
+        main.PARALLEL_EXTRACT_MIN_ISSUES = 0
+        benchmark_extract(int(main.get_cli_option('--size', 200000)), int(main.get_cli_option('--extract-workers', os.cpu_count() or 1)))
+    elif command == 'stages':
+        sizes = [int(size) for size in main.get_cli_option('--sizes', '1000,10000,100000,1000000').split(',')]
+        benchmark_stages(sizes, main.get_cli_option('--output', 'benchmark_results.json'))
+    elif command == 'reports':
+        benchmark_reports(int(main.get_cli_option('--size', 100000)))
+    elif command == 'snapshot':
+        benchmark_snapshot(int(main.get_cli_option('--size', 100000)))
+    elif command == 'search':
+        benchmark_search(int(main.get_cli_option('--size', 100000)))
+    elif command == 'replay':
+        benchmark_replay(main.get_cli_option('--replay'), float(main.get_cli_option('--replay-latency', 0)))
+    elif command == 'releases':
+        benchmark_releases(int(main.get_cli_option('--size', 10000)))
+    else:
+        print('Usage: python benchmark.py extract [--size=N] [--extract-workers=N]')
+        print('       python benchmark.py releases [--size=N]')
+        print('       python benchmark.py reports [--size=N]')
+        print('       python benchmark.py snapshot [--size=N]')
+        print('       python benchmark.py search [--size=N]')
+        print('       python benchmark.py stages [--sizes=1000,10000,100000,1000000] [--output=benchmark_results.json]')
+        print('       python benchmark.py replay --replay=DIR [--replay-latency=MS]')
@@ -1,16 +1,622 @@
+import bisect
+import hashlib
 import requests
 import os
 import json
+import math
+import mmap
+import multiprocessing
+import random
 import re
+import shutil
 import sys
 import json
-from datetime import datetime
+import sqlite3
+import subprocess
+import threading
+import time
+import uuid
+from contextlib import ExitStack, closing, contextmanager
+from array import array
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta, timezone
+
+# SQLite database holding the fetched issues and the results of every stage
+ISSUE_STORE = 'issues.db'
+# compact copy of what the stats and reports are built from, without the issue bodies (see write_issue_snapshot)
+ISSUE_SNAPSHOT = 'issues.snapshot'
+ISSUE_SNAPSHOT_MAGIC = b'GKISNAP1'
+
+# the repository the report is made for, every repository of --repos=FILE sets its own
+GITHUB_OWNER = 'grafana'
+GITHUB_REPOSITORY = 'grafana'
+# release tags are this prefix and the version, repositories of --repos=FILE set their own `tag_prefix`
+DEFAULT_TAG_PREFIX = 'v'
+TAG_PREFIX = DEFAULT_TAG_PREFIX
+
+# default number of concurrent GitHub requests, override with --concurrency=N or GH_CONCURRENCY
+DEFAULT_CONCURRENCY = 8
+# number of issues resolved per batched GraphQL request, override with --batch-size=N
+DEFAULT_FIXED_IN_BATCH_SIZE = 50
+# a tags.json checked less than this many seconds ago is not checked again
+TAGS_RECHECK_SECONDS = 3600
+# pages of 100 tags the full tag history is expected to take
+TAG_HISTORY_PAGES = 20
+# number of issue bodies sent to a worker process at a time when extracting found_in versions
+EXTRACT_CHUNK_SIZE = 1000
+# below this many issues found_in versions are extracted in this process, starting worker processes costs more
+PARALLEL_EXTRACT_MIN_ISSUES = 20000
+# caches that decide which requests a run makes, saved with a --record recording
+RECORDED_STATE_FILES = ['tags.json', 'commit_counts.json']
+# how many days a linked PR or milestone looked up for the fixed-in version is trusted, override with --memo-ttl=DAYS.
+# Lookups that found no link or no milestone are trusted for a shorter time, override with --memo-negative-ttl=DAYS
+MEMO_TTL_DAYS = 90
+MEMO_NEGATIVE_TTL_DAYS = 21
+# the memo keeps at most this many links and milestones each, the least recently checked are evicted first
+MEMO_MAX_ENTRIES = 200000
+# relative accuracy of the time-to-close and time-to-fix quantiles, a sketch bucket holds durations within 2% of each other
+SKETCH_RELATIVE_ACCURACY = 0.02
+SKETCH_GAMMA = (1 + SKETCH_RELATIVE_ACCURACY) / (1 - SKETCH_RELATIVE_ACCURACY)
+# durations up to a minute share the first bucket
+SKETCH_MIN_SECONDS = 60
+# upper bound of pages fetched by an incremental run, it normally only needs one or two
+MAX_INCREMENTAL_PAGES = 100
+# the markdown reports written to reports/ by every run
+REPORT_VIEWS = [
+    {'filename': 'open_report.md', 'showClosed': False, 'showOpen': True},
+    {'filename': 'closed_report.md', 'showClosed': True, 'showOpen': False},
+    {'filename': 'all_report.md', 'showClosed': True, 'showOpen': True},
+]
+# write buffer of each report file
+REPORT_BUFFER_SIZE = 1024 * 1024
+# where every version section is in each report file and the hash of what it was rendered from, from the previous run
+REPORT_MANIFEST = 'report_manifest.json'
+# the generated date of stats.txt and the reports, a report is not rewritten when nothing else changed
+REPORT_DATE_PATTERN = re.compile(rb'^(?:## )?Date: \d{4}-\d{2}-\d{2}\r?\n?$')
+
+# prefix of the metric names in the Prometheus textfile
+METRICS_PREFIX = 'grafana_known_issues'
+# a failed GitHub request is retried this many times, waiting RETRY_BASE_DELAY * 2^attempt seconds (with jitter, at most
+# RETRY_MAX_DELAY) unless GitHub says how long to wait, override with --max-retries=N
+DEFAULT_MAX_RETRIES = 5
+RETRY_BASE_DELAY = 1
+RETRY_MAX_DELAY = 60
+# responses worth retrying, 403 only counts when it is a rate limit
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+# requests wait for the rate limit to reset rather than spend the last few points of it
+RATE_LIMIT_RESERVE = 50
+
+_github_session = None
+_github_session_lock = threading.Lock()
+
+# what the current run did, written to metrics.json and metrics.prom when it ends
+_run_metrics = {
+    'stages': {},
+    'api_calls': {},
+    'errors': {},
+    'retries': {},
+    'rate_limit_points': 0,
+    'rate_limit_remaining': {},
+    'issues_processed': {},
+}
+_run_metrics_lock = threading.Lock()
+
+# remaining rate limit and reset time (unix time) per api ('graphql' or 'rest'), as last reported by GitHub
+_rate_budget = {}
+_rate_budget_lock = threading.Lock()
+
+def get_report_title():
+    return f'{GITHUB_REPOSITORY.capitalize()} Bug Report'
+
+def get_cli_option(name, default=None):
+    """
+    Get the value of a command line option passed as `--name=value` or `--name value`.
+    Returns default if the option is not present.
+    """
+    for index, arg in enumerate(sys.argv):
+        if arg.startswith(f'{name}='):
+            return arg.split('=', 1)[1]
+        if arg == name and index + 1 < len(sys.argv):
+            return sys.argv[index + 1]
+    return default
+
+def get_concurrency():
+    return int(get_cli_option('--concurrency', os.environ.get('GH_CONCURRENCY', DEFAULT_CONCURRENCY)))
+
+def get_recording_path(directory, request):
+    """
+    Get the file a response is recorded in, keyed by the method, url and body of the request.
+    Authorization headers are not part of the key, so a recording can be replayed without a token.
+    """
+    body = request.body or b''
+    if isinstance(body, str):
+        body = body.encode('utf-8')
+    key = hashlib.sha256(request.method.encode('utf-8') + b' ' + request.url.encode('utf-8') + b'\n' + body).hexdigest()
+    return os.path.join(directory, f'{key}.json')
+
+class RecordingAdapter(requests.adapters.HTTPAdapter):
+    """
+    Transport adapter that sends requests to GitHub and records every response in a directory (--record=DIR).
+    """
+    def __init__(self, directory, **kwargs):
+        super().__init__(**kwargs)
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        # keep the caches and options the run starts from, so a replay can start from the same state and make the same requests
+        state = os.path.join(directory, 'initial-state')
+        os.makedirs(state, exist_ok=True)
+        for filename in RECORDED_STATE_FILES:
+            if os.path.exists(filename):
+                shutil.copy(filename, os.path.join(state, filename))
+        if os.path.exists(ISSUE_STORE):
+            # the store holds the high-water mark, the fixed-in memo and the issues left to look up, copy it as of now
+            with closing(sqlite3.connect(ISSUE_STORE, timeout=60)) as store, closing(sqlite3.connect(os.path.join(state, ISSUE_STORE))) as copy:
+                store.backup(copy)
+        options = [arg for index, arg in enumerate(sys.argv[1:]) if not arg.startswith('--record') and sys.argv[index] != '--record']
+        with open(os.path.join(state, 'options.json'), 'w') as file:
+            json.dump(options, file)
+
+    def send(self, request, **kwargs):
+        response = super().send(request, **kwargs)
+        body = request.body or b''
+        recording = {
+            'method': request.method,
+            'url': request.url,
+            'request': body.decode('utf-8') if isinstance(body, bytes) else body,
+            'status': response.status_code,
+            'reason': response.reason,
+            'headers': dict(response.headers),
+            'body': response.content.decode('utf-8', errors='replace'),
+        }
+        with open(get_recording_path(self.directory, request), 'w') as file:
+            json.dump(recording, file, indent=4)
+        return response
+
+class ReplayAdapter(requests.adapters.BaseAdapter):
+    """
+    Transport adapter that answers requests from a directory recorded with --record=DIR (--replay=DIR),
+    after waiting `latency` seconds to stand in for the network.
+    """
+    def __init__(self, directory, latency=0):
+        super().__init__()
+        self.directory = directory
+        self.latency = latency
+
+    def send(self, request, **kwargs):
+        path = get_recording_path(self.directory, request)
+        if not os.path.exists(path):
+            raise requests.exceptions.ConnectionError(f'No recorded response for {request.method} {request.url}', request=request)
+        with open(path, 'r') as file:
+            recording = json.load(file)
+        if self.latency:
+            time.sleep(self.latency)
+
+        response = requests.Response()
+        response.status_code = recording['status']
+        response.headers = requests.structures.CaseInsensitiveDict(recording['headers'])
+        # the recorded body is already decoded
+        response.headers.pop('Content-Encoding', None)
+        response._content = recording['body'].encode('utf-8')
+        response.encoding = 'utf-8'
+        response.url = recording['url']
+        response.request = request
+        response.reason = recording.get('reason', '')
+        return response
+
+    def close(self):
+        pass
+
+def get_github_session():
+    """
+    Return the shared requests.Session used for every GitHub API call.
+    The connection pool is sized to the concurrency limit so worker threads reuse keep-alive connections.
+    """
+    global _github_session
+    with _github_session_lock:
+        if _github_session is None:
+            session = requests.Session()
+            pool_size = max(get_concurrency(), 1)
+            if get_cli_option('--replay'):
+                # serve recorded responses instead of talking to GitHub
+                adapter = ReplayAdapter(get_cli_option('--replay'), float(get_cli_option('--replay-latency', 0)) / 1000)
+            elif get_cli_option('--record'):
+                adapter = RecordingAdapter(get_cli_option('--record'), pool_connections=1, pool_maxsize=pool_size)
+            else:
+                adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+            session.mount('https://', adapter)
+            _github_session = session
+    return _github_session
+
+def record_api_call(function, api, response=None, cost=0, failed=False):
+    """
+    Count one GitHub API call made by `function`, `api` is 'graphql' or 'rest'.
+    `cost` is the GraphQL rateLimit cost of the call, the remaining budget is read from the response headers.
+    """
+    with _run_metrics_lock:
+        calls = _run_metrics['api_calls'].setdefault(function, {})
+        calls[api] = calls.get(api, 0) + 1
+        _run_metrics['rate_limit_points'] += cost
+        if failed:
+            _run_metrics['errors'][function] = _run_metrics['errors'].get(function, 0) + 1
+        remaining = response.headers.get('X-RateLimit-Remaining') if response is not None else None
+        if remaining is not None:
+            # concurrent responses arrive out of order, keep the lowest remaining budget seen
+            previous = _run_metrics['rate_limit_remaining'].get(api)
+            _run_metrics['rate_limit_remaining'][api] = int(remaining) if previous is None else min(previous, int(remaining))
+
+def record_retry(function):
+    with _run_metrics_lock:
+        _run_metrics['retries'][function] = _run_metrics['retries'].get(function, 0) + 1
+
+def update_rate_budget(api, remaining, reset):
+    """
+    Store the remaining rate limit of an api and when it resets, from the response headers or the GraphQL `rateLimit`.
+    `reset` is unix time or an ISO 8601 timestamp like `resetAt`.
+    """
+    if remaining is None or reset is None:
+        return
+    if isinstance(reset, str) and not reset.isdigit():
+        reset = datetime.fromisoformat(reset.replace('Z', '+00:00')).timestamp()
+    with _rate_budget_lock:
+        _rate_budget[api] = {'remaining': int(remaining), 'reset': float(reset)}
+
+def wait_for_rate_budget(api):
+    """
+    Block while the remaining rate limit of an api is down to the reserve, until it resets.
+    Every request is counted against the budget before it is sent, so concurrent workers don't overshoot it.
+    The budget stays in place while a worker waits, so every other worker waits for the reset as well.
+    """
+    while True:
+        with _rate_budget_lock:
+            budget = _rate_budget.get(api)
+            if budget is None:
+                return
+            wait = budget['reset'] - time.time() + 1
+            if budget['remaining'] > RATE_LIMIT_RESERVE or wait <= 0:
+                # store it back, in multi-repository mode the budget is a dict shared between processes.
+                # Past the reset the next response brings the new budget
+                _rate_budget[api] = {'remaining': budget['remaining'] - 1, 'reset': budget['reset']}
+                return
+        print(f'Rate Limit: {budget["remaining"]} {api} points left, waiting {wait:.0f}s for the reset')
+        time.sleep(wait)
+
+def is_graphql_rate_limited(response):
+    # GraphQL reports an exhausted rate limit as an error in a 200 response
+    if not response.ok or not (response.url or '').endswith('/graphql'):
+        return False
+    try:
+        errors = response.json().get('errors') or []
+    except ValueError:
+        return False
+    return any(error.get('type') == 'RATE_LIMITED' for error in errors)
+
+def get_retry_delay(response, attempt):
+    """
+    How long to wait before retrying a request, `response` is None when the request itself failed.
+    Returns None when the response is not worth retrying.
+    """
+    if response is not None:
+        rate_limited = response.status_code in (403, 429) and (
+            'Retry-After' in response.headers or response.headers.get('X-RateLimit-Remaining') == '0'
+        )
+        if response.status_code not in RETRY_STATUS_CODES and not rate_limited and not is_graphql_rate_limited(response):
+            return None
+        # a secondary rate limit says how long to wait, a primary one when it resets
+        if 'Retry-After' in response.headers:
+            return float(response.headers['Retry-After'])
+        if response.headers.get('X-RateLimit-Remaining') == '0' and 'X-RateLimit-Reset' in response.headers:
+            return max(float(response.headers['X-RateLimit-Reset']) - time.time(), 0) + 1
+    # full jitter, so workers that failed together don't retry together
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+
+def github_request(function, method, url, **kwargs):
+    """
+    Send a GitHub API request for `function` through the shared session.
+    Waits when the rate limit is nearly spent, and retries failed requests, rate limits and server errors
+    with backoff. Returns the last response, raises the last RequestException if the request never got one.
+    """
+    api = 'graphql' if url.endswith('/graphql') else 'rest'
+    max_retries = int(get_cli_option('--max-retries', DEFAULT_MAX_RETRIES))
+    if get_cli_option('--replay'):
+        # a replayed response is the same every time
+        max_retries = 0
+    attempt = 0
+    while True:
+        wait_for_rate_budget(api)
+        try:
+            response = get_github_session().request(method, url, **kwargs)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            if attempt >= max_retries:
+                raise
+            response = None
+            delay = get_retry_delay(None, attempt)
+            print(f'Retrying {function} in {delay:.1f}s: {e}')
+        else:
+            update_rate_budget(api, response.headers.get('X-RateLimit-Remaining'), response.headers.get('X-RateLimit-Reset'))
+            delay = get_retry_delay(response, attempt)
+            if delay is None or attempt >= max_retries:
+                return response
+            print(f'Retrying {function} in {delay:.1f}s: {response.status_code} {response.reason}')
+        record_retry(function)
+        time.sleep(delay)
+        attempt += 1
+
+def record_issues_processed(stage, count):
+    with _run_metrics_lock:
+        _run_metrics['issues_processed'][stage] = _run_metrics['issues_processed'].get(stage, 0) + count
+
+@contextmanager
+def run_stage(name):
+    """
+    Record the wall time of a stage of the run.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        with _run_metrics_lock:
+            _run_metrics['stages'][name] = _run_metrics['stages'].get(name, 0) + time.perf_counter() - start
+
+def write_run_metrics(directory='.', name='metrics'):
+    """
+    Write the metrics of this run as a JSON summary (metrics.json) and a Prometheus textfile (metrics.prom),
+    which the node_exporter textfile collector can pick up. Every metric is labelled with the repository.
+    """
+    with _run_metrics_lock:
+        metrics = json.loads(json.dumps(_run_metrics))
+    metrics['repository'] = f'{GITHUB_OWNER}/{GITHUB_REPOSITORY}'
+    metrics['finished_at'] = datetime.now(timezone.utc).isoformat()
+    with open(os.path.join(directory, f'{name}.json'), 'w') as file:
+        json.dump(metrics, file, indent=4)
+
+    def escape_label(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"')
+
+    lines = []
+    def add(metric, kind, help_text, samples):
+        lines.append(f'# HELP {METRICS_PREFIX}_{metric} {help_text}')
+        lines.append(f'# TYPE {METRICS_PREFIX}_{metric} {kind}')
+        for labels, value in samples:
+            labels = {'repository': metrics['repository'], **labels}
+            labels = ','.join(f'{key}="{escape_label(label_value)}"' for key, label_value in labels.items())
+            lines.append(f'{METRICS_PREFIX}_{metric}{{{labels}}} {value}')
+
+    add('stage_duration_seconds', 'gauge', 'Wall time of each stage of the last run.',
+        [({'stage': stage}, round(seconds, 6)) for stage, seconds in metrics['stages'].items()])
+    add('api_calls', 'gauge', 'GitHub API calls made by the last run.',
+        [({'function': function, 'api': api}, count) for function, calls in metrics['api_calls'].items() for api, count in calls.items()])
+    add('api_errors', 'gauge', 'Failed GitHub API calls of the last run.',
+        [({'function': function}, count) for function, count in metrics['errors'].items()])
+    add('api_retries', 'gauge', 'Retried GitHub API calls of the last run.',
+        [({'function': function}, count) for function, count in metrics['retries'].items()])
+    add('rate_limit_points', 'gauge', 'GraphQL rate limit points spent by the last run.', [({}, metrics['rate_limit_points'])])
+    add('rate_limit_remaining', 'gauge', 'Lowest remaining rate limit seen by the last run.',
+        [({'api': api}, remaining) for api, remaining in metrics['rate_limit_remaining'].items()])
+    add('issues_processed', 'gauge', 'Issues processed by each stage of the last run.',
+        [({'stage': stage}, count) for stage, count in metrics['issues_processed'].items()])
+    add('last_run_timestamp_seconds', 'gauge', 'Unix time the last run finished.', [({}, int(time.time()))])
+
+    # write to a temporary file first, the textfile collector must never read a half written file
+    path = os.path.join(directory, f'{name}.prom')
+    with open(path + '.tmp', 'w') as file:
+        file.write('\n'.join(lines) + '\n')
+    os.replace(path + '.tmp', path)
+
+def open_issue_store():
+    """
+    Open the SQLite issue store, creating the schema if needed.
+    Issues are keyed by url and issue number, every stage updates its own columns in place.
+    """
+    # stages can write to the store at the same time, wait for each other rather than fail
+    store = sqlite3.connect(ISSUE_STORE, timeout=60)
+    store.row_factory = sqlite3.Row
+    store.execute('PRAGMA journal_mode = WAL')
+    store.executescript('''
+        CREATE TABLE IF NOT EXISTS issues (
+            url TEXT PRIMARY KEY,
+            number INTEGER,
+            title TEXT NOT NULL,
+            body TEXT,
+            state TEXT NOT NULL,
+            updatedAt TEXT,
+            fixed_in TEXT,
+            found_in TEXT,
+            found_in_line TEXT,
+            createdAt TEXT,
+            closedAt TEXT
+        );
+        CREATE INDEX IF NOT EXISTS issues_state ON issues (state);
+        CREATE INDEX IF NOT EXISTS issues_found_in ON issues (found_in, state);
+        CREATE INDEX IF NOT EXISTS issues_fixed_in ON issues (fixed_in);
+        CREATE INDEX IF NOT EXISTS issues_updated_at ON issues (updatedAt);
+        CREATE TABLE IF NOT EXISTS sync_state (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        );
+
+        -- memo of the fixed-in lookups: the PR (or issue) linked to a closed issue as of when it was closed,
+        -- and the milestone of every linked PR. A NULL linked_url or milestone means there was none.
+        CREATE TABLE IF NOT EXISTS linked_issues (
+            url TEXT PRIMARY KEY,
+            linked_url TEXT,
+            closedAt TEXT,
+            checked_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS linked_issues_checked_at ON linked_issues (checked_at);
+        CREATE TABLE IF NOT EXISTS milestones (
+            url TEXT PRIMARY KEY,
+            milestone TEXT,
+            checked_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS milestones_checked_at ON milestones (checked_at);
+
+        -- weekly history of the open and closed counts per version, a row holds the change since the week before
+        -- and only versions whose counts changed get a row. version_counts holds the counts of the latest week.
+        CREATE TABLE IF NOT EXISTS version_history (
+            version TEXT NOT NULL,
+            major_minor TEXT NOT NULL,
+            week TEXT NOT NULL,
+            open_delta INTEGER NOT NULL,
+            closed_delta INTEGER NOT NULL,
+            PRIMARY KEY (version, week)
+        );
+        CREATE INDEX IF NOT EXISTS version_history_major_minor ON version_history (major_minor, week);
+        CREATE TABLE IF NOT EXISTS version_counts (
+            version TEXT PRIMARY KEY,
+            open INTEGER NOT NULL,
+            closed INTEGER NOT NULL
+        );
+
+        -- quantile sketches of the time to close ('close') and from the found_in to the fixed_in release ('fix')
+        -- per version: the number of issues per bucket of durations (see get_sketch_bucket). issue_durations holds
+        -- what every issue added to the sketches and the columns it was computed from, so a changed issue can be
+        -- taken out again.
+        CREATE TABLE IF NOT EXISTS duration_sketches (
+            metric TEXT NOT NULL,
+            version TEXT NOT NULL,
+            bucket INTEGER NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (metric, version, bucket)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS issue_durations (
+            url TEXT PRIMARY KEY,
+            state TEXT,
+            createdAt TEXT,
+            closedAt TEXT,
+            found_in TEXT,
+            has_found_in_line INTEGER,
+            fixed_in TEXT,
+            version TEXT,
+            close_bucket INTEGER,
+            fix_bucket INTEGER
+        );
+
+        -- revisions of the fetched issues, the fixed_in versions and the found_in versions, so the pipeline
+        -- can tell whether the input of a stage changed (see PIPELINE_STAGES)
+        CREATE TRIGGER IF NOT EXISTS issues_inserted AFTER INSERT ON issues BEGIN
+            INSERT INTO sync_state (key, value) VALUES ('revision:issues', 1) ON CONFLICT (key) DO UPDATE SET value = value + 1;
+        END;
+        CREATE TRIGGER IF NOT EXISTS issues_deleted AFTER DELETE ON issues BEGIN
+            INSERT INTO sync_state (key, value) VALUES ('revision:issues', 1) ON CONFLICT (key) DO UPDATE SET value = value + 1;
+        END;
+        CREATE TRIGGER IF NOT EXISTS issues_updated AFTER UPDATE OF url, title, body, state, updatedAt ON issues
+        WHEN old.url IS NOT new.url OR old.title IS NOT new.title OR old.body IS NOT new.body
+            OR old.state IS NOT new.state OR old.updatedAt IS NOT new.updatedAt
+        BEGIN
+            INSERT INTO sync_state (key, value) VALUES ('revision:issues', 1) ON CONFLICT (key) DO UPDATE SET value = value + 1;
+        END;
+        CREATE TRIGGER IF NOT EXISTS issues_fixed_in_updated AFTER UPDATE OF fixed_in ON issues
+        WHEN old.fixed_in IS NOT new.fixed_in
+        BEGIN
+            INSERT INTO sync_state (key, value) VALUES ('revision:fixed_in', 1) ON CONFLICT (key) DO UPDATE SET value = value + 1;
+        END;
+        CREATE TRIGGER IF NOT EXISTS issues_found_in_updated AFTER UPDATE OF found_in, found_in_line ON issues
+        WHEN old.found_in IS NOT new.found_in OR old.found_in_line IS NOT new.found_in_line
+        BEGIN
+            INSERT INTO sync_state (key, value) VALUES ('revision:found_in', 1) ON CONFLICT (key) DO UPDATE SET value = value + 1;
+        END;
+
+    ''')
+    columns = [row['name'] for row in store.execute('PRAGMA table_info(issues)')]
+    if 'number' not in columns:
+        # stores created before issues were keyed by number as well
+        with store:
+            store.execute('ALTER TABLE issues ADD COLUMN number INTEGER')
+            store.executemany('UPDATE issues SET number = ? WHERE url = ?', [
+                (get_issue_number(row['url']), row['url']) for row in store.execute('SELECT url FROM issues').fetchall()
+            ])
+    store.execute('CREATE UNIQUE INDEX IF NOT EXISTS issues_number ON issues (number)')
+    for column in ('createdAt', 'closedAt'):
+        if column not in columns:
+            # stores created before the creation and close times were fetched, the next fetch fills them in
+            with store:
+                store.execute(f'ALTER TABLE issues ADD COLUMN {column} TEXT')
+    if store.execute("SELECT 1 FROM sync_state WHERE key = 'store_id'").fetchone() is None:
+        # tells a store apart from one created in its place, whose revisions start over at the same numbers
+        with store:
+            store.execute("INSERT OR IGNORE INTO sync_state (key, value) VALUES ('store_id', ?)", (uuid.uuid4().hex,))
+    if 'closedAt' not in [row['name'] for row in store.execute('PRAGMA table_info(linked_issues)')]:
+        # memos created when links were kept as of the updatedAt of the issue, their links are looked up once more
+        with store:
+            store.execute('ALTER TABLE linked_issues ADD COLUMN closedAt TEXT')
+    if not has_search_index(store):
+        create_search_index(store)
+    return store
+
+def has_search_index(store):
+    return store.execute("SELECT 1 FROM sqlite_master WHERE name = 'issues_fts'").fetchone() is not None
+
+def create_search_index(store):
+    """
+    Create the full-text index of the titles and bodies, keyed by issue number (see search_issues), and index the
+    issues that are already stored. The index only holds the tokens, triggers keep it up to date with every change of an issue.
+    """
+    with store:
+        # another stage can open the store at the same time, only one of them creates the index
+        store.execute('BEGIN IMMEDIATE')
+        if has_search_index(store):
+            return
+        for statement in (
+            "CREATE VIRTUAL TABLE issues_fts USING fts5(title, body, content='')",
+            '''CREATE TRIGGER issues_fts_inserted AFTER INSERT ON issues BEGIN
+                INSERT INTO issues_fts (rowid, title, body) VALUES (new.number, new.title, new.body);
+            END''',
+            '''CREATE TRIGGER issues_fts_deleted AFTER DELETE ON issues BEGIN
+                INSERT INTO issues_fts (issues_fts, rowid, title, body) VALUES ('delete', old.number, old.title, old.body);
+            END''',
+            '''CREATE TRIGGER issues_fts_updated AFTER UPDATE OF number, title, body ON issues
+            WHEN old.number IS NOT new.number OR old.title IS NOT new.title OR old.body IS NOT new.body
+            BEGIN
+                INSERT INTO issues_fts (issues_fts, rowid, title, body) VALUES ('delete', old.number, old.title, old.body);
+                INSERT INTO issues_fts (rowid, title, body) VALUES (new.number, new.title, new.body);
+            END''',
+            'INSERT INTO issues_fts (rowid, title, body) SELECT number, title, body FROM issues',
+        ):
+            store.execute(statement)
+
+def get_issue_number(issue_url):
+    return int(issue_url.rstrip('/').split('/')[-1])
 
 def print_issues_to_file(issues, subfile):
     with open(f'issues-{subfile}.json', 'w') as file:
         json.dump(issues, file, indent=4)
 
-def fetch_github_issues(currentPage, pagesToGet, startswith):
+def export_json_files():
+    """
+    Export the issue store to the json files earlier versions of this script wrote after each stage.
+    """
+    with closing(open_issue_store()) as store:
+        rows = store.execute('SELECT * FROM issues ORDER BY rowid').fetchall()
+
+    issues = [{'url': row['url'], 'title': row['title'], 'body': row['body'], 'state': row['state'], 'updatedAt': row['updatedAt']} for row in rows]
+    with open('issues.json', 'w') as file:
+        json.dump(issues, file, indent=4)
+
+    for issue, row in zip(issues, rows):
+        issue['fixed_in'] = row['fixed_in']
+    print_issues_to_file(issues, 'with_fixed')
+
+    issues = [{
+        'url': row['url'],
+        'title': row['title'],
+        'body': row['body'],
+        'state': row['state'],
+        'found_in': row['found_in'],
+        'fixed_in': row['fixed_in'],
+        'found_in_line': row['found_in_line']
+    } for row in rows]
+    with open('issues_with_found_in.json', 'w') as file:
+        json.dump(issues, file, indent=4)
+
+    with open('issues_by_version.json', 'w') as file:
+        json.dump(organize_issues_by_version(), file, indent=4)
+
+def fetch_github_issues_page(startswith, since=None):
+    """
+    Fetch one page of bug issues after the cursor `startswith`.
+    Returns a tuple of (issues, pageInfo), issues is None when the request failed.
+    """
     # GitHub GraphQL API endpoint
     github_api_url = 'https://api.github.com/graphql'
 
@@ -20,48 +626,44 @@ def fetch_github_issues(currentPage, pagesToGet, startswith):
     token = os.environ.get('GH_TOKEN')
 
     # Your GitHub repository owner and name
-    owner = 'grafana'
-    repo_name = 'grafana'
+    owner = GITHUB_OWNER
+    repo_name = GITHUB_REPOSITORY
 
-    if startswith == None:
-        # GraphQL query to fetch issues with label "type/bug"
-        query = '''
-        query {
-            repository(owner: "%s", name: "%s") {
-                issues(labels: ["type/bug"], first: 100, orderBy: {field: CREATED_AT, direction: DESC}) {
-                    pageInfo {
-                        hasNextPage
-                        endCursor
-                    }
-                    nodes {
-                        url
-                        title
-                        body
-                        state
-                    }
-                }
-            }
-        }
-        ''' % (owner, repo_name)
+    # GraphQL query to fetch issues with label "type/bug"
+    # in incremental mode only issues updated since the last run are fetched, most recently updated first
+    if since == None:
+        arguments = 'labels: ["type/bug"], first: 100, orderBy: {field: CREATED_AT, direction: DESC}'
     else:
-        query = '''
-        query {
-            repository(owner: "%s", name: "%s") {
-                issues(labels: ["type/bug"], first: 100, orderBy: {field: CREATED_AT, direction: DESC}, after: "%s") {
-                    pageInfo {
-                        hasNextPage
-                        endCursor
-                    }
-                    nodes {
-                        url
-                        title
-                        body
-                        state
-                    }
+        arguments = 'labels: ["type/bug"], first: 100, orderBy: {field: UPDATED_AT, direction: DESC}, filterBy: {since: "%s"}' % since
+    if startswith != None:
+        arguments += ', after: "%s"' % startswith
+
+    query = '''
+    query {
+        rateLimit {
+            cost
+            remaining
+            resetAt
+        }
+        repository(owner: "%s", name: "%s") {
+            issues(%s) {
+                pageInfo {
+                    hasNextPage
+                    endCursor
+                }
+                nodes {
+                    url
+                    title
+                    body
+                    state
+                    updatedAt
+                    createdAt
+                    closedAt
                 }
             }
         }
-        ''' % (owner, repo_name, startswith)
+    }
+    ''' % (owner, repo_name, arguments)
 
     # Set up headers with the GitHub token
     headers = {
@@ -71,133 +673,390 @@ def fetch_github_issues(currentPage, pagesToGet, startswith):
 
     # Make the GraphQL request
     try:
-        response = requests.post(github_api_url, json={'query': query}, headers=headers)
+        response = github_request('fetch_github_issues_page', 'POST', github_api_url, json={'query': query}, headers=headers)
         response.raise_for_status()
     except requests.exceptions.RequestException as e:
         print(f"Error: {e}")
-        return
+        record_api_call('fetch_github_issues_page', 'graphql', failed=True)
+        return None, None
 
     # Parse the response and extract relevant information
     data = response.json()
     try:
         issues = data['data']['repository']['issues']['nodes']
-    except KeyError:
+        page_info = data['data']['repository']['issues']['pageInfo']
+    except (KeyError, TypeError):
         print("Error: Invalid response from GitHub API")
-        return []
-    
-    # pagination
-    if currentPage < pagesToGet and data['data']['repository']['issues']['pageInfo']['hasNextPage']:
-        # print rate limit info here
-        print(f'Rate Limit: {response.headers["X-RateLimit-Remaining"]}/{response.headers["X-RateLimit-Limit"]}')
-        print(f'Rate Limit Reset: {response.headers["X-RateLimit-Reset"]}')
-        print(f'Current Page: {currentPage}/{pagesToGet}')
-        # go to next page
-        issues += fetch_github_issues(currentPage + 1, pagesToGet, data['data']['repository']['issues']['pageInfo']['endCursor'])
-    return issues
+        record_api_call('fetch_github_issues_page', 'graphql', response, failed=True)
+        return None, None
+    record_api_call('fetch_github_issues_page', 'graphql', response, (data['data'].get('rateLimit') or {}).get('cost', 1))
 
+    # print rate limit info here
+    print(f'Rate Limit: {response.headers["X-RateLimit-Remaining"]}/{response.headers["X-RateLimit-Limit"]}')
+    print(f'Rate Limit Reset: {response.headers["X-RateLimit-Reset"]}')
+    return issues, page_info
 
-def find_grafana_version():
-    # get issues from issues.json
-    with open('issues-with_fixed.json', 'r') as file:
-        issues = json.load(file)
-    
-    updated_issues = []
-    
-    for issue in issues:
-        body = issue['body']
-        lines = body.split('\n')
-        found_in = None
-        found_in_line = None
-        
-        for line in lines:
-            version_match = re.search(r'\d+\.\d+\.\d+', line)
-            if 'Grafana:' in line or 'Grafana Version:' in line or 'Grafana version:' in line:
-                version_match = re.search(r'\d+\.\d+\.\d+', line)
-                if version_match:
-                    found_in = version_match.group()
-                else:
-                    found_in_line = line
-                break  # no need to go through the rest of the lines
-        
-        if 'fixed_in' not in issue:
-            issue['fixed_in'] = None
-        updated_issue = {
-            'url': issue['url'],
-            'title': issue['title'],
-            'body': issue['body'],
-            'state': issue['state'],
-            'found_in': found_in,
-            'fixed_in': issue['fixed_in'], # added this to the dict to make it easier to find the issue in GitHub
-            'found_in_line': found_in_line
+def fetch_github_issues(pagesToGet, since=None):
+    """
+    Fetch bug issues page by page. This is a generator that yields the issues of one page at a time,
+    the next page is already being fetched in the background while the caller processes the current one.
+    """
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        next_page = executor.submit(fetch_github_issues_page, None, since)
+        currentPage = 0
+        while next_page:
+            issues, page_info = next_page.result()
+            if issues is None:
+                # stop the run rather than continue with a partial fetch, an incremental run would skip the missing issues for good
+                raise requests.exceptions.RequestException(f'Fetching page {currentPage} of the issues failed')
+
+            # pagination, start fetching the next page before handing this one over
+            next_page = None
+            if currentPage < pagesToGet and page_info['hasNextPage']:
+                print(f'Current Page: {currentPage}/{pagesToGet}')
+                next_page = executor.submit(fetch_github_issues_page, page_info['endCursor'], since)
+
+            yield issues
+            currentPage += 1
+
+
+# the label of the line of the issue template with the version: `Grafana: 11.4.2`, `Grafana Version: v11.4.2`,
+# `**Grafana version:** 11.4.2+security-01`, ... Repositories of --repos=FILE set their own `found_in_pattern`
+DEFAULT_FOUND_IN_PATTERN = r'Grafana:|Grafana Version:|Grafana version:'
+# the `### Grafana version` heading of the issue form, the version is then on the next non-empty line, `found_in_heading_pattern`
+DEFAULT_FOUND_IN_HEADING_PATTERN = r'Grafana [Vv]ersion'
+
+def compile_found_in_patterns(found_in_pattern, found_in_heading_pattern):
+    """
+    Compile the patterns of the found-in line and heading of a repository.
+    Returns a tuple of (line pattern, heading pattern).
+    """
+    return (
+        re.compile(r'^.*(?:%s).*$' % found_in_pattern, re.MULTILINE),
+        re.compile(r'^#{1,6}[ \t]*(?:%s)[ \t]*\r?$' % found_in_heading_pattern, re.MULTILINE),
+    )
+
+FOUND_IN_PATTERN, FOUND_IN_HEADING_PATTERN = compile_found_in_patterns(DEFAULT_FOUND_IN_PATTERN, DEFAULT_FOUND_IN_HEADING_PATTERN)
+NEXT_LINE_PATTERN = re.compile(r'^[ \t]*(\S.*)$', re.MULTILINE)
+# `v` prefixes and `-security-01` / `+security-01` suffixes are not part of the found_in version
+VERSION_PATTERN = re.compile(r'v?(\d+\.\d+\.\d+)(?:[-+]security[-.]?\d*)?')
+
+def extract_found_in(body, patterns=None):
+    """
+    Find the `Grafana:` line of the issue template in an issue body, or else the answer to the
+    `### Grafana version` heading of the issue form. `patterns` are the (line, heading) patterns of another repository.
+    Returns a tuple of (version, line) where line is set when the line has no exact version.
+    """
+    found_in_pattern, found_in_heading_pattern = patterns or (FOUND_IN_PATTERN, FOUND_IN_HEADING_PATTERN)
+    match = found_in_pattern.search(body)
+    if match:
+        line = match.group()
+    else:
+        match = found_in_heading_pattern.search(body)
+        if not match:
+            return None, None
+        # the answer is on the next non-empty line, unless the question was left empty
+        answer = NEXT_LINE_PATTERN.search(body, match.end())
+        if not answer or answer.group(1).startswith('#') or answer.group(1).strip() == '_No response_':
+            return None, None
+        line = answer.group(1).rstrip()
+
+    version_match = VERSION_PATTERN.search(line)
+    if version_match:
+        return version_match.group(1), None
+    return None, line
+
+def extract_found_in_chunk(rows, patterns=None):
+    """
+    Extract the found_in version of a chunk of (url, body) rows, runs in a worker process.
+    Worker processes don't see the patterns of the repository set in the parent, they are passed along.
+    Returns a list of (found_in, found_in_line, url).
+    """
+    return [extract_found_in(body or '', patterns) + (url,) for url, body in rows]
+
+def find_grafana_version(changed_urls=None, workers=None):
+    """
+    Extract the found_in version of every issue in the issue store, or only of the changed issues in incremental mode.
+    Bodies are sent in chunks to a pool of worker processes, small sets are extracted in this process.
+    """
+    if workers is None:
+        workers = int(get_cli_option('--extract-workers', os.cpu_count() or 1))
+
+    with closing(open_issue_store()) as store:
+        def chunks():
+            if changed_urls is not None:
+                # only read the bodies of the changed issues, a weekly run changes few of them
+                urls = sorted(changed_urls)
+                for i in range(0, len(urls), 500):
+                    chunk = urls[i:i + 500]
+                    rows = store.execute('SELECT url, body FROM issues WHERE url IN (%s)' % ','.join('?' * len(chunk)), chunk)
+                    fetched = [(row['url'], row['body']) for row in rows]
+                    if fetched:
+                        yield fetched
+                return
+            rows = store.execute('SELECT url, body FROM issues')
+            while True:
+                fetched = rows.fetchmany(EXTRACT_CHUNK_SIZE)
+                if not fetched:
+                    return
+                yield [(row['url'], row['body']) for row in fetched]
+
+        if changed_urls is not None:
+            total = len(changed_urls)
+        else:
+            total = store.execute('SELECT COUNT(*) FROM issues').fetchone()[0]
+
+        updates = []
+        patterns = (FOUND_IN_PATTERN, FOUND_IN_HEADING_PATTERN)
+        if workers <= 1 or total < PARALLEL_EXTRACT_MIN_ISSUES:
+            for chunk in chunks():
+                updates += extract_found_in_chunk(chunk, patterns)
+        else:
+            # other stages of the pipeline run in threads next to this one, forking them could copy held locks
+            start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(start_method)) as executor:
+                # keep a bounded number of chunks in flight so bodies are not all held in memory at once
+                pending = deque()
+                for chunk in chunks():
+                    pending.append(executor.submit(extract_found_in_chunk, chunk, patterns))
+                    if len(pending) >= workers * 2:
+                        updates += pending.popleft().result()
+                while pending:
+                    updates += pending.popleft().result()
+
+        with store:
+            store.executemany('UPDATE issues SET found_in = ?, found_in_line = ? WHERE url = ?', updates)
+    record_issues_processed('find_grafana_version', len(updates))
+
+# the issue columns the aggregate is built from, in the order it reads the issues
+AGGREGATE_QUERY = 'SELECT url, title, fixed_in, state, found_in, found_in_line IS NOT NULL FROM issues ORDER BY title, rowid'
+
+def get_dictionary_typecode(size):
+    return 'B' if size <= 0xff else 'H' if size <= 0xffff else 'I'
+
+def write_issue_snapshot(path=ISSUE_SNAPSHOT):
+    """
+    Write the issue columns the stats and reports are built from to a compact snapshot, without the bodies.
+    The issues are stored in the order build_issue_aggregate reads them, one column after the other: versions,
+    states and url prefixes are dictionary-encoded as small integer codes (version 0 is None), urls are the code
+    of their prefix and the issue number, and titles one utf-8 string with the character offset of every title.
+    The file is a magic, the length of a JSON header (little endian) and the header, followed by the columns
+    at the offsets the header lists, so read_issue_snapshot can memory-map it instead of parsing it.
+    """
+    with closing(open_issue_store()) as store:
+        # read the revisions and the issues in one transaction, the snapshot is used as long as the store and its revisions match
+        with store:
+            store.execute('BEGIN')
+            store_id = store.execute("SELECT value FROM sync_state WHERE key = 'store_id'").fetchone()['value']
+            revisions = dict.fromkeys(REPORT_INPUTS)
+            for row in store.execute('SELECT key, value FROM sync_state WHERE key IN (%s)' % ','.join('?' * len(REPORT_INPUTS)), REPORT_INPUTS):
+                revisions[row['key']] = row['value']
+            rows = store.execute(AGGREGATE_QUERY).fetchall()
+
+    codes = {'state': {}, 'version': {None: 0}, 'url_prefix': {}}
+    values = {name: [] for name in ('number', 'url_prefix', 'state', 'found_in', 'fixed_in', 'flags')}
+    title_offsets = array('I', [0])
+    titles = []
+    for url, title, fixed_in, state, found_in, has_found_in_line in rows:
+        prefix, _, number = url.rpartition('/')
+        flags = 1 if has_found_in_line else 0
+        if number.isdigit() and str(int(number)) == number:
+            values['url_prefix'].append(codes['url_prefix'].setdefault(prefix + '/', len(codes['url_prefix'])))
+            values['number'].append(int(number))
+        else:
+            # an url that doesn't end in an issue number is kept whole as its own prefix
+            values['url_prefix'].append(codes['url_prefix'].setdefault(url, len(codes['url_prefix'])))
+            values['number'].append(0)
+            flags |= 2
+        values['flags'].append(flags)
+        values['state'].append(codes['state'].setdefault(state, len(codes['state'])))
+        values['found_in'].append(codes['version'].setdefault(found_in, len(codes['version'])))
+        values['fixed_in'].append(codes['version'].setdefault(fixed_in, len(codes['version'])))
+        titles.append(title)
+        title_offsets.append(title_offsets[-1] + len(title))
+
+    typecodes = {
+        'number': 'I',
+        'url_prefix': get_dictionary_typecode(len(codes['url_prefix'])),
+        'state': get_dictionary_typecode(len(codes['state'])),
+        'found_in': get_dictionary_typecode(len(codes['version'])),
+        'fixed_in': get_dictionary_typecode(len(codes['version'])),
+        'flags': 'B',
+    }
+    columns = [(name, typecodes[name], array(typecodes[name], values[name]).tobytes()) for name in values]
+    columns.append(('title_offsets', 'I', title_offsets.tobytes()))
+    columns.append(('titles', 'B', ''.join(titles).encode('utf-8')))
+
+    header = {
+        'byteorder': sys.byteorder,
+        'count': len(rows),
+        'store_id': store_id,
+        'revisions': revisions,
+        'dictionaries': {name: list(dictionary) for name, dictionary in codes.items()},
+        'columns': {},
+    }
+    offset = 0
+    for name, typecode, data in columns:
+        header['columns'][name] = [offset, len(data), typecode]
+        # every column starts 8 byte aligned
+        offset += (len(data) + 7) // 8 * 8
+    header = json.dumps(header).encode('utf-8')
+
+    temporary_path = f'{path}.tmp'
+    with open(temporary_path, 'wb') as file:
+        file.write(ISSUE_SNAPSHOT_MAGIC + len(header).to_bytes(4, 'little') + header)
+        for name, typecode, data in columns:
+            file.write(b'\0' * (-file.tell() % 8))
+            file.write(data)
+    os.replace(temporary_path, path)
+    return len(rows)
+
+def read_issue_snapshot(path=ISSUE_SNAPSHOT):
+    """
+    Memory-map a snapshot written by write_issue_snapshot.
+    Returns a dict with the `count` of issues, the `store_id` and store `revisions` it was made from, the `dictionaries`
+    and a memoryview of every column, or None if there is no snapshot. close_issue_snapshot unmaps it.
+    """
+    if not os.path.exists(path) or os.path.getsize(path) < len(ISSUE_SNAPSHOT_MAGIC) + 4:
+        return None
+    with open(path, 'rb') as file:
+        mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    header_start = len(ISSUE_SNAPSHOT_MAGIC) + 4
+    if mapping[:len(ISSUE_SNAPSHOT_MAGIC)] != ISSUE_SNAPSHOT_MAGIC:
+        mapping.close()
+        return None
+    header_length = int.from_bytes(mapping[len(ISSUE_SNAPSHOT_MAGIC):header_start], 'little')
+    header = json.loads(str(mapping[header_start:header_start + header_length], 'utf-8'))
+    if header['byteorder'] != sys.byteorder:
+        mapping.close()
+        return None
+    data_offset = (header_start + header_length + 7) // 8 * 8
+    with memoryview(mapping) as view:
+        columns = {
+            name: view[data_offset + offset:data_offset + offset + length].cast(typecode)
+            for name, (offset, length, typecode) in header['columns'].items()
         }
-        
-        updated_issues.append(updated_issue)
-    
-    with open('issues_with_found_in.json', 'w') as file:
-        json.dump(updated_issues, file, indent=4)
+    return {
+        'count': header['count'],
+        'store_id': header.get('store_id'),
+        'revisions': header['revisions'],
+        'dictionaries': header['dictionaries'],
+        'columns': columns,
+        'mapping': mapping,
+    }
 
-def organize_issues_by_version():
-    # get issues from issues.json
-    with open('issues_with_found_in.json', 'r') as file:
-        issues = json.load(file)
-    
+def close_issue_snapshot(snapshot):
+    """
+    Release the columns of a snapshot and unmap its file.
+    """
+    for column in snapshot['columns'].values():
+        column.release()
+    snapshot['mapping'].close()
+
+def get_store_id():
+    with closing(open_issue_store()) as store:
+        return store.execute("SELECT value FROM sync_state WHERE key = 'store_id'").fetchone()['value']
+
+def read_current_issue_snapshot():
+    """
+    Returns the snapshot if it was written from the current issue store, None otherwise.
+    A store created in place of another starts its revisions over, so the store id has to match as well.
+    """
+    snapshot = read_issue_snapshot()
+    if snapshot is None:
+        return None
+    if snapshot['store_id'] == get_store_id() and snapshot['revisions'] == get_pipeline_values(REPORT_INPUTS):
+        return snapshot
+    close_issue_snapshot(snapshot)
+    return None
+
+def get_snapshot_rows(snapshot):
+    """
+    Decode the issues of a snapshot, in the same (url, title, fixed_in, state, found_in, has_found_in_line) rows
+    as AGGREGATE_QUERY.
+    """
+    columns = snapshot['columns']
+    versions = snapshot['dictionaries']['version']
+    states = snapshot['dictionaries']['state']
+    url_prefixes = snapshot['dictionaries']['url_prefix']
+    text = str(columns['titles'], 'utf-8')
+    title_offsets = columns['title_offsets'].tolist()
+    flags = columns['flags'].tolist()
+    urls = [
+        url_prefixes[prefix] if flag & 2 else f'{url_prefixes[prefix]}{number}'
+        for prefix, number, flag in zip(columns['url_prefix'].tolist(), columns['number'].tolist(), flags)
+    ]
+    return zip(
+        urls,
+        [text[start:end] for start, end in zip(title_offsets, title_offsets[1:])],
+        [versions[code] for code in columns['fixed_in'].tolist()],
+        [states[code] for code in columns['state'].tolist()],
+        [versions[code] for code in columns['found_in'].tolist()],
+        [flag & 1 for flag in flags],
+    )
+
+def build_issue_aggregate(snapshot=None):
+    """
+    Build everything the stats, CSVs and reports need in a single pass over the issues:
+    the issues grouped by found_in version (sorted by title), the counts by state per version and
+    per major.minor version, and the overall totals.
+    Issues without a `Grafana:` line are grouped as 'No Version', issues with a version line but no
+    exact version are only counted in the totals.
+    The issues are read from `snapshot`, from the snapshot file if it is up to date, or else from the issue store.
+    """
     issues_by_version = {}
-    issues_with_found_in_line = []
-    
-    for issue in issues:
-        version = issue['found_in']
-        found_in_line = issue['found_in_line']
-        if 'fixed_in' not in issue:
-            issue['fixed_in'] = None
-        
-        if version:
+    versions = {}
+    totals = {'scanned': 0, 'open': 0, 'closed': 0, 'with_version': 0, 'open_with_version': 0, 'with_version_line': 0}
+
+    with ExitStack() as stack:
+        if snapshot is None:
+            snapshot = read_current_issue_snapshot()
+            if snapshot is not None:
+                # unmap it once the aggregate is built, a snapshot that was passed in is left to the caller
+                stack.callback(close_issue_snapshot, snapshot)
+        if snapshot is not None:
+            rows = get_snapshot_rows(snapshot)
+        else:
+            rows = stack.enter_context(closing(open_issue_store())).execute(AGGREGATE_QUERY)
+        for url, title, fixed_in, state, found_in, has_found_in_line in rows:
+            totals['scanned'] += 1
+            if state == 'OPEN':
+                totals['open'] += 1
+            elif state == 'CLOSED':
+                totals['closed'] += 1
+            if has_found_in_line:
+                totals['with_version_line'] += 1
+
+            if found_in is not None:
+                totals['with_version'] += 1
+                if state == 'OPEN':
+                    totals['open_with_version'] += 1
+                version = found_in
+            elif not has_found_in_line:
+                version = 'No Version'
+            else:
+                continue
+
             if version not in issues_by_version:
                 issues_by_version[version] = []
+                versions[version] = {'OPEN': 0, 'CLOSED': 0, 'total': 0}
             issues_by_version[version].append({
-                'url': issue['url'],
-                'title': issue['title'],
-                'fixed_in': issue['fixed_in'], # added this to the dict to make it easier to find the issue in GitHub
-                'state': issue['state'],
-            })
-        elif found_in_line:
-            issues_with_found_in_line.append({
-                'url': issue['url'],
-                'title': issue['title'],
-                'state': issue['state'],
-                'fixed_in': issue['fixed_in'], # added this to the dict to make it easier to find the issue in GitHub
-                'found_in_line': found_in_line
-            })
-        else:
-            if 'No Version' not in issues_by_version:
-                issues_by_version['No Version'] = []
-            issues_by_version['No Version'].append({
-                'url': issue['url'],
-                'title': issue['title'],
-                'fixed_in': issue['fixed_in'], # added this to the dict to make it easier to find the issue in GitHub
-                'state': issue['state'],
+                'url': url,
+                'title': title,
+                'fixed_in': fixed_in, # added this to the dict to make it easier to find the issue in GitHub
+                'state': state,
             })
+            versions[version][state] = versions[version].get(state, 0) + 1
+            versions[version]['total'] += 1
 
-    # sort issues by title
-    for version in issues_by_version:
-        issues_by_version[version] = sorted(issues_by_version[version], key=lambda k: k['title'])
-        
-    with open('issues_by_version.json', 'w') as file:
-        json.dump(issues_by_version, file, indent=4)
-
-def log_stats():
-    # get issues from issues.json
-    with open('issues_by_version.json', 'r') as file:
-        issues = json.load(file)
-    
     sorted_versions = sorted(
-        (version for version in issues.keys() if version != 'No Version'),
+        (version for version in versions.keys() if version != 'No Version'),
         key=parse_version_for_sorting,
         reverse=True
     )
-    if 'No Version' in issues:
+    if 'No Version' in versions:
         sorted_versions.append('No Version')
 
-    
     # group together all major/minor versions, basically remove the patch version and group together, e.g. 11.4.1 and 11.4.2 become 11.4 and we group the issues together.
     major_minor_versions = {}
     for version in sorted_versions:
@@ -205,87 +1064,86 @@ def log_stats():
             major_minor_version = 'No Version'
         else:
             major_minor_version = '.'.join(version.split('.')[:2])
-        
+
         if major_minor_version not in major_minor_versions:
-            major_minor_versions[major_minor_version] = []
-        
-        major_minor_versions[major_minor_version] += issues[version]
+            major_minor_versions[major_minor_version] = {'OPEN': 0, 'CLOSED': 0, 'total': 0}
+
+        for key, value in versions[version].items():
+            major_minor_versions[major_minor_version][key] = major_minor_versions[major_minor_version].get(key, 0) + value
+
+    record_issues_processed('build_issue_aggregate', totals['scanned'])
+    return {
+        'issues_by_version': issues_by_version,
+        'versions': versions,
+        'sorted_versions': sorted_versions,
+        'major_minor_versions': major_minor_versions,
+        'totals': totals,
+    }
 
-    with open('reports/stats_by_major_minor_version.csv', 'w') as csv_file:
-        csv_file.write(f'Version, Total, Open, Closed\n')
+def organize_issues_by_version(snapshot=None):
+    """
+    Group the issues of the issue store (or of a snapshot) by found_in version.
+    Returns a dict of version -> issues sorted by title.
+    """
+    return build_issue_aggregate(snapshot)['issues_by_version']
+
+def log_stats(aggregate=None, durations=None):
+    if aggregate is None:
+        aggregate = build_issue_aggregate()
+    if durations is None:
+        durations = get_duration_stats()
+    counts = aggregate['versions']
+    totals = aggregate['totals']
+    sorted_versions = aggregate['sorted_versions']
+    major_minor_versions = aggregate['major_minor_versions']
+
+    with open_report_file('reports/stats_by_major_minor_version.csv') as csv_file:
+        csv_file.write(f'Version, Total, Open, Closed, {DURATION_COLUMNS}\n')
         for version in major_minor_versions:
-            # group the issues by state
-            open_issues = [issue for issue in major_minor_versions[version] if issue['state'] == 'OPEN']
-            closed_issues = [issue for issue in major_minor_versions[version] if issue['state'] == 'CLOSED']
-            csv_file.write(f'{version}, {len(major_minor_versions[version])}, {len(open_issues)}, {len(closed_issues)}\n')  
+            version_counts = major_minor_versions[version]
+            duration_columns = format_duration_columns(durations['major_minor_versions'].get(version, {}))
+            csv_file.write(f'{version}, {version_counts["total"]}, {version_counts["OPEN"]}, {version_counts["CLOSED"]}, {duration_columns}\n')  
     
-    with open('stats.txt', 'w') as stats_file:
-        stats_file.write(f'Grafana Bug Report\n')
+    with open_report_file('stats.txt') as stats_file:
+        stats_file.write(f'{get_report_title()}\n')
         current_date = datetime.now().strftime("%Y-%m-%d")
         stats_file.write(f'Date: {current_date}\n\n')
 
         stats_file.write(f'## By Version\n')
-        with open('reports/stats_by_version.csv', 'w') as csv_file:
-            csv_file.write(f'Version, Total, Open, Closed\n')
+        with open_report_file('reports/stats_by_version.csv') as csv_file:
+            csv_file.write(f'Version, Total, Open, Closed, {DURATION_COLUMNS}\n')
             stats_file.write(f'Version, Total, Open, Closed\n')
             for version in sorted_versions:
-                # group the issues by state
-                open_issues = [issue for issue in issues[version] if issue['state'] == 'OPEN']
-                closed_issues = [issue for issue in issues[version] if issue['state'] == 'CLOSED']
-                stats_file.write(f'{version}, {len(issues[version])}, {len(open_issues)}, {len(closed_issues)}\n')
-                csv_file.write(f'{version}, {len(issues[version])}, {len(open_issues)}, {len(closed_issues)}\n')
+                version_counts = counts[version]
+                duration_columns = format_duration_columns(durations['versions'].get(version, {}))
+                stats_file.write(f'{version}, {version_counts["total"]}, {version_counts["OPEN"]}, {version_counts["CLOSED"]}\n')
+                csv_file.write(f'{version}, {version_counts["total"]}, {version_counts["OPEN"]}, {version_counts["CLOSED"]}, {duration_columns}\n')
 
     
         stats_file.write(f'\n\n## Overall Stats\n')
-        # total issues
-        with open('issues.json', 'r') as file:
-            issues = json.load(file)
-        stats_file.write(f'- Total Bugs Scanned: {len(issues)}\n')
-
-        # total open bugs
-        with open('issues_with_found_in.json', 'r') as file:
-            issues = json.load(file)
-        open_issues = [issue for issue in issues if issue['state'] == 'OPEN']
-        stats_file.write(f'- Total Open Bugs: {len(open_issues)}\n')
-        
-        # total closed bugs
-        closed_issues = [issue for issue in issues if issue['state'] == 'CLOSED']
-        stats_file.write(f'- Total Closed Bugs: {len(closed_issues)}\n')
-
-        # total bugs with found_in
-        with open('issues_with_found_in.json', 'r') as file:
-            issues = json.load(file)
-        issues_with_found_in = [issue for issue in issues if issue['found_in'] is not None]
-        stats_file.write(f'- Total Bugs with Version: {len(issues_with_found_in)}\n')
-
-        # total bugs with found_in_line
-        with open('issues_with_found_in.json', 'r') as file:
-            issues = json.load(file)
-        issues_with_found_in_line = [issue for issue in issues if issue['found_in_line'] is not None]
-        stats_file.write(f'- Total Bugs with Version (but not exact version): {len(issues_with_found_in_line)}\n')
+        stats_file.write(f'- Total Bugs Scanned: {totals["scanned"]}\n')
+        stats_file.write(f'- Total Open Bugs: {totals["open"]}\n')
+        stats_file.write(f'- Total Closed Bugs: {totals["closed"]}\n')
+        stats_file.write(f'- Total Bugs with Version: {totals["with_version"]}\n')
+        stats_file.write(f'- Total Bugs with Version (but not exact version): {totals["with_version_line"]}\n')
     
     # print stats on screen
     with open('stats.txt', 'r') as file:
         stats = file.read()
         print(stats)
 
-def create_report_md(showClosed=True, showOpen=True, filename='report.md'):
-    # get issues from issues.json
-    with open('issues_by_version.json', 'r') as file:
-        issues = json.load(file)
-    
-    sorted_versions = sorted(
-        (version for version in issues.keys() if version != 'No Version'),
-        key=parse_version_for_sorting,
-        reverse=True
-    )
-    if 'No Version' in issues:
-        sorted_versions.append('No Version')
+def create_report_md(showClosed=True, showOpen=True, filename='report.md', aggregate=None):
+    # get issues grouped by version
+    if aggregate is None:
+        aggregate = build_issue_aggregate()
+    issues = aggregate['issues_by_version']
+    totals = aggregate['totals']
+    sorted_versions = aggregate['sorted_versions']
     
     with open(f'reports/{filename}', 'w', encoding='utf-8') as report_file:
 
         # print header
-        report_file.write(f'# Grafana Bug Report\n')
+        report_file.write(f'# {get_report_title()}\n')
         # print date
         current_date = datetime.now().strftime("%Y-%m-%d")
         report_file.write(f'## Date: {current_date}\n')
@@ -317,54 +1175,445 @@ def create_report_md(showClosed=True, showOpen=True, filename='report.md'):
 
         # total issues
         report_file.write(f'## Stats\n')
-        with open('issues.json', 'r') as file:
-            issues_data = json.load(file)
-        report_file.write(f'- Total Bugs Scanned: {len(issues_data)}\n')
-
-        # total open bugs
-        with open('issues_with_found_in.json', 'r') as file:
-            issues = json.load(file)
-        open_issues = [issue for issue in issues if issue['state'] == 'OPEN']
-        report_file.write(f'- Total Open Bugs: {len(open_issues)}\n')
-        
-        # total closed bugs
-        closed_issues = [issue for issue in issues if issue['state'] == 'CLOSED']
-        report_file.write(f'- Total Closed Bugs: {len(closed_issues)}\n')
+        report_file.write(f'- Total Bugs Scanned: {totals["scanned"]}\n')
+        report_file.write(f'- Total Open Bugs: {totals["open"]}\n')
+        report_file.write(f'- Total Closed Bugs: {totals["closed"]}\n')
+        report_file.write(f'- Total Bugs with Version: {totals["with_version"]}\n')
+        report_file.write(f'- Total Bugs with Version and OPEN state: {totals["open_with_version"]}\n')
+        report_file.write(f'- Total Bugs with Version (but not exact version): {totals["with_version_line"]}\n')
+
+def same_report_content(path, other_path):
+    """
+    Compare two report files, leaving out the generated date.
+    """
+    if os.path.getsize(path) != os.path.getsize(other_path):
+        return False
+    with open(path, 'rb') as file, open(other_path, 'rb') as other_file:
+        # the date is in the first lines, the rest is compared as is
+        for _ in range(3):
+            line, other_line = file.readline(), other_file.readline()
+            if line != other_line and not (REPORT_DATE_PATTERN.match(line) and REPORT_DATE_PATTERN.match(other_line)):
+                return False
+        while True:
+            block, other_block = file.read(REPORT_BUFFER_SIZE), other_file.read(REPORT_BUFFER_SIZE)
+            if block != other_block:
+                return False
+            if not block:
+                return True
+
+@contextmanager
+def open_report_file(path, mode='w'):
+    """
+    Open a report file for writing. The new content goes to a temporary file that only replaces the report
+    when something other than the generated date changed, so unchanged reports are not touched and stay out of the diff.
+    """
+    temporary_path = f'{path}.tmp'
+    try:
+        with open(temporary_path, mode, buffering=REPORT_BUFFER_SIZE, **({} if 'b' in mode else {'encoding': 'utf-8'})) as file:
+            yield file
+    except BaseException:
+        os.remove(temporary_path)
+        raise
+    if os.path.exists(path) and same_report_content(path, temporary_path):
+        os.remove(temporary_path)
+    else:
+        os.replace(temporary_path, path)
 
-        # total bugs with found_in
-        with open('issues_with_found_in.json', 'r') as file:
-            issues = json.load(file)
-        issues_with_found_in = [issue for issue in issues if issue['found_in'] is not None]
-        report_file.write(f'- Total Bugs with Version: {len(issues_with_found_in)}\n')
+def read_report_manifest():
+    if not os.path.exists(REPORT_MANIFEST):
+        return {'files': {}}
+    with open(REPORT_MANIFEST, 'r') as file:
+        return json.load(file)
 
-        # Total bugs with found_in and OPEN state
-        open_issues_with_found_in = [issue for issue in issues_with_found_in if issue['state'] == 'OPEN']
-        report_file.write(f'- Total Bugs with Version and OPEN state: {len(open_issues_with_found_in)}\n')
+def hash_report_section(version_issues):
+    """
+    Hash what a version section of the reports is rendered from.
+    """
+    section = '\n'.join(f'{issue["state"]}\0{issue["title"]}\0{issue["url"]}\0{issue["fixed_in"]}' for issue in version_issues)
+    return hashlib.sha1(section.encode('utf-8')).hexdigest()
 
+def render_reports(aggregate=None, views=REPORT_VIEWS):
+    """
+    Write several markdown reports in one pass over the issues grouped by version, with the same output as
+    calling create_report_md for each of them. A view is a dict with the `filename`, `showClosed` and `showOpen`
+    arguments of create_report_md, and optionally the set of `versions` it covers (all versions by default).
+    Version sections whose issues are the same as in the previous run (see REPORT_MANIFEST) are copied from
+    the previous report instead of rendered again.
+    """
+    if aggregate is None:
+        aggregate = build_issue_aggregate()
+    issues = aggregate['issues_by_version']
+    totals = aggregate['totals']
+    current_date = datetime.now().strftime("%Y-%m-%d")
+
+    manifest = read_report_manifest()
+    section_hashes = {version: hash_report_section(issues[version]) for version in aggregate['sorted_versions']}
+
+    with ExitStack() as stack:
+        files = []
+        for view in views:
+            path = f'reports/{view["filename"]}'
+            settings = {
+                'showClosed': view['showClosed'],
+                'showOpen': view['showOpen'],
+                'versions': sorted(view['versions']) if 'versions' in view else None,
+            }
+            report_file = stack.enter_context(open_report_file(path, 'wb'))
+            report_file.write(f'# {get_report_title()}\n## Date: {current_date}\n'.encode('utf-8'))
+
+            # sections can only be copied from a report written by the previous run with the same settings
+            previous = manifest['files'].get(path)
+            previous_file = None
+            if previous and previous['settings'] == settings and os.path.exists(path) and os.path.getsize(path) == previous['size']:
+                previous_file = stack.enter_context(open(path, 'rb'))
+            files.append((view, report_file, previous_file, previous, {'settings': settings, 'sections': {}}))
+
+        for version in aggregate['sorted_versions']:
+            blocks = None
+            for view, report_file, previous_file, previous, entry in files:
+                if 'versions' in view and version not in view['versions']:
+                    continue
+                start = report_file.tell()
+                section = previous['sections'].get(version) if previous_file else None
+                if section and section[2] == section_hashes[version]:
+                    offset, length, digest = section
+                    previous_file.seek(offset)
+                    report_file.write(previous_file.read(length))
+                    entry['sections'][version] = [start, length, digest]
+                    continue
 
-        # total bugs with found_in_line
-        with open('issues_with_found_in.json', 'r') as file:
-            issues = json.load(file)
-        issues_with_found_in_line = [issue for issue in issues if issue['found_in_line'] is not None]
-        report_file.write(f'- Total Bugs with Version (but not exact version): {len(issues_with_found_in_line)}\n')
+                if blocks is None:
+                    # group the issues by state once, in the order create_report_md sorts them
+                    issues_by_state = {}
+                    for issue in issues[version]:
+                        issues_by_state.setdefault(issue['state'], []).append(issue)
+                    blocks = []
+                    for state in sorted(issues_by_state, reverse=True):
+                        lines = ''.join(
+                            f'- [{issue["title"]}]({issue["url"]}) (Fixed in {issue["fixed_in"]})\n' if issue['fixed_in'] != None
+                            else f'- [{issue["title"]}]({issue["url"]})\n'
+                            for issue in issues_by_state[state]
+                        )
+                        blocks.append((state, lines.encode('utf-8')))
+
+                printed = False
+                for state, lines in blocks:
+                    if (state == 'OPEN' and not view['showOpen']) or (state == 'CLOSED' and not view['showClosed']):
+                        continue
+                    if not printed:
+                        report_file.write(f'## {version}\n'.encode('utf-8'))
+                        printed = True
+                    if view['showClosed'] and view['showOpen']:
+                        report_file.write(f'### {state}\n'.encode('utf-8'))
+                    report_file.write(lines)
+                entry['sections'][version] = [start, report_file.tell() - start, section_hashes[version]]
+
+        for view, report_file, previous_file, previous, entry in files:
+            report_file.write((f'## Stats\n'
+                               f'- Total Bugs Scanned: {totals["scanned"]}\n'
+                               f'- Total Open Bugs: {totals["open"]}\n'
+                               f'- Total Closed Bugs: {totals["closed"]}\n'
+                               f'- Total Bugs with Version: {totals["with_version"]}\n'
+                               f'- Total Bugs with Version and OPEN state: {totals["open_with_version"]}\n'
+                               f'- Total Bugs with Version (but not exact version): {totals["with_version_line"]}\n').encode('utf-8'))
+            entry['size'] = report_file.tell()
+            manifest['files'][f'reports/{view["filename"]}'] = entry
+
+    with open_report_file(REPORT_MANIFEST) as file:
+        json.dump(manifest, file, indent=4, sort_keys=True)
+
+def get_history_week(now=None):
+    """
+    Returns the Monday of the week of `now` (default today, UTC), the key of the history rows of a run.
+    """
+    today = (now or datetime.now(timezone.utc)).date()
+    return (today - timedelta(days=today.weekday())).isoformat()
 
-def update_issues_json_with_new_issues(issues):
-    # get issues from issues.json
-    try:
-        with open('issues.json', 'r') as file:
-            old_issues = json.load(file)
-    except FileNotFoundError:
-        old_issues = []
+def get_major_minor_version(version):
+    return version if version == 'No Version' else '.'.join(version.split('.')[:2])
 
-    # merge old and new issues
-    merged_issues = issues + old_issues
+# the weekly history outlives issues.db: every change recorded is appended to this file, which is committed with the
+# reports, and the history tables of the store are rebuilt from it
+VERSION_HISTORY_FILE = 'reports/version_history.csv'
+
+def read_version_history_file():
+    """
+    Read the rows of the history file as (version, major_minor, week, open_delta, closed_delta) tuples,
+    in the order they were appended. Returns an empty list when there is no history file yet.
+    """
+    if not os.path.exists(VERSION_HISTORY_FILE):
+        return []
+    rows = []
+    with open(VERSION_HISTORY_FILE, 'r', encoding='utf-8') as csv_file:
+        next(csv_file, None)
+        for line in csv_file:
+            if not line.strip():
+                continue
+            week, version, open_delta, closed_delta = line.rstrip('\n').split(', ')
+            rows.append((version, get_major_minor_version(version), week, int(open_delta), int(closed_delta)))
+    return rows
+
+def append_version_history_file(deltas):
+    os.makedirs(os.path.dirname(VERSION_HISTORY_FILE), exist_ok=True)
+    new_file = not os.path.exists(VERSION_HISTORY_FILE)
+    with open(VERSION_HISTORY_FILE, 'a', encoding='utf-8') as csv_file:
+        if new_file:
+            csv_file.write('Week, Version, Open Delta, Closed Delta\n')
+        for version, _, week, open_delta, closed_delta in deltas:
+            csv_file.write(f'{week}, {version}, {open_delta}, {closed_delta}\n')
+
+def apply_version_history_rows(store, rows, applied):
+    """
+    Add history rows to the version_history and version_counts tables of the store, `applied` is the number of rows
+    of the history file the store has with them.
+    """
+    store.executemany('''
+        INSERT INTO version_history (version, major_minor, week, open_delta, closed_delta) VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (version, week) DO UPDATE SET
+            open_delta = open_delta + excluded.open_delta, closed_delta = closed_delta + excluded.closed_delta
+    ''', rows)
+    # a change undone within the week leaves nothing to store
+    store.executemany('DELETE FROM version_history WHERE week = ? AND open_delta = 0 AND closed_delta = 0', {(row[2],) for row in rows})
+    store.executemany('''
+        INSERT INTO version_counts (version, open, closed) VALUES (?, ?, ?)
+        ON CONFLICT (version) DO UPDATE SET open = open + excluded.open, closed = closed + excluded.closed
+    ''', [(version, open_delta, closed_delta) for version, _, _, open_delta, closed_delta in rows])
+    store.execute("INSERT OR REPLACE INTO sync_state (key, value) VALUES ('history:rows', ?)", (str(applied),))
+
+def restore_version_history(store):
+    """
+    Bring the history tables of the store up to date with the history file. A new store, e.g. when the cache of the
+    workflow was evicted, gets the whole history, a store from an older run the rows appended since. Without a
+    history file, the history of the store is written to a new one.
+    Returns the number of rows of the history file.
+    """
+    row = store.execute("SELECT value FROM sync_state WHERE key = 'history:rows'").fetchone()
+    applied = int(row['value']) if row else 0
+    with store:
+        if not os.path.exists(VERSION_HISTORY_FILE):
+            history = [tuple(row) for row in store.execute(
+                'SELECT version, major_minor, week, open_delta, closed_delta FROM version_history ORDER BY week, version'
+            )]
+            if history:
+                append_version_history_file(history)
+            store.execute("INSERT OR REPLACE INTO sync_state (key, value) VALUES ('history:rows', ?)", (str(len(history)),))
+            return len(history)
+        rows = read_version_history_file()
+        if applied > len(rows):
+            # the file lost rows the store has, the file wins
+            store.execute('DELETE FROM version_history')
+            store.execute('DELETE FROM version_counts')
+            applied = 0
+        if applied < len(rows):
+            apply_version_history_rows(store, rows[applied:], len(rows))
+            print(f'History: restored {len(rows) - applied} rows from {VERSION_HISTORY_FILE}')
+    return len(rows)
+
+def record_version_history(aggregate=None, week=None):
+    """
+    Add the open and closed counts per version of this run to the weekly history. Only the change since the
+    counts of the latest recorded week is stored, a second run in the same week updates the change of that week.
+    The changes are appended to the history file as well, see `restore_version_history`.
+    Returns the number of versions whose counts changed.
+    """
+    if aggregate is None:
+        aggregate = build_issue_aggregate()
+    if week is None:
+        week = get_history_week()
+    counts = {version: (version_counts['OPEN'], version_counts['CLOSED']) for version, version_counts in aggregate['versions'].items()}
+
+    with closing(open_issue_store()) as store:
+        applied = restore_version_history(store)
+        latest = store.execute('SELECT MAX(week) FROM version_history').fetchone()[0]
+        if latest is not None and week < latest:
+            print(f'History: week {week} is older than the latest recorded week {latest}, not recorded')
+            return 0
+
+        previous = {row['version']: (row['open'], row['closed']) for row in store.execute('SELECT version, open, closed FROM version_counts')}
+        deltas = []
+        for version in sorted(counts.keys() | previous.keys()):
+            open_count, closed_count = counts.get(version, (0, 0))
+            previous_open, previous_closed = previous.get(version, (0, 0))
+            if (open_count, closed_count) != (previous_open, previous_closed):
+                deltas.append((version, get_major_minor_version(version), week, open_count - previous_open, closed_count - previous_closed))
+
+        if deltas:
+            # the file first, a failed run leaves a row the store doesn't have yet and gets on the next run
+            append_version_history_file(deltas)
+            with store:
+                apply_version_history_rows(store, deltas, applied + len(deltas))
+    print(f'History: {len(deltas)} versions changed in the week of {week}')
+    return len(deltas)
+
+def get_version_history(version=None, major_minor=None):
+    """
+    Get the weekly open and closed counts of a version, or of all versions of a major.minor version.
+    Only the history rows of that version are read and summed up.
+    Returns a list of {'week', 'open', 'closed'} dicts, oldest first, with a week for every change.
+    """
+    if major_minor is not None:
+        condition, value = 'major_minor = ?', major_minor
+    else:
+        condition, value = 'version = ?', version
+    with closing(open_issue_store()) as store:
+        restore_version_history(store)
+        rows = store.execute(f'''
+            SELECT week, SUM(open_delta) AS open_delta, SUM(closed_delta) AS closed_delta
+            FROM version_history WHERE {condition} GROUP BY week ORDER BY week
+        ''', (value,)).fetchall()
+
+    history = []
+    open_count = closed_count = 0
+    for row in rows:
+        open_count += row['open_delta']
+        closed_count += row['closed_delta']
+        history.append({'week': row['week'], 'open': open_count, 'closed': closed_count})
+    return history
+
+def merge_issue_page(store, issues, counts):
+    """
+    Upsert one page of fetched issues, keyed by issue number (and url).
+    An issue replaces the stored one only when its `updatedAt` is not older, the result of every issue
+    is counted in `counts` as inserted, updated or unchanged.
+    Returns the urls of the inserted and updated issues.
+    """
+    # keep the most recent version of every issue on the page
+    incoming = {}
+    for issue in issues:
+        issue = {'updatedAt': None, 'createdAt': None, 'closedAt': None, **issue, 'number': get_issue_number(issue['url'])}
+        current = incoming.get(issue['number'])
+        if current is None or (issue['updatedAt'] or '') >= (current['updatedAt'] or ''):
+            incoming[issue['number']] = issue
+
+    # look up the stored version of every issue through the number index
+    numbers = list(incoming)
+    stored = {}
+    for i in range(0, len(numbers), 500):
+        chunk = numbers[i:i + 500]
+        rows = store.execute(
+            'SELECT number, url, title, body, state, updatedAt, createdAt, closedAt FROM issues WHERE number IN (%s)' % ','.join('?' * len(chunk)),
+            chunk
+        )
+        stored.update((row['number'], row) for row in rows)
+
+    changed = []
+    for number, issue in incoming.items():
+        old = stored.get(number)
+        if old is None:
+            counts['inserted'] += 1
+        elif old['updatedAt'] and issue['updatedAt'] and issue['updatedAt'] < old['updatedAt']:
+            # the stored version is newer than the fetched one
+            counts['unchanged'] += 1
+            continue
+        elif all(old[key] == issue[key] for key in ('url', 'title', 'body', 'state', 'updatedAt', 'createdAt', 'closedAt')):
+            counts['unchanged'] += 1
+            continue
+        else:
+            counts['updated'] += 1
+        changed.append(issue)
+
+    with store:
+        store.executemany('''
+            INSERT INTO issues (url, number, title, body, state, updatedAt, createdAt, closedAt)
+            VALUES (:url, :number, :title, :body, :state, :updatedAt, :createdAt, :closedAt)
+            ON CONFLICT (number) DO UPDATE SET
+                url = excluded.url, title = excluded.title, body = excluded.body, state = excluded.state, updatedAt = excluded.updatedAt,
+                createdAt = excluded.createdAt, closedAt = excluded.closedAt
+        ''', changed)
+    return [issue['url'] for issue in changed]
+
+def update_issues_json_with_new_issues(issue_pages):
+    """
+    Merge the fetched pages of issues into the issue store, one transaction per page.
+    Returns the set of urls of issues that were inserted or updated.
+    """
+    changed = set()
+    counts = {'inserted': 0, 'updated': 0, 'unchanged': 0}
+    with closing(open_issue_store()) as store:
+        for issues in issue_pages:
+            changed.update(merge_issue_page(store, issues, counts))
+    record_issues_processed('update_issues_json_with_new_issues', sum(counts.values()))
+    print(f'Merged issues: {counts["inserted"]} inserted, {counts["updated"]} updated, {counts["unchanged"]} unchanged')
+    return changed
+
+def build_search_query(text):
+    """
+    Turn a search into an FTS5 query: "quoted words" are a phrase, every other word a token,
+    and an issue has to match all of them. Returns None if there is nothing to search for.
+    """
+    terms = []
+    for phrase, token in re.findall(r'"([^"]*)"|(\S+)', text):
+        term = phrase if phrase else token.replace('"', '')
+        if term.strip():
+            terms.append('"%s"' % term.replace('"', '""'))
+    return ' '.join(terms) if terms else None
+
+def search_issues(text, found_in=None, major_minor=None, state=None, limit=20, rank=False):
+    """
+    Search the titles and bodies of the issues through the full-text index, see build_search_query.
+    The issues can be limited to a found_in version, a major.minor version and a state.
+    Returns a list of dicts with url, title, state, found_in and fixed_in, newest issues first, or best matches
+    first with `rank` (which has to score every match, slow for words that are in most issues).
+    """
+    query = build_search_query(text)
+    if query is None:
+        return []
+    conditions = ['issues_fts MATCH ?']
+    arguments = [query]
+    if found_in is not None:
+        conditions.append('issues.found_in = ?')
+        arguments.append(found_in.lstrip('v'))
+    if major_minor is not None:
+        conditions.append("issues.found_in LIKE ? ESCAPE '\\'")
+        arguments.append(major_minor.lstrip('v').replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '.%')
+    if state is not None:
+        conditions.append('issues.state = ?')
+        arguments.append(state.upper())
+    arguments.append(limit)
+
+    if found_in is not None and not rank:
+        # the issues of one version are few, go through them with the found_in index and look each up in the full-text
+        # index, rather than go through the matches of a common word until enough of them are of that version
+        tables, order = 'issues CROSS JOIN issues_fts ON issues_fts.rowid = issues.number', 'issues.number DESC'
+    else:
+        tables, order = 'issues_fts JOIN issues ON issues.number = issues_fts.rowid', 'issues_fts.rank' if rank else 'issues_fts.rowid DESC'
+    with closing(open_issue_store()) as store:
+        rows = store.execute(f'''
+            SELECT issues.url, issues.title, issues.state, issues.found_in, issues.fixed_in
+            FROM {tables}
+            WHERE {' AND '.join(conditions)}
+            ORDER BY {order}
+            LIMIT ?
+        ''', arguments).fetchall()
+    return [dict(row) for row in rows]
+
+def get_last_sync():
+    """
+    Get the high-water mark (latest `updatedAt`) stored by the last run, or None if there was no run yet.
+    """
+    with closing(open_issue_store()) as store:
+        row = store.execute("SELECT value FROM sync_state WHERE key = 'updatedAt'").fetchone()
+    return row['value'] if row else None
+
+def get_issues_updated_since(last_sync):
+    """
+    Get the urls of the issues in the issue store updated at or after the high-water mark `last_sync`.
+    The mark only moves once the issues are processed, so these include the issues a failed run merged but didn't process.
+    """
+    with closing(open_issue_store()) as store:
+        return {row['url'] for row in store.execute('SELECT url FROM issues WHERE updatedAt >= ?', (last_sync,))}
+
+def save_last_sync():
+    """
+    Store the latest `updatedAt` of the issue store as the high-water mark for the next incremental run.
+    """
+    with closing(open_issue_store()) as store:
+        with store:
+            store.execute('''
+                INSERT OR REPLACE INTO sync_state (key, value)
+                SELECT 'updatedAt', MAX(updatedAt) FROM issues WHERE updatedAt IS NOT NULL
+            ''')
 
-    # remove duplicates
-    merged_issues = [dict(t) for t in {tuple(d.items()) for d in merged_issues}]
-    
-    # write to issues.json
-    with open('issues.json', 'w') as file:
-        json.dump(merged_issues, file, indent=4)
 def get_linked_issue(issue_url):
     # get ID from issue URL
     issue_id = issue_url.split('/')[-1]
@@ -377,7 +1626,10 @@ def get_linked_issue(issue_url):
     # get the timeline items of the issue
     query = '''
  query {
-        repository(owner: "grafana", name: "grafana") {
+        rateLimit {
+            cost
+        }
+        repository(owner: "%s", name: "%s") {
             issue(number: %s) {
               id
               timelineItems(first: 100, itemTypes: [CONNECTED_EVENT]) {
@@ -398,7 +1650,7 @@ def get_linked_issue(issue_url):
                     
                 }
             }
-    ''' % (issue_id)
+    ''' % (GITHUB_OWNER, GITHUB_REPOSITORY, issue_id)
 
     # Set up headers with the GitHub token
     headers = {
@@ -408,11 +1660,17 @@ def get_linked_issue(issue_url):
 
     # Make the GraphQL request
     try:
-        response = requests.post(github_api_url, json={'query': query}, headers=headers)
+        response = github_request('get_linked_issue', 'POST', github_api_url, json={'query': query}, headers=headers)
         response.raise_for_status()
     except requests.exceptions.RequestException as e:
         print(f"Error: {e}")
-        return
+        record_api_call('get_linked_issue', 'graphql', failed=True)
+        raise
+    if not response.json().get('data'):
+        # a response with only errors is a failed lookup, not an issue without a linked PR
+        record_api_call('get_linked_issue', 'graphql', response, failed=True)
+        raise requests.exceptions.RequestException(f"Invalid response from GitHub API: {response.json().get('errors')}")
+    record_api_call('get_linked_issue', 'graphql', response, (response.json()['data'].get('rateLimit') or {}).get('cost', 1))
     print(f'Rate Limit: {response.headers["X-RateLimit-Remaining"]}/{response.headers["X-RateLimit-Limit"]}')
     if response.json()['data']['repository']['issue']['timelineItems']['nodes']:
         return response.json()['data']['repository']['issue']['timelineItems']['nodes'][0]['subject']['url']
@@ -432,7 +1690,10 @@ def get_milestone(issue_url):
         # get the timeline items of the issue
         query = '''
         query {
-            repository(owner: "grafana", name: "grafana") {
+            rateLimit {
+                cost
+            }
+            repository(owner: "%s", name: "%s") {
                 pullRequest(number: %s) {
                     milestone {
                         title
@@ -440,13 +1701,16 @@ def get_milestone(issue_url):
                 }
             }
         }
-        ''' % (issue_id)
+        ''' % (GITHUB_OWNER, GITHUB_REPOSITORY, issue_id)
     else:
 
     # get the timeline items of the issue
         query = '''
         query {
-            repository(owner: "grafana", name: "grafana") {
+            rateLimit {
+                cost
+            }
+            repository(owner: "%s", name: "%s") {
                 issue(number: %s) {
                     milestone {
                         title
@@ -454,7 +1718,7 @@ def get_milestone(issue_url):
                 }
             }
         }
-        ''' % (issue_id)
+        ''' % (GITHUB_OWNER, GITHUB_REPOSITORY, issue_id)
 
     # Set up headers with the GitHub token
     headers = {
@@ -464,11 +1728,17 @@ def get_milestone(issue_url):
 
     # Make the GraphQL request
     try:
-        response = requests.post(github_api_url, json={'query': query}, headers=headers)
+        response = github_request('get_milestone', 'POST', github_api_url, json={'query': query}, headers=headers)
         response.raise_for_status()
     except requests.exceptions.RequestException as e:
         print(f"Error: {e}")
-        return
+        record_api_call('get_milestone', 'graphql', failed=True)
+        raise
+    if not response.json().get('data'):
+        # a response with only errors is a failed lookup, not a PR without a milestone
+        record_api_call('get_milestone', 'graphql', response, failed=True)
+        raise requests.exceptions.RequestException(f"Invalid response from GitHub API: {response.json().get('errors')}")
+    record_api_call('get_milestone', 'graphql', response, (response.json()['data'].get('rateLimit') or {}).get('cost', 1))
     
     if response.json()['data']['repository']:
         # check for issue or pull request key
@@ -486,40 +1756,337 @@ def get_milestone(issue_url):
                     return milestone['title']
             
             return None
-def find_fixed_in_version():
-    # gets all issues from issues.json
-    with open('issues.json', 'r') as file:
-        issues = json.load(file)
-
-        # for each closed issues, find linked issue and get milestone
-        for issue in issues:
-            if issue['state'] == 'CLOSED':
-                # get linked issue
-                linked_issue = get_linked_issue(issue['url'])
-                if linked_issue:
-                    # get milestone
-                    if linked_issue != None:
-                        milestone = get_milestone(linked_issue)
-                        if milestone:
-                            # add milestone to issue
-                            issue['fixed_in'] = milestone
-                        else:
-                            issue['fixed_in'] = None
-                    else:
-                            issue['fixed_in'] = None
-                else:
-                        issue['fixed_in'] = None
-            else:
-                issue['fixed_in'] = None
-    return issues
 
-def fetch_a_list_of_tags_from_github():
+def get_linked_milestone(issue_url):
+    """
+    Look up the PR (or issue) linked to a closed issue and its milestone, with one request for each.
+    Returns a tuple of (linked url or None, milestone title or None), raises RequestException when it could not be looked up.
+    """
+    # get linked issue
+    linked_issue = get_linked_issue(issue_url)
+    if linked_issue:
+        # get milestone
+        return linked_issue, get_milestone(linked_issue) or None
+    return None, None
+
+def get_fixed_in_version(issue_url):
+    """
+    Resolve the milestone of the PR (or issue) linked to a closed issue.
+    Returns the milestone title or None, raises RequestException when it could not be looked up.
+    """
+    return get_linked_milestone(issue_url)[1]
+
+def get_fixed_in_versions_batch(issue_urls):
+    """
+    Resolve the fixed-in milestone for many issues with a single GraphQL request.
+    Each issue is fetched through an aliased `issue(number: N)` field, and the milestone of the
+    connected PR (or the PR that closed the issue) is read inline, so no second request is needed.
+    Returns a tuple of (dict of issue url -> (linked url or None, milestone title or None), rate limit cost,
+    number of issues linked through a connected event, which the per-issue path finds as well).
+    """
+    # GitHub GraphQL API endpoint
+    github_api_url = 'https://api.github.com/graphql'
+
+    # Your GitHub personal access token
+    token = os.environ.get('GH_TOKEN')
+
+    issue_fields = ''
+    for issue_url in issue_urls:
+        issue_id = issue_url.split('/')[-1]
+        issue_fields += '''
+            issue_%s: issue(number: %s) {
+                timelineItems(first: 100, itemTypes: [CONNECTED_EVENT, CLOSED_EVENT]) {
+                    nodes {
+                        __typename
+                        ... on ConnectedEvent {
+                            subject {
+                                ... on Issue {
+                                    url
+                                    milestone {
+                                        title
+                                    }
+                                }
+                                ... on PullRequest {
+                                    url
+                                    milestone {
+                                        title
+                                    }
+                                }
+                            }
+                        }
+                        ... on ClosedEvent {
+                            closer {
+                                ... on PullRequest {
+                                    url
+                                    milestone {
+                                        title
+                                    }
+                                }
+                            }
+                        }
+                    }
+                }
+            }''' % (issue_id, issue_id)
+
+    query = '''
+    query {
+        rateLimit {
+            cost
+            remaining
+            resetAt
+        }
+        repository(owner: "%s", name: "%s") {%s
+        }
+    }
+    ''' % (GITHUB_OWNER, GITHUB_REPOSITORY, issue_fields)
 
-    # check if a tags file exists first, or if --no-cache is passed
-    if os.path.exists('tags.json') and '--no-cache' not in sys.argv:
-        with open('tags.json', 'r') as file:
-            return json.load(file)
+    # Set up headers with the GitHub token
+    headers = {
+        'Authorization': f'Bearer {token}',
+        'Content-Type': 'application/json',
+    }
+
+    # Make the GraphQL request
+    try:
+        response = github_request('get_fixed_in_versions_batch', 'POST', github_api_url, json={'query': query}, headers=headers)
+        response.raise_for_status()
+    except requests.exceptions.RequestException as e:
+        print(f"Error: {e}")
+        record_api_call('get_fixed_in_versions_batch', 'graphql', failed=True)
+        return {}, 0, 0
+
+    payload = response.json()
+    data = payload.get('data') or {}
+    if data.get('repository') is None:
+        # without the repository every issue would look unlinked, leave the batch unresolved instead
+        print(f"Error: {payload.get('errors')}")
+        record_api_call('get_fixed_in_versions_batch', 'graphql', response, failed=True)
+        return {}, 0, 0
+    repository_data = data['repository']
+    rate_limit = data.get('rateLimit') or {}
+    cost = rate_limit.get('cost', 1)
+    record_api_call('get_fixed_in_versions_batch', 'graphql', response, cost)
+    update_rate_budget('graphql', rate_limit.get('remaining'), rate_limit.get('resetAt'))
+
+    links_by_url = {}
+    connected = 0
+    for issue_url in issue_urls:
+        issue_id = issue_url.split('/')[-1]
+        # an issue can be null when it was deleted or transferred
+        issue_data = repository_data.get(f'issue_{issue_id}') or {}
+        nodes = (issue_data.get('timelineItems') or {}).get('nodes') or []
+
+        # same as the per-issue path: the first connected PR or issue wins
+        subject = next((node['subject'] for node in nodes if node.get('__typename') == 'ConnectedEvent' and node.get('subject')), None)
+        if subject is not None:
+            connected += 1
+        else:
+            # otherwise fall back to the last PR that closed the issue
+            closers = [node['closer'] for node in nodes if node.get('__typename') == 'ClosedEvent' and node.get('closer')]
+            subject = closers[-1] if closers else None
+
+        if subject:
+            links_by_url[issue_url] = (subject.get('url'), (subject.get('milestone') or {}).get('title'))
+        else:
+            links_by_url[issue_url] = (None, None)
+
+    print(f'Rate Limit: {rate_limit.get("remaining")} (batch of {len(issue_urls)} cost {cost})')
+    return links_by_url, cost, connected
+
+def print_fixed_in_savings(totals):
+    """
+    Print how many requests and rate limit points the batched resolver saved compared to the per-issue path.
+    """
+    # the per-issue path makes one request for the linked issue and one more for the milestone if there is one,
+    # every one of them costs at least one point. It only sees connected events, so `linked` leaves out the
+    # issues the batch linked through the PR that closed them
+    per_issue_requests = totals['issues'] + totals['linked']
+    print(f'Fixed-in: resolved {totals["issues"]} issues in {totals["requests"]} requests ({totals["points"]} points)')
+    print(f'Fixed-in: per-issue path would need {per_issue_requests} requests ({per_issue_requests} points), '
+          f'saved {per_issue_requests - totals["requests"]} requests and {per_issue_requests - totals["points"]} points')
+
+def find_fixed_in_versions_batched(issue_urls, batch_size=None, concurrency=None, totals=None):
+    """
+    Resolve fixed-in milestones for a list of issue urls in batches, running the batches concurrently.
+    Request and point counts are added to `totals`, if no totals are passed the savings are printed right away.
+    Returns a dict of issue url -> (linked url or None, milestone title or None), issues of failed batches are left out.
+    """
+    if batch_size is None:
+        batch_size = int(get_cli_option('--batch-size', DEFAULT_FIXED_IN_BATCH_SIZE))
+    if concurrency is None:
+        concurrency = get_concurrency()
+
+    print_totals = totals is None
+    if totals is None:
+        totals = {'issues': 0, 'requests': 0, 'points': 0, 'linked': 0}
+
+    batches = [issue_urls[i:i + batch_size] for i in range(0, len(issue_urls), batch_size)]
+
+    links_by_url = {}
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for batch_result, batch_cost, batch_connected in executor.map(get_fixed_in_versions_batch, batches):
+            links_by_url.update(batch_result)
+            totals['points'] += batch_cost
+            totals['linked'] += batch_connected
+    totals['issues'] += len(issue_urls)
+    totals['requests'] += len(batches)
+
+    if print_totals:
+        print_fixed_in_savings(totals)
+    return links_by_url
+
+def resolve_fixed_in_chunk(issue_urls, concurrency, batch_size, totals):
+    """
+    Resolve the fixed_in version of a chunk of closed issues through the GitHub API.
+    Returns a dict of issue url -> (linked url or None, milestone title or None), issues that could not be looked up are left out.
+    """
+    if '--no-batch' not in sys.argv:
+        # resolve all closed issues with batched GraphQL requests
+        return find_fixed_in_versions_batched(issue_urls, batch_size, concurrency, totals)
+
+    # for each closed issues, find linked issue and get milestone, using a bounded pool of workers
+    links_by_url = {}
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [(issue_url, executor.submit(get_linked_milestone, issue_url)) for issue_url in issue_urls]
+        for issue_url, future in futures:
+            try:
+                links_by_url[issue_url] = future.result()
+            except requests.exceptions.RequestException:
+                pass
+    return links_by_url
+
+def get_memo_ttls():
+    """
+    Returns the time in seconds a memoized link or milestone is trusted, and the shorter time for a lookup that found none.
+    """
+    return (float(get_cli_option('--memo-ttl', MEMO_TTL_DAYS)) * 86400,
+            float(get_cli_option('--memo-negative-ttl', MEMO_NEGATIVE_TTL_DAYS)) * 86400)
 
+def read_fixed_in_memo(store, issue_urls):
+    """
+    Look up the fixed-in version of closed issues in the memo. A memoized link is used as long as its TTL has not expired
+    and the issue was not closed again since (a comment or a label doesn't change what closed it), the milestone of the
+    linked PR as long as its own TTL has not expired.
+    Returns a dict of issue url -> (linked url or None, milestone title or None) of the issues the memo could resolve.
+    """
+    ttl, negative_ttl = get_memo_ttls()
+    now = time.time()
+    links_by_url = {}
+    for i in range(0, len(issue_urls), 500):
+        chunk = issue_urls[i:i + 500]
+        rows = store.execute('''
+            SELECT linked_issues.url, linked_issues.linked_url, linked_issues.checked_at,
+                   milestones.milestone, milestones.checked_at AS milestone_checked_at
+            FROM linked_issues
+            JOIN issues ON issues.url = linked_issues.url AND issues.closedAt IS linked_issues.closedAt
+            LEFT JOIN milestones ON milestones.url = linked_issues.linked_url
+            WHERE linked_issues.url IN (%s)
+        ''' % ','.join('?' * len(chunk)), chunk)
+        for row in rows:
+            if now - row['checked_at'] >= (ttl if row['linked_url'] else negative_ttl):
+                continue
+            if row['linked_url'] is None:
+                links_by_url[row['url']] = (None, None)
+            elif row['milestone_checked_at'] is not None and now - row['milestone_checked_at'] < (ttl if row['milestone'] else negative_ttl):
+                links_by_url[row['url']] = (row['linked_url'], row['milestone'])
+    return links_by_url
+
+def write_fixed_in_memo(store, links_by_url):
+    """
+    Memoize looked up links and milestones, together with when the issue they were looked up for was closed.
+    """
+    now = time.time()
+    with store:
+        store.executemany('''
+            INSERT OR REPLACE INTO linked_issues (url, linked_url, closedAt, checked_at)
+            SELECT url, ?, closedAt, ? FROM issues WHERE url = ?
+        ''', [(linked_url, now, url) for url, (linked_url, _) in links_by_url.items()])
+        store.executemany('INSERT OR REPLACE INTO milestones (url, milestone, checked_at) VALUES (?, ?, ?)', [
+            (linked_url, milestone, now) for linked_url, milestone in links_by_url.values() if linked_url
+        ])
+
+def evict_fixed_in_memo(store):
+    """
+    Drop expired memo entries, links of issues that are no longer stored and milestones no link points to,
+    then the least recently checked entries above MEMO_MAX_ENTRIES.
+    """
+    ttl, negative_ttl = get_memo_ttls()
+    now = time.time()
+    with store:
+        store.execute('''
+            DELETE FROM linked_issues WHERE checked_at < ? OR (linked_url IS NULL AND checked_at < ?)
+                OR url NOT IN (SELECT url FROM issues WHERE state = 'CLOSED')
+        ''', (now - ttl, now - negative_ttl))
+        store.execute('''
+            DELETE FROM milestones WHERE checked_at < ? OR (milestone IS NULL AND checked_at < ?)
+                OR url NOT IN (SELECT linked_url FROM linked_issues WHERE linked_url IS NOT NULL)
+        ''', (now - ttl, now - negative_ttl))
+        for table in ('linked_issues', 'milestones'):
+            store.execute(f'''
+                DELETE FROM {table} WHERE url IN (
+                    SELECT url FROM {table} ORDER BY checked_at
+                    LIMIT max((SELECT COUNT(*) FROM {table}) - ?, 0)
+                )
+            ''', (MEMO_MAX_ENTRIES,))
+
+def find_fixed_in_version(concurrency=None, batch_size=None, changed_urls=None):
+    """
+    Set the fixed_in version of the closed issues in the issue store, or in incremental mode only of the changed issues
+    and of the issues whose memo entry expired. Issues are resolved in chunks and each chunk is written as soon as it is
+    resolved. Issues that could not be looked up keep their fixed_in version and are looked up again by the next
+    incremental run.
+    """
+    if concurrency is None:
+        concurrency = get_concurrency()
+    if batch_size is None:
+        batch_size = int(get_cli_option('--batch-size', DEFAULT_FIXED_IN_BATCH_SIZE))
+
+    with closing(open_issue_store()) as store:
+        # open issues are not fixed
+        with store:
+            store.execute("UPDATE issues SET fixed_in = NULL WHERE state != 'CLOSED'")
+
+        closed_issue_urls = [row['url'] for row in store.execute("SELECT url FROM issues WHERE state = 'CLOSED' ORDER BY rowid")]
+        # issues whose link and milestone are memoized don't need a request
+        memoized = {} if '--no-memo' in sys.argv else read_fixed_in_memo(store, closed_issue_urls)
+        if changed_urls is not None:
+            row = store.execute("SELECT value FROM sync_state WHERE key = 'fixed_in_unresolved'").fetchone()
+            retry_urls = set(json.loads(row['value'])) if row else set()
+            # an issue whose memo entry expired or was evicted is looked up again even though it didn't change
+            closed_issue_urls = [url for url in closed_issue_urls if url in changed_urls or url in retry_urls or url not in memoized]
+            memoized = {url: link for url, link in memoized.items() if url in changed_urls or url in retry_urls}
+        record_issues_processed('find_fixed_in_version', len(closed_issue_urls))
+        with store:
+            store.executemany('UPDATE issues SET fixed_in = ? WHERE url = ?', [(milestone, url) for url, (_, milestone) in memoized.items()])
+        closed_issue_urls = [url for url in closed_issue_urls if url not in memoized]
+        print(f'Fixed-in: {len(memoized)} issues resolved from the memo, {len(closed_issue_urls)} to look up')
+
+        totals = {'issues': 0, 'requests': 0, 'points': 0, 'linked': 0}
+        unresolved = []
+        # enough issues to keep every worker busy with a full batch
+        chunk_size = batch_size * concurrency
+        for i in range(0, len(closed_issue_urls), chunk_size):
+            chunk = closed_issue_urls[i:i + chunk_size]
+            links_by_url = resolve_fixed_in_chunk(chunk, concurrency, batch_size, totals)
+            unresolved += [url for url in chunk if url not in links_by_url]
+            with store:
+                store.executemany('UPDATE issues SET fixed_in = ? WHERE url = ?', [(milestone, url) for url, (_, milestone) in links_by_url.items()])
+            write_fixed_in_memo(store, links_by_url)
+
+        with store:
+            store.execute("INSERT OR REPLACE INTO sync_state (key, value) VALUES ('fixed_in_unresolved', ?)", (json.dumps(unresolved),))
+        evict_fixed_in_memo(store)
+
+    if '--no-batch' not in sys.argv and totals['issues']:
+        print_fixed_in_savings(totals)
+    if unresolved:
+        print(f'Fixed-in: {len(unresolved)} issues could not be looked up, their fixed_in version was left as it was')
+
+def fetch_tags_page(startswith, page_size):
+    """
+    Fetch one page of tags, newest first, after the cursor `startswith`.
+    Returns a tuple of (tag names, pageInfo, dict of tag name -> date), tag names is None when the request failed.
+    """
     # GitHub GraphQL API endpoint
     github_api_url = 'https://api.github.com/graphql'
 
@@ -527,21 +2094,42 @@ def fetch_a_list_of_tags_from_github():
     token = os.environ.get('GH_TOKEN')
 
     # Your GitHub repository owner and name
-    owner = 'grafana'
-    repo_name = 'grafana'
+    owner = GITHUB_OWNER
+    repo_name = GITHUB_REPOSITORY
 
-    # GraphQL query to fetch issues with label "type/bug"
+    arguments = 'refPrefix: "refs/tags/", query: "%s", first: %d, orderBy: {field: TAG_COMMIT_DATE, direction: DESC}' % (TAG_PREFIX, page_size)
+    if startswith != None:
+        arguments += ', after: "%s"' % startswith
+
+    # GraphQL query to fetch the tags of the repository
     query = '''
     query {
+        rateLimit {
+            cost
+        }
         repository(owner: "%s", name: "%s") {
-            refs(refPrefix: "refs/tags/", first: 100, orderBy: {field: TAG_COMMIT_DATE, direction: DESC}) {
+            refs(%s) {
+                pageInfo {
+                    hasNextPage
+                    endCursor
+                }
                 nodes {
                     name
+                    target {
+                        ... on Commit {
+                            committedDate
+                        }
+                        ... on Tag {
+                            tagger {
+                                date
+                            }
+                        }
+                    }
                 }
             }
         }
     }
-    ''' % (owner, repo_name)
+    ''' % (owner, repo_name, arguments)
 
     # Set up headers with the GitHub token
     headers = {
@@ -551,39 +2139,142 @@ def fetch_a_list_of_tags_from_github():
 
     # Make the GraphQL request
     try:
-        response = requests.post(github_api_url, json={'query': query}, headers=headers)
+        response = github_request('fetch_tags_page', 'POST', github_api_url, json={'query': query}, headers=headers)
         response.raise_for_status()
     except requests.exceptions.RequestException as e:
         print(f"Error: {e}")
-        return
+        record_api_call('fetch_tags_page', 'graphql', failed=True)
+        return None, None, None
 
     # Parse the response and extract relevant information
     data = response.json()
     try:
-        tags = data['data']['repository']['refs']['nodes']
-    except KeyError:
+        refs = data['data']['repository']['refs']
+        tags = [tag['name'] for tag in refs['nodes']]
+    except (KeyError, TypeError):
         print("Error: Invalid response from GitHub API")
-        return []
-    
-    # remove any tag that doesn't match the pattern v\d+\.\d+\.\d+
-    tags = [tag for tag in tags if re.match(r'v\d+\.\d+\.\d+', tag['name'])]
+        record_api_call('fetch_tags_page', 'graphql', response, failed=True)
+        return None, None, None
+    record_api_call('fetch_tags_page', 'graphql', response, (data['data'].get('rateLimit') or {}).get('cost', 1))
+
+    # annotated tags have the date they were tagged, lightweight tags the date of their commit
+    dates = {}
+    for tag in refs['nodes']:
+        target = tag.get('target') or {}
+        date = (target.get('tagger') or {}).get('date') or target.get('committedDate')
+        if date:
+            dates[tag['name']] = date
+    return tags, refs['pageInfo'], dates
+
+def read_tags_cache():
+    """
+    Read tags.json. Returns a dict with the tag names, their dates and whether the list holds the full tag history,
+    or None if there is no cache yet.
+    """
+    if not os.path.exists('tags.json'):
+        return None
+    with open('tags.json', 'r') as file:
+        cache = json.load(file)
+    if isinstance(cache, list):
+        # older caches are a plain list of the latest 100 tags without dates, the next --no-cache run fetches the full history
+        return {'complete': False, 'tags': cache, 'dates': {}}
+    if 'dates' not in cache:
+        # caches written before the tag dates were fetched, the full fetch gets the dates of the older tags as well
+        return {**cache, 'complete': False, 'dates': {}}
+    if any(tag not in cache['dates'] for tag in cache['tags']):
+        # tags without a date, e.g. a cache migrated with empty dates, are backfilled by the full fetch as well.
+        # a tag GitHub has no date for is kept with None, so it doesn't ask for the full fetch again
+        return {**cache, 'complete': False}
+    return cache
+
+def get_tags_checked_at():
+    """
+    Get when the tags were last checked, kept in the issue store so tags.json only changes with the tags.
+    """
+    with closing(open_issue_store()) as store:
+        row = store.execute("SELECT value FROM sync_state WHERE key = 'tags:checked_at'").fetchone()
+    return datetime.fromisoformat(row['value']) if row else None
 
-    # change this to just an array of names
-    tags = [tag['name'] for tag in tags]
+def save_tags_checked_at():
+    with closing(open_issue_store()) as store:
+        with store:
+            store.execute("INSERT OR REPLACE INTO sync_state (key, value) VALUES ('tags:checked_at', ?)", (datetime.now(timezone.utc).isoformat(),))
+
+def fetch_a_list_of_tags_from_github():
+    """
+    Get every release tag (v1.2.3, or TAG_PREFIX and the version) of the repository, newest first, cached in tags.json.
+    Without --no-cache the cache is used as is. With --no-cache only the tags newer than the cache are fetched,
+    which is a single small request when there is no new release, and the full tag history when the cache is
+    incomplete or with --refresh-tags.
+    """
+    cache = read_tags_cache()
+    full_refresh = cache is None or not cache['complete'] or '--refresh-tags' in sys.argv
+
+    if cache is not None and '--no-cache' not in sys.argv and '--refresh-tags' not in sys.argv:
+        return cache['tags']
+
+    if not full_refresh:
+        # don't check again when a run a moment ago already did
+        checked_at = get_tags_checked_at()
+        if checked_at and (datetime.now(timezone.utc) - checked_at).total_seconds() < TAGS_RECHECK_SECONDS:
+            return cache['tags']
+
+    known_tags = set() if full_refresh else set(cache['tags'])
+    new_tags = []
+    dates = {} if full_refresh else dict(cache['dates'])
+    cursor = None
+    # the first request of an incremental refresh only needs to see the newest few tags
+    page_size = 100 if full_refresh else 10
+    while True:
+        tags, page_info, page_dates = fetch_tags_page(cursor, page_size)
+        if tags is None:
+            # keep using what we have rather than dropping releases
+            return cache['tags'] if cache else []
+
+        # remove any tag that isn't a release, TAG_PREFIX followed by \d+\.\d+\.\d+
+        tags = [tag for tag in tags if re.match(re.escape(TAG_PREFIX) + r'\d+\.\d+\.\d+', tag)]
+
+        # stop at the first tag that is already cached, everything after it is as well
+        reached_cache = False
+        for tag in tags:
+            if tag in known_tags:
+                reached_cache = True
+                break
+            new_tags.append(tag)
+            dates[tag] = page_dates.get(tag)
 
-    # save the tags file to tags.json
+        if reached_cache or not page_info['hasNextPage']:
+            break
+        print(f'Tags: fetched {len(new_tags)} new tags so far')
+        cursor = page_info['endCursor']
+        page_size = 100
+
+    if full_refresh:
+        tags = new_tags
+    else:
+        tags = new_tags + cache['tags']
+    print(f'Tags: {len(new_tags)} new, {len(tags)} total')
+
+    # save the tags file to tags.json, it is committed, so when the tags were checked is kept in the issue store
     with open('tags.json', 'w') as file:
-        json.dump(tags, file, indent=4)
-    
+        json.dump({'complete': True, 'tags': tags, 'dates': dates}, file, indent=4)
+    save_tags_checked_at()
+
     return tags
 
+def strip_tag_prefix(version_string):
+    # release tags are TAG_PREFIX and the version (v11.4.2, mimir-2.10.0), found-in versions and milestones have no prefix
+    if TAG_PREFIX and version_string.startswith(TAG_PREFIX):
+        return version_string[len(TAG_PREFIX):]
+    return version_string.lstrip('v')
+
 def parse_version_for_sorting(version_string):
     """
     Parse a version string (e.g., 'v11.4.2+security-01' or '11.4.2') and return a tuple for sorting.
     Handles special formats like +security, -preview, etc.
     """
     # Remove 'v' prefix if present
-    version = version_string.lstrip('v')
+    version = strip_tag_prefix(version_string)
     
     # Split by dots
     parts = version.split('.')
@@ -608,7 +2299,7 @@ def normalize_version_for_comparison(version_string):
     Returns the base version (e.g., '11.4.2' from 'v11.4.2+security-01')
     """
     # Remove 'v' prefix
-    version = version_string.lstrip('v')
+    version = strip_tag_prefix(version_string)
     
     # Split by dots
     parts = version.split('.')
@@ -674,23 +2365,72 @@ def get_prior_release(release_version, known_release_versions):
     
     return best_match
     
+def build_release_index(known_release_versions):
+    """
+    Build an index of the known releases to find prior releases without scanning every version.
+    Versions are parsed once and bucketed by major.minor, the buckets are kept in sorted order for bisect.
+    Like get_prior_release, the first version in the list wins when several have the same parsed version
+    (e.g. v11.4.2 and v11.4.2+security-01).
+    """
+    buckets = {}
+    for version in known_release_versions:
+        major, minor, patch = parse_version_for_sorting(version)
+        bucket = buckets.setdefault((major, minor), {'patches': {}, 'latest': None, 'latest_patch': None})
+        if patch not in bucket['patches']:
+            bucket['patches'][patch] = version
+        if bucket['latest'] is None or patch > bucket['latest_patch']:
+            bucket['latest'] = version
+            bucket['latest_patch'] = patch
+    return {'buckets': buckets, 'major_minor_versions': sorted(buckets)}
+
+def find_prior_release(release_version, release_index):
+    """
+    Get the prior release version from a release index, same result as get_prior_release.
+    Returns the prior release version or None if not found.
+    """
+    major, minor, patch = parse_version_for_sorting(release_version)
+    buckets = release_index['buckets']
+
+    if patch > 0:
+        # Same major.minor, previous patch
+        bucket = buckets.get((major, minor))
+        return bucket['patches'].get(patch - 1) if bucket else None
+    if minor > 0:
+        # Previous minor version, the highest patch
+        bucket = buckets.get((major, minor - 1))
+        return bucket['latest'] if bucket else None
+
+    # Previous major version, the highest minor.patch is the last bucket before this major version
+    major_minor_versions = release_index['major_minor_versions']
+    position = bisect.bisect_left(major_minor_versions, (major, 0)) - 1
+    if position >= 0 and major_minor_versions[position][0] == major - 1:
+        return buckets[major_minor_versions[position]]['latest']
+    return None
+
 def get_number_of_commits_between_two_releases(release_version, prior_release_version):
     """
-    Get the number of commits between two releases using GitHub REST API.
-    Returns the number of commits between prior_release_version and release_version.
+    Get the number of commits between two releases using GitHub REST API, or the local mirror of --git-mirror.
+    Returns the number of commits between prior_release_version and release_version, or None if the lookup failed.
     """
     if not prior_release_version:
         return 0
+
+    git_mirror = get_cli_option('--git-mirror')
+    if git_mirror and os.path.exists(git_mirror):
+        commits = get_commit_counts_from_git(git_mirror, [(release_version, prior_release_version)], 1)[(release_version, prior_release_version)]
+        if commits is not None:
+            return commits
+        # the mirror doesn't have both tags, ask the compare API
     
     # GitHub REST API endpoint for comparing commits
-    github_api_url = f'https://api.github.com/repos/grafana/grafana/compare/{prior_release_version}...{release_version}'
+    github_api_url = f'https://api.github.com/repos/{GITHUB_OWNER}/{GITHUB_REPOSITORY}/compare/{prior_release_version}...{release_version}'
     
     # Your GitHub personal access token
     token = os.environ.get('GH_TOKEN')
     
-    if not token:
-        print("Warning: GH_TOKEN not set, returning 0 for commit count")
-        return 0
+    if not token and not get_cli_option('--replay'):
+        print("Warning: GH_TOKEN not set, skipping commit count")
+        return None
     
     # Set up headers with the GitHub token
     headers = {
@@ -700,8 +2440,9 @@ def get_number_of_commits_between_two_releases(release_version, prior_release_ve
     
     # Make the REST API request
     try:
-        response = requests.get(github_api_url, headers=headers)
+        response = github_request('get_number_of_commits_between_two_releases', 'GET', github_api_url, headers=headers)
         response.raise_for_status()
+        record_api_call('get_number_of_commits_between_two_releases', 'rest', response)
         
         # Print rate limit info
         print(f'Rate Limit: {response.headers["X-RateLimit-Remaining"]}/{response.headers["X-RateLimit-Limit"]}')
@@ -713,55 +2454,261 @@ def get_number_of_commits_between_two_releases(release_version, prior_release_ve
             return data['ahead_by']
         else:
             print(f"Warning: Could not get comparison data for {prior_release_version}..{release_version}")
-            return 0
+            return None
             
     except requests.exceptions.RequestException as e:
         print(f"Error getting commit count between {prior_release_version} and {release_version}: {e}")
-        return 0
+        record_api_call('get_number_of_commits_between_two_releases', 'rest', failed=True)
+        return None
     except KeyError as e:
         print(f"Error parsing response for {prior_release_version}..{release_version}: {e}")
-        return 0
+        return None
 
-def review_release_info():
-    releases = fetch_a_list_of_tags_from_github()
+def update_git_mirror(repository_path):
+    """
+    Make sure the local mirror used for commit counts exists and has the latest tags.
+    A missing mirror is created as a bare, treeless clone, which holds every commit but no file contents.
+    """
+    if not os.path.exists(repository_path):
+        print(f'Cloning {GITHUB_OWNER}/{GITHUB_REPOSITORY} into {repository_path}')
+        subprocess.run(['git', 'clone', '--bare', '--filter=tree:0', f'https://github.com/{GITHUB_OWNER}/{GITHUB_REPOSITORY}.git', repository_path], check=True)
+    else:
+        remotes = subprocess.run(['git', '-C', repository_path, 'remote'], capture_output=True, text=True, check=True).stdout.split()
+        if 'origin' in remotes:
+            subprocess.run(['git', '-C', repository_path, 'fetch', '--quiet', 'origin', '+refs/tags/*:refs/tags/*'], check=True)
+
+def get_commit_counts_from_git(repository_path, release_pairs, concurrency=None):
+    """
+    Count the commits between release pairs in a local clone or bare mirror, the same number as
+    the compare API's `ahead_by`: `git rev-list --count prior..release`.
+    All tags are resolved with a single `git for-each-ref`, then the counts run in a pool of git processes.
+    Returns a dict of (release, prior release) -> number of commits, or None when a tag is missing.
+    """
+    if concurrency is None:
+        concurrency = get_concurrency()
+
+    refs = subprocess.run(
+        ['git', '-C', repository_path, 'for-each-ref', '--format=%(refname:short)', 'refs/tags/'],
+        capture_output=True, text=True, check=True
+    ).stdout.split()
+    known_tags = set(refs)
+
+    def count(pair):
+        release_version, prior_release_version = pair
+        if release_version not in known_tags or prior_release_version not in known_tags:
+            print(f'Warning: {prior_release_version} or {release_version} is not a tag of {repository_path}')
+            return None
+        result = subprocess.run(
+            ['git', '-C', repository_path, 'rev-list', '--count', f'refs/tags/{prior_release_version}..refs/tags/{release_version}'],
+            capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            print(f'Error counting commits between {prior_release_version} and {release_version}: {result.stderr.strip()}')
+            return None
+        return int(result.stdout)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return dict(zip(release_pairs, executor.map(count, release_pairs)))
+
+def read_commit_counts_cache():
+    """
+    Read commit_counts.json, the commit counts between release pairs from earlier runs keyed by `prior...release`.
+    """
+    if not os.path.exists('commit_counts.json'):
+        return {}
+    with open('commit_counts.json', 'r') as file:
+        return json.load(file)
+
+def write_commit_counts_cache(cache):
+    with open('commit_counts.json', 'w') as file:
+        json.dump(cache, file, indent=4, sort_keys=True)
+
+def store_commit_count(cache, release_version, prior_release_version, commits):
+    key = f'{prior_release_version}...{release_version}'
+    entry = cache.get(key)
+    cache[key] = {
+        'commits': commits,
+        'checked_at': datetime.now(timezone.utc).isoformat(),
+        'retry': commits is None,
+        'attempts': (entry['attempts'] if entry else 0) + 1,
+    }
+
+def get_cached_number_of_commits(release_version, prior_release_version, cache):
+    """
+    Get the number of commits between two releases from the cache, only pairs that are not cached yet
+    or failed on an earlier run hit the API. Failed lookups are stored as retryable and return None.
+    """
+    key = f'{prior_release_version}...{release_version}'
+    entry = cache.get(key)
+    if entry and entry['commits'] is not None:
+        return entry['commits']
+
+    # commit counts between two published tags never change, so a successful lookup is cached forever
+    print(f'Getting commits between {release_version} and {prior_release_version}')
+    commits = get_number_of_commits_between_two_releases(release_version, prior_release_version)
+    store_commit_count(cache, release_version, prior_release_version, commits)
+    return commits
+
+def get_uncached_release_pairs(releases, release_index, cache):
+    """
+    List the (release, prior release) pairs whose commit count is not cached yet or failed on an earlier run.
+    """
+    release_pairs = []
+    for release in releases:
+        prior_release = find_prior_release(release, release_index)
+        entry = cache.get(f'{prior_release}...{release}')
+        if prior_release and not (entry and entry['commits'] is not None):
+            release_pairs.append((release, prior_release))
+    return release_pairs
+
+def fetch_rate_budget():
+    """
+    Get the remaining GraphQL and REST rate limits from GitHub, the rate_limit endpoint doesn't count against them.
+    """
+    token = os.environ.get('GH_TOKEN')
+    if not token and not get_cli_option('--replay'):
+        return
+    headers = {
+        'Authorization': f'Bearer {token}',
+        'Accept': 'application/vnd.github.v3+json',
+    }
+    try:
+        response = github_request('fetch_rate_budget', 'GET', 'https://api.github.com/rate_limit', headers=headers)
+        response.raise_for_status()
+    except requests.exceptions.RequestException as e:
+        print(f"Error: {e}")
+        record_api_call('fetch_rate_budget', 'rest', failed=True)
+        return
+    record_api_call('fetch_rate_budget', 'rest', response)
+    resources = response.json().get('resources') or {}
+    for api, resource in (('graphql', 'graphql'), ('rest', 'core')):
+        limit = resources.get(resource) or {}
+        update_rate_budget(api, limit.get('remaining'), limit.get('reset'))
+
+def estimate_run_cost(fetch_issues, incremental=False, pages_to_get=20, batch_size=None):
+    """
+    Estimate the GraphQL points and REST requests this run is going to need, from the issue store and the caches.
+    Returns a dict with 'graphql' points and 'rest' requests.
+    """
+    if batch_size is None:
+        batch_size = int(get_cli_option('--batch-size', DEFAULT_FIXED_IN_BATCH_SIZE))
+    graphql = 0
+    cache = read_tags_cache()
+    if fetch_issues:
+        with closing(open_issue_store()) as store:
+            closed = store.execute("SELECT COUNT(*) FROM issues WHERE state = 'CLOSED'").fetchone()[0]
+            if '--no-memo' not in sys.argv:
+                # issues memoized more recently than the shorter TTL don't need a lookup
+                closed -= store.execute('SELECT COUNT(*) FROM linked_issues WHERE checked_at >= ?', (time.time() - get_memo_ttls()[1],)).fetchone()[0]
+        if incremental:
+            # an incremental run normally needs a page of issues and a batch of fixed-in lookups, and the lookups
+            # of the issues whose memo entry expired
+            graphql += 2 + (max(closed, 0) + batch_size - 1) // batch_size
+        else:
+            # a page of 100 issues costs a point, a batch of fixed-in lookups as well
+            graphql += pages_to_get + 1 + (max(closed, 0) + batch_size - 1) // batch_size
+        # and a page of the newest tags, or the full tag history of a missing or incomplete cache
+        graphql += 1 if cache and cache['complete'] else TAG_HISTORY_PAGES
+
+    rest = 0
+    if cache and not get_cli_option('--git-mirror'):
+        releases = sorted(cache['tags'], key=parse_version_for_sorting, reverse=True)
+        rest = len(get_uncached_release_pairs(releases, build_release_index(releases), read_commit_counts_cache()))
+    return {'graphql': graphql, 'rest': rest}
+
+def plan_rate_budget(estimate):
+    """
+    Compare the estimated cost of the run with the remaining rate limits.
+    Returns True when the commit counts should be deferred to the next rate limit window,
+    fetching issues and fixed-in versions comes first.
+    """
+    if not any(estimate.values()):
+        # nothing to spend, e.g. a run of the offline stages, don't ask GitHub
+        return False
+    fetch_rate_budget()
+    with _rate_budget_lock:
+        budget = {api: dict(value) for api, value in _rate_budget.items()}
+
+    defer_commit_counts = False
+    for api, needed in estimate.items():
+        unit = 'points' if api == 'graphql' else 'requests'
+        if api not in budget or budget[api]['reset'] <= time.time():
+            print(f'Estimated cost: {needed} {api} {unit}, remaining rate limit unknown')
+            continue
+        remaining = budget[api]['remaining'] - RATE_LIMIT_RESERVE
+        reset_at = datetime.fromtimestamp(budget[api]['reset'], timezone.utc).isoformat()
+        print(f'Estimated cost: {needed} {api} {unit} of {budget[api]["remaining"]} remaining (resets at {reset_at})')
+        if needed > remaining:
+            if api == 'rest':
+                defer_commit_counts = True
+                print(f'Commit counts: deferring {needed} lookups to the next rate limit window')
+            else:
+                print(f'Rate Limit: this run will wait for the {api} rate limit to reset')
+    return defer_commit_counts
+
+def review_release_info(aggregate=None, defer_commit_counts=False, releases=None):
+    if aggregate is None:
+        aggregate = build_issue_aggregate()
+    if releases is None:
+        releases = fetch_a_list_of_tags_from_github()
 
     # sort releases by major.minor.patch using robust parsing
     releases = sorted(releases, key=parse_version_for_sorting, reverse=True)
-
-    with open('reports/release_stats.csv', 'w') as csv_file:
+    release_index = build_release_index(releases)
+    commit_counts = read_commit_counts_cache()
+
+    git_mirror = get_cli_option('--git-mirror')
+    if git_mirror:
+        # count the commits of every pair that is not cached yet in a local mirror instead of the compare API
+        release_pairs = get_uncached_release_pairs(releases, release_index, commit_counts)
+        if release_pairs:
+            update_git_mirror(git_mirror)
+            print(f'Counting commits for {len(release_pairs)} release pairs in {git_mirror}')
+            for (release, prior_release), commits in get_commit_counts_from_git(git_mirror, release_pairs).items():
+                # pairs the mirror can't resolve are looked up one by one below, which falls back to the compare API
+                if commits is not None:
+                    store_commit_count(commit_counts, release, prior_release, commits)
+
+    missing_commits = 0
+    with open_report_file('reports/release_stats.csv') as csv_file:
         csv_file.write(f'Version, Total, Open, Closed, Commits\n')
         for release in releases:
             # get the prior version
-            prior_release = get_prior_release(release, releases)
+            prior_release = find_prior_release(release, release_index)
             if prior_release == None:
                 print(f'No prior release found for {release}')
                 commits = 0
             else:
-                # fetch how many commits between the two releases
-                print(f'Getting commits between {release} and {prior_release}')
-                commits = get_number_of_commits_between_two_releases(release, prior_release)
-            # get issues from issues.json
-            with open('issues_by_version.json', 'r') as file:
-                issues = json.load(file)
-                # find this release by looking through the keys for the version
-                releaseWithoutV = release.lstrip('v')
-                if releaseWithoutV in issues:
-                    # group the issues by state
-                    open_issues = [issue for issue in issues[releaseWithoutV] if issue['state'] == 'OPEN']
-                    closed_issues = [issue for issue in issues[releaseWithoutV] if issue['state'] == 'CLOSED']
-                    csv_file.write(f'{releaseWithoutV}, {len(issues[releaseWithoutV])}, {len(open_issues)}, {len(closed_issues)}, {commits}\n')
-                else:   
-                    csv_file.write(f'{releaseWithoutV}, 0, 0, 0, {commits}\n')
+                # fetch how many commits between the two releases, unless an earlier run already did
+                entry = commit_counts.get(f'{prior_release}...{release}')
+                if defer_commit_counts and not (entry and entry['commits'] is not None):
+                    # not enough rate limit left this run, the next run looks it up
+                    commits = None
+                else:
+                    commits = get_cached_number_of_commits(release, prior_release, commit_counts)
+                if commits is None:
+                    # leave the count empty, it is retried on the next run
+                    commits = ''
+                    missing_commits += 1
+            # find this release by looking through the counts by version
+            releaseWithoutV = strip_tag_prefix(release)
+            counts = aggregate['versions'].get(releaseWithoutV, {'OPEN': 0, 'CLOSED': 0, 'total': 0})
+            csv_file.write(f'{releaseWithoutV}, {counts["total"]}, {counts["OPEN"]}, {counts["CLOSED"]}, {commits}\n')
+
+    write_commit_counts_cache(commit_counts)
+    retries = sum(1 for entry in commit_counts.values() if entry['retry'])
+    if retries:
+        print(f'Commit counts: {retries} release pairs failed and will be retried on the next run')
 
     # lets have a v2 that just groups together all the major.minor versions
     major_minor_versions = {}
     for release in releases:
-        major_minor_version = release.lstrip('v').rsplit('.', 1)[0]
+        major_minor_version = strip_tag_prefix(release).rsplit('.', 1)[0]
         if major_minor_version not in major_minor_versions:
             major_minor_versions[major_minor_version] = []
         major_minor_versions[major_minor_version].append(release)
     
-    with open('reports/major_minor_release_stats.csv', 'w') as csv_file:
+    with open_report_file('reports/major_minor_release_stats.csv') as csv_file:
         csv_file.write(f'Version, Total, Open, Closed, Commits\n')
         with open('reports/release_stats.csv', 'r') as detailed_csv:
             detailed_csv.readline()
@@ -775,28 +2722,585 @@ def review_release_info():
                     'total': int(total),
                     'open': int(open_issues),
                     'closed': int(closed),
-                    'commits': int(commits)
+                    'commits': int(commits) if commits.strip() else None
                 })
         
         for major_minor_version in major_minor_versions:
             total = sum([release['total'] for release in major_minor_versions[major_minor_version] if isinstance(release, dict)])
             open_issues_count = sum([release['open'] for release in major_minor_versions[major_minor_version] if isinstance(release, dict)])
             closed = sum([release['closed'] for release in major_minor_versions[major_minor_version] if isinstance(release, dict)])
-            commits = sum([release['commits'] for release in major_minor_versions[major_minor_version] if isinstance(release, dict)])
+            commits = [release['commits'] for release in major_minor_versions[major_minor_version] if isinstance(release, dict)]
+            # a missing commit count of one release leaves the major.minor count empty until it is retried
+            commits = '' if None in commits else sum(commits)
             csv_file.write(f'{major_minor_version}, {total}, {open_issues_count}, {closed}, {commits}\n')
+
+    # the release stats are complete once every commit count is known
+    return missing_commits == 0
         
 
+def get_sketch_bucket(seconds):
+    """
+    Returns the bucket of a duration in the quantile sketches: bucket i holds the durations between
+    SKETCH_MIN_SECONDS * SKETCH_GAMMA ** (i - 1) and SKETCH_MIN_SECONDS * SKETCH_GAMMA ** i.
+    """
+    if seconds <= SKETCH_MIN_SECONDS:
+        return 0
+    return math.ceil(math.log(seconds / SKETCH_MIN_SECONDS, SKETCH_GAMMA))
+
+def get_bucket_seconds(bucket):
+    """
+    Returns the duration a bucket stands for, within SKETCH_RELATIVE_ACCURACY of every duration in it.
+    """
+    if bucket == 0:
+        return SKETCH_MIN_SECONDS / 2
+    return SKETCH_MIN_SECONDS * 2 * SKETCH_GAMMA ** bucket / (SKETCH_GAMMA + 1)
+
+def get_sketch_quantile(sketch, quantile):
+    """
+    Returns the duration in seconds at `quantile` of a sketch (a dict of bucket -> count), or None if it is empty.
+    """
+    total = sum(sketch.values())
+    if total == 0:
+        return None
+    rank = quantile * (total - 1)
+    seen = 0
+    for bucket in sorted(sketch):
+        seen += sketch[bucket]
+        if seen > rank:
+            return get_bucket_seconds(bucket)
+    return get_bucket_seconds(max(sketch))
+
+def merge_sketches(sketches):
+    merged = {}
+    for sketch in sketches:
+        for bucket, count in sketch.items():
+            merged[bucket] = merged.get(bucket, 0) + count
+    return merged
+
+def parse_github_date(value):
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+def get_release_dates(cache):
+    """
+    Returns a dict of version (e.g. 11.4.2) -> date of its first release tag, from the tag dates of the tags cache.
+    """
+    release_dates = {}
+    for tag, date in (cache['dates'] if cache else {}).items():
+        version = normalize_version_for_comparison(tag)
+        if date is None:
+            continue
+        if version not in release_dates or date < release_dates[version]:
+            release_dates[version] = date
+    return release_dates
+
+def update_duration_sketches(tags=None):
+    """
+    Update the time-to-close and found_in to fixed_in release sketches per version with the issues that changed
+    since the last update: what a changed issue added before is taken out of the sketches and its new durations
+    are added. Only a change of the release dates goes through all issues again.
+    `tags` is the tags cache the release dates are read from, by default tags.json as it is.
+    Returns the number of issues whose durations changed.
+    """
+    release_dates = get_release_dates(read_tags_cache() if tags is None else tags)
+    release_dates_hash = hashlib.sha1(json.dumps(release_dates, sort_keys=True).encode('utf-8')).hexdigest()
+
+    with closing(open_issue_store()) as store:
+        row = store.execute("SELECT value FROM sync_state WHERE key = 'durations:release_dates'").fetchone()
+        everything = row is None or row['value'] != release_dates_hash
+        rows = store.execute('''
+            SELECT issues.url, issues.state, issues.createdAt, issues.closedAt, issues.found_in,
+                   issues.found_in_line IS NOT NULL AS has_found_in_line, issues.fixed_in,
+                   issue_durations.url AS recorded, issue_durations.version, issue_durations.close_bucket, issue_durations.fix_bucket
+            FROM issues LEFT JOIN issue_durations ON issue_durations.url = issues.url
+            WHERE ? OR issue_durations.url IS NULL OR issue_durations.state IS NOT issues.state
+                OR issue_durations.createdAt IS NOT issues.createdAt OR issue_durations.closedAt IS NOT issues.closedAt
+                OR issue_durations.found_in IS NOT issues.found_in OR issue_durations.fixed_in IS NOT issues.fixed_in
+                OR issue_durations.has_found_in_line IS NOT (issues.found_in_line IS NOT NULL)
+        ''', (everything,)).fetchall()
+        removed = store.execute('''
+            SELECT url, version, close_bucket, fix_bucket FROM issue_durations WHERE url NOT IN (SELECT url FROM issues)
+        ''').fetchall()
+
+        # the change of the count of every (metric, version, bucket)
+        changes = {}
+        def count(version, close_bucket, fix_bucket, change):
+            if version is None:
+                return
+            for metric, bucket in (('close', close_bucket), ('fix', fix_bucket)):
+                if bucket is not None:
+                    changes[(metric, version, bucket)] = changes.get((metric, version, bucket), 0) + change
+
+        durations = []
+        changed = 0
+        for row in rows:
+            # the same grouping as build_issue_aggregate, issues with a version line but no exact version are left out
+            if row['found_in'] is not None:
+                version = row['found_in']
+            elif not row['has_found_in_line']:
+                version = 'No Version'
+            else:
+                version = None
+
+            close_bucket = fix_bucket = None
+            if version is not None and row['state'] == 'CLOSED' and row['createdAt'] and row['closedAt']:
+                seconds = (parse_github_date(row['closedAt']) - parse_github_date(row['createdAt'])).total_seconds()
+                close_bucket = get_sketch_bucket(max(seconds, 0))
+            found_date = release_dates.get(row['found_in'])
+            fixed_date = release_dates.get(row['fixed_in'])
+            if found_date and fixed_date:
+                seconds = (parse_github_date(fixed_date) - parse_github_date(found_date)).total_seconds()
+                # a fix released before the version it was found in is a backport, not a time to fix
+                if seconds >= 0:
+                    fix_bucket = get_sketch_bucket(seconds)
+
+            if not row['recorded'] or (row['version'], row['close_bucket'], row['fix_bucket']) != (version, close_bucket, fix_bucket):
+                if row['recorded']:
+                    count(row['version'], row['close_bucket'], row['fix_bucket'], -1)
+                count(version, close_bucket, fix_bucket, 1)
+                changed += 1
+            durations.append((row['url'], row['state'], row['createdAt'], row['closedAt'], row['found_in'], row['has_found_in_line'],
+                              row['fixed_in'], version, close_bucket, fix_bucket))
+        for row in removed:
+            count(row['version'], row['close_bucket'], row['fix_bucket'], -1)
+            changed += 1
+
+        changes = [(metric, version, bucket, change) for (metric, version, bucket), change in changes.items() if change != 0]
+        with store:
+            store.executemany('''
+                INSERT INTO duration_sketches (metric, version, bucket, count) VALUES (?, ?, ?, ?)
+                ON CONFLICT (metric, version, bucket) DO UPDATE SET count = count + excluded.count
+            ''', changes)
+            store.execute('DELETE FROM duration_sketches WHERE count <= 0')
+            store.executemany('INSERT OR REPLACE INTO issue_durations VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', durations)
+            store.executemany('DELETE FROM issue_durations WHERE url = ?', [(row['url'],) for row in removed])
+            store.execute("INSERT OR REPLACE INTO sync_state (key, value) VALUES ('durations:release_dates', ?)", (release_dates_hash,))
+            if changes:
+                store.execute("INSERT INTO sync_state (key, value) VALUES ('revision:durations', 1) ON CONFLICT (key) DO UPDATE SET value = value + 1")
+
+    record_issues_processed('update_duration_sketches', len(rows))
+    print(f'Durations: {changed} issues changed, {len(changes)} sketch buckets updated')
+    return changed
+
+def get_duration_stats():
+    """
+    Get the median and p90 time to close and time from the found_in to the fixed_in release, in days, per version
+    and per major.minor version, whose sketch is merged from the sketches of its versions.
+    Returns a dict with 'versions' and 'major_minor_versions', each a dict of version -> metric -> (median, p90).
+    """
+    sketches = {}
+    with closing(open_issue_store()) as store:
+        for row in store.execute('SELECT metric, version, bucket, count FROM duration_sketches'):
+            sketches.setdefault(row['version'], {}).setdefault(row['metric'], {})[row['bucket']] = row['count']
+
+    major_minor_sketches = {}
+    for version, version_sketches in sketches.items():
+        for metric, sketch in version_sketches.items():
+            major_minor_sketches.setdefault(get_major_minor_version(version), {}).setdefault(metric, []).append(sketch)
+
+    def days(sketch):
+        return tuple(
+            None if seconds is None else seconds / 86400
+            for seconds in (get_sketch_quantile(sketch, 0.5), get_sketch_quantile(sketch, 0.9))
+        )
+    return {
+        'versions': {
+            version: {metric: days(sketch) for metric, sketch in version_sketches.items()}
+            for version, version_sketches in sketches.items()
+        },
+        'major_minor_versions': {
+            version: {metric: days(merge_sketches(metric_sketches)) for metric, metric_sketches in version_sketches.items()}
+            for version, version_sketches in major_minor_sketches.items()
+        },
+    }
+
+# the columns format_duration_columns adds to the CSV files of the stats
+DURATION_COLUMNS = 'Median Days To Close, P90 Days To Close, Median Days Found To Fixed, P90 Days Found To Fixed'
+
+def format_duration_columns(durations):
+    """
+    Format the median and p90 days to close and from the found_in to the fixed_in release of a version as CSV columns.
+    """
+    columns = []
+    for metric in ('close', 'fix'):
+        for days in durations.get(metric, (None, None)):
+            columns.append('' if days is None else f'{days:.1f}')
+    return ', '.join(columns)
+
+def run_fetch_stage(context):
+    last_sync = get_last_sync() if '--incremental' in sys.argv else None
+    if last_sync:
+        # only fetch the issues updated since the last run and process every issue updated since then again,
+        # not only those this merge changed, which would leave out the issues of a run that failed after the merge
+        print(f'Fetching issues updated since {last_sync}')
+        update_issues_json_with_new_issues(fetch_github_issues(MAX_INCREMENTAL_PAGES, last_sync))
+        context['changed_urls'] = get_issues_updated_since(last_sync)
+    else:
+        update_issues_json_with_new_issues(fetch_github_issues(20))
+
+def get_changed_urls(context, name):
+    # after a change of its code a stage goes through every issue again, not only the changed ones
+    return None if name in context['full_pass'] else context['changed_urls']
+
+def run_fixed_in_stage(context):
+    find_fixed_in_version(changed_urls=get_changed_urls(context, 'fixed-in'))
+
+def run_extract_stage(context):
+    find_grafana_version(get_changed_urls(context, 'extract'))
+
+def run_sync_stage(context):
+    # the fixed-in and found-in versions of everything fetched are up to date, the next incremental run can start from here
+    save_last_sync()
+
+def run_snapshot_stage(context):
+    record_issues_processed('write_issue_snapshot', write_issue_snapshot())
+
+def get_pipeline_aggregate(context):
+    # build the counts and groups once, every stats file and report is rendered from it, read from the snapshot if it is up to date
+    with context['lock']:
+        if context['aggregate'] is None:
+            context['aggregate'] = build_issue_aggregate()
+        return context['aggregate']
+
+def run_tags_stage(context):
+    fetch_a_list_of_tags_from_github()
+    with context['lock']:
+        context['tags'] = read_tags_cache()
+
+def get_pipeline_tags(context):
+    """
+    Get the tags cache the tags stage left, or tags.json as it is when the stage was skipped.
+    """
+    with context['lock']:
+        if context['tags'] is None:
+            context['tags'] = read_tags_cache() or {'complete': False, 'tags': [], 'dates': {}}
+        return context['tags']
+
+def run_analytics_stage(context):
+    update_duration_sketches(get_pipeline_tags(context))
+
+def run_stats_stage(context):
+    log_stats(get_pipeline_aggregate(context))
+
+def run_history_stage(context):
+    record_version_history(get_pipeline_aggregate(context))
+
+def run_reports_stage(context):
+    render_reports(get_pipeline_aggregate(context))
+
+def run_releases_stage(context):
+    return review_release_info(get_pipeline_aggregate(context), context['defer_commit_counts'], get_pipeline_tags(context)['tags'])
+
+# what the reports are rendered from
+REPORT_INPUTS = ['revision:issues', 'revision:fixed_in', 'revision:found_in']
+
+# the stages of a run. A stage runs after the stages in `after` and is skipped when its `inputs` and `outputs` are the
+# same as after its last run. Stages with `inputs` None fetch from GitHub and only run with --no-cache, `remote` stages
+# always run with --no-cache as they read GitHub as well.
+PIPELINE_STAGES = [
+    {'name': 'fetch', 'after': [], 'run': run_fetch_stage, 'inputs': None, 'outputs': ['revision:issues']},
+    {'name': 'fixed-in', 'after': ['fetch'], 'run': run_fixed_in_stage, 'inputs': None, 'outputs': ['revision:fixed_in']},
+    {'name': 'extract', 'after': ['fetch'], 'run': run_extract_stage, 'inputs': ['revision:issues'], 'outputs': ['revision:found_in']},
+    {'name': 'sync', 'after': ['fixed-in', 'extract'], 'run': run_sync_stage, 'inputs': None, 'outputs': []},
+    {'name': 'snapshot', 'after': ['fixed-in', 'extract'], 'run': run_snapshot_stage, 'inputs': REPORT_INPUTS, 'outputs': [f'file:{ISSUE_SNAPSHOT}']},
+    {'name': 'organize', 'after': ['snapshot'], 'run': get_pipeline_aggregate, 'inputs': REPORT_INPUTS, 'outputs': []},
+    {'name': 'tags', 'after': [], 'run': run_tags_stage, 'remote': True, 'inputs': ['file:tags.json'], 'outputs': ['file:tags.json']},
+    {'name': 'analytics', 'after': ['fixed-in', 'extract', 'tags'], 'run': run_analytics_stage, 'remote': True, 'inputs': REPORT_INPUTS + [
+        'file:tags.json',
+    ], 'outputs': ['revision:durations']},
+    {'name': 'stats', 'after': ['organize', 'analytics'], 'run': run_stats_stage, 'inputs': REPORT_INPUTS + ['revision:durations'], 'outputs': [
+        'file:stats.txt', 'file:reports/stats_by_version.csv', 'file:reports/stats_by_major_minor_version.csv',
+    ]},
+    {'name': 'history', 'after': ['organize'], 'run': run_history_stage, 'inputs': REPORT_INPUTS, 'outputs': [
+        f'file:{VERSION_HISTORY_FILE}',
+    ]},
+    {'name': 'reports', 'after': ['organize'], 'run': run_reports_stage, 'inputs': REPORT_INPUTS, 'outputs': [
+        f'file:reports/{view["filename"]}' for view in REPORT_VIEWS
+    ]},
+    {'name': 'releases', 'after': ['organize', 'tags', 'analytics'], 'run': run_releases_stage, 'remote': True, 'inputs': REPORT_INPUTS + [
+        'file:tags.json', 'file:commit_counts.json', 'option:--git-mirror',
+    ], 'outputs': ['file:reports/release_stats.csv', 'file:reports/major_minor_release_stats.csv']},
+]
+
+def get_pipeline_values(specs):
+    """
+    Get the current value of stage inputs or outputs: `revision:NAME` is a revision of the issue store,
+    `file:PATH` the hash of a file and `option:NAME` a command line option.
+    """
+    values = {}
+    with closing(open_issue_store()) as store:
+        for spec in specs:
+            kind, name = spec.split(':', 1)
+            if kind == 'revision':
+                row = store.execute('SELECT value FROM sync_state WHERE key = ?', (spec,)).fetchone()
+                values[spec] = row['value'] if row else None
+            elif kind == 'file':
+                if os.path.exists(name):
+                    with open(name, 'rb') as file:
+                        values[spec] = hashlib.sha1(file.read()).hexdigest()
+                else:
+                    values[spec] = None
+            else:
+                values[spec] = get_cli_option(name)
+    return values
+
+def get_code_hash():
+    with open(__file__, 'rb') as file:
+        return hashlib.sha1(file.read()).hexdigest()
+
+def get_stage_inputs(stage):
+    inputs = get_pipeline_values(stage['inputs'] or [])
+    # a change of main.py counts as a changed input of every stage
+    inputs['code'] = get_code_hash()
+    return inputs
+
+def get_stage_record(store, name):
+    row = store.execute('SELECT value FROM sync_state WHERE key = ?', (f'stage:{name}',)).fetchone()
+    return json.loads(row['value']) if row else None
+
+def run_pipeline_stage(stage, context, selected=False, forced=False):
+    """
+    Run one stage of the pipeline unless it is up to date, and record its inputs and outputs.
+    A `selected` stage was asked for by name, it runs even if it needs --no-cache otherwise.
+    """
+    fetching = '--no-cache' in sys.argv
+    if stage['inputs'] is None and not (fetching or selected or forced):
+        return
+
+    with closing(open_issue_store()) as store:
+        record = get_stage_record(store, stage['name'])
+    if stage['inputs'] is not None and not forced and not (stage.get('remote') and fetching):
+        if record and record['complete'] and record['inputs'] == get_stage_inputs(stage) and record['outputs'] == get_pipeline_values(stage['outputs']):
+            print(f'Skipping {stage["name"]}: unchanged since the last run')
+            return
+    if record is None or record['inputs'].get('code') != get_code_hash():
+        # what the stage made of the issues that didn't change could be out of date as well
+        with context['lock']:
+            context['full_pass'].add(stage['name'])
+
+    with run_stage(stage['name']):
+        complete = stage['run'](context) is not False
+
+    # record the inputs the outputs were made from, the stage itself can change some of them (e.g. caches)
+    record = {
+        'inputs': get_stage_inputs(stage),
+        'outputs': get_pipeline_values(stage['outputs']),
+        'complete': complete,
+        'finished_at': datetime.now(timezone.utc).isoformat(),
+    }
+    with closing(open_issue_store()) as store:
+        with store:
+            store.execute('INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)', (f'stage:{stage["name"]}', json.dumps(record)))
+
+def run_pipeline(context, stage_names=None, forced=False):
+    """
+    Run the stages of the pipeline in dependency order, stages that don't depend on each other run in parallel.
+    With `stage_names` only those stages run, on what earlier runs left in the issue store.
+    `forced` runs the stages even when they are unchanged.
+    """
+    stages = [stage for stage in PIPELINE_STAGES if stage_names is None or stage['name'] in stage_names]
+    names = {stage['name'] for stage in stages}
+    done = set()
+    pending = {}
+    with ThreadPoolExecutor(max_workers=len(stages)) as executor:
+        while len(done) < len(stages):
+            for stage in stages:
+                if stage['name'] in done or stage['name'] in pending.values():
+                    continue
+                if all(name in done or name not in names for name in stage['after']):
+                    future = executor.submit(run_pipeline_stage, stage, context, stage_names is not None, forced)
+                    pending[future] = stage['name']
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = pending.pop(future)
+                # a failed stage stops the run, the stages that depend on it can't run
+                future.result()
+                done.add(name)
+
+def run_repository_pipeline(stage_names=None, forced=False, metrics_name='metrics'):
+    """
+    Run the pipeline for GITHUB_OWNER/GITHUB_REPOSITORY in the current directory.
+    Returns the context the stages shared.
+    """
+    fetch_issues = '--no-cache' in sys.argv or (stage_names is not None and 'fetch' in stage_names)
+    last_sync = get_last_sync() if fetch_issues and '--incremental' in sys.argv else None
+    context = {'lock': threading.Lock(), 'changed_urls': None, 'aggregate': None, 'tags': None, 'full_pass': set()}
+    # find out up front whether the rate limit covers the whole run, the commit counts can wait for the next one
+    context['defer_commit_counts'] = plan_rate_budget(estimate_run_cost(fetch_issues, last_sync is not None))
+    try:
+        run_pipeline(context, stage_names, forced)
+
+        if '--export-json' in sys.argv:
+            with run_stage('export_json_files'):
+                export_json_files()
+    finally:
+        # a failed run is the one worth looking at
+        write_run_metrics(get_cli_option('--metrics-dir', '.'), metrics_name)
+    return context
+
+def read_repositories_config(path):
+    """
+    Read the list of repositories of --repos=FILE, a JSON list of {"owner", "name"} objects. Each repository is
+    processed in its own `directory` (default repos/OWNER/NAME) and can have its own `git_mirror` for commit counts,
+    `tag_prefix` of its release tags, and `found_in_pattern` and `found_in_heading_pattern` of its issue template.
+    """
+    with open(path, 'r') as file:
+        repositories = json.load(file)
+    for repository in repositories:
+        repository['directory'] = os.path.abspath(repository.get('directory', os.path.join('repos', repository['owner'], repository['name'])))
+        if repository.get('git_mirror'):
+            repository['git_mirror'] = os.path.abspath(repository['git_mirror'])
+    return repositories
+
+# options whose value is a path, see get_repository_argv
+PATH_OPTIONS = ('--metrics-dir', '--record', '--replay')
+
+def get_repository_argv(argv, repository):
+    """
+    Get the command line of a repository of --repos=FILE. Its pipeline runs in the directory of the repository, so
+    relative paths are made absolute first, and every repository records to and replays from its own subdirectory.
+    """
+    repository_argv = []
+    for index, arg in enumerate(argv):
+        option, separator, path = arg.partition('=')
+        inline = option in PATH_OPTIONS and separator
+        if not inline:
+            if index == 0 or argv[index - 1] not in PATH_OPTIONS:
+                repository_argv.append(arg)
+                continue
+            # `--option PATH`
+            option, path = argv[index - 1], arg
+        path = os.path.abspath(path)
+        if option in ('--record', '--replay'):
+            # the initial state of one repository's run would overwrite another's
+            path = os.path.join(path, repository['owner'], repository['name'])
+        repository_argv.append(f'{option}={path}' if inline else path)
+    return repository_argv
+
+def run_repository(repository, argv, stage_names, forced, rate_budget, rate_budget_lock):
+    """
+    Run the pipeline of one repository of --repos=FILE in its directory, in a worker process.
+    The rate limit budget is shared with the other repositories, they all use the same token.
+    Returns the totals of the repository for the rollup.
+    """
+    global GITHUB_OWNER, GITHUB_REPOSITORY, TAG_PREFIX, FOUND_IN_PATTERN, FOUND_IN_HEADING_PATTERN, _rate_budget, _rate_budget_lock
+    GITHUB_OWNER, GITHUB_REPOSITORY = repository['owner'], repository['name']
+    TAG_PREFIX = repository.get('tag_prefix', DEFAULT_TAG_PREFIX)
+    FOUND_IN_PATTERN, FOUND_IN_HEADING_PATTERN = compile_found_in_patterns(
+        repository.get('found_in_pattern', DEFAULT_FOUND_IN_PATTERN), repository.get('found_in_heading_pattern', DEFAULT_FOUND_IN_HEADING_PATTERN)
+    )
+    _rate_budget, _rate_budget_lock = rate_budget, rate_budget_lock
+    sys.argv = get_repository_argv(argv, repository) + ([f'--git-mirror={repository["git_mirror"]}'] if repository.get('git_mirror') else [])
+
+    os.makedirs(os.path.join(repository['directory'], 'reports'), exist_ok=True)
+    os.chdir(repository['directory'])
+    context = run_repository_pipeline(stage_names, forced, f'metrics-{GITHUB_OWNER}-{GITHUB_REPOSITORY}')
+    return get_pipeline_aggregate(context)['totals']
+
+def write_rollup(repositories, totals_by_repository):
+    """
+    Write the totals of every repository to reports/rollup.csv and reports/rollup.md, linking the report of each.
+    """
+    os.makedirs('reports', exist_ok=True)
+    with open_report_file('reports/rollup.csv') as csv_file:
+        csv_file.write('Repository, Total, Open, Closed, With Version, Open With Version\n')
+        for repository in repositories:
+            name = f'{repository["owner"]}/{repository["name"]}'
+            if name in totals_by_repository:
+                totals = totals_by_repository[name]
+                csv_file.write(f'{name}, {totals["scanned"]}, {totals["open"]}, {totals["closed"]}, {totals["with_version"]}, {totals["open_with_version"]}\n')
+
+    with open_report_file('reports/rollup.md') as report_file:
+        report_file.write('# Bug Report Rollup\n')
+        report_file.write(f'## Date: {datetime.now().strftime("%Y-%m-%d")}\n')
+        report_file.write('| Repository | Total | Open | Closed | With Version | Open with Version |\n')
+        report_file.write('| --- | --- | --- | --- | --- | --- |\n')
+        for repository in repositories:
+            name = f'{repository["owner"]}/{repository["name"]}'
+            report = os.path.relpath(os.path.join(repository['directory'], 'reports', 'all_report.md'), 'reports')
+            if name not in totals_by_repository:
+                report_file.write(f'| [{name}]({report}) | failed | | | | |\n')
+                continue
+            totals = totals_by_repository[name]
+            report_file.write(f'| [{name}]({report}) | {totals["scanned"]} | {totals["open"]} | {totals["closed"]} | {totals["with_version"]} | {totals["open_with_version"]} |\n')
+
+def run_repositories(repositories, stage_names=None, forced=False):
+    """
+    Run the pipelines of several repositories at the same time, one worker process each (at most --repo-workers=N),
+    then write the rollup. Returns False if the pipeline of any repository failed.
+    """
+    # a --git-mirror of the command line can only be one of the repositories, they set their own
+    argv = [arg for arg in sys.argv if not arg.startswith('--git-mirror')]
+    workers = int(get_cli_option('--repo-workers', len(repositories)))
+    start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+    totals_by_repository = {}
+    failed = []
+    with multiprocessing.Manager() as manager:
+        rate_budget, rate_budget_lock = manager.dict(), manager.Lock()
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(start_method)) as executor:
+            futures = [
+                (repository, executor.submit(run_repository, repository, argv, stage_names, forced, rate_budget, rate_budget_lock))
+                for repository in repositories
+            ]
+            for repository, future in futures:
+                name = f'{repository["owner"]}/{repository["name"]}'
+                try:
+                    totals_by_repository[name] = future.result()
+                except Exception as e:
+                    print(f'Error: the pipeline of {name} failed: {e}')
+                    failed.append(name)
+
+    write_rollup(repositories, totals_by_repository)
+    return not failed
+
 if __name__ == '__main__':
-    if len(sys.argv) > 1 and sys.argv[1] == '--no-cache':
-        issues = fetch_github_issues(0, 20, None)
-        update_issues_json_with_new_issues(issues)
-        print_issues_to_file(find_fixed_in_version(), 'with_fixed')
-    find_grafana_version()
-    organize_issues_by_version()
-    log_stats()
-    create_report_md(False, True, "open_report.md")
-    create_report_md(True, False, "closed_report.md")
-    create_report_md(True, True, "all_report.md")
-
-    review_release_info()
-    
+    if len(sys.argv) > 2 and sys.argv[1] == 'history':
+        # weekly counts of a version or a major.minor version: python main.py history 12.0
+        version = sys.argv[2]
+        if version != 'No Version' and len(version.split('.')) == 2:
+            history = get_version_history(major_minor=version)
+        else:
+            history = get_version_history(version)
+        print('Week, Open, Closed')
+        for week in history:
+            print(f'{week["week"]}, {week["open"]}, {week["closed"]}')
+        sys.exit(0)
+
+    if len(sys.argv) > 2 and sys.argv[1] == 'query':
+        # search the issues: python main.py query "no data" panel --major-minor=12.0 --state=open
+        options = ('--found-in', '--major-minor', '--state', '--limit')
+        args = sys.argv[2:]
+        text = ' '.join(arg for index, arg in enumerate(args) if not arg.startswith('--') and (index == 0 or args[index - 1] not in options))
+        start = time.perf_counter()
+        results = search_issues(text, get_cli_option('--found-in'), get_cli_option('--major-minor'), get_cli_option('--state'),
+                                int(get_cli_option('--limit', 20)), '--rank' in sys.argv)
+        elapsed = time.perf_counter() - start
+        for issue in results:
+            versions = f'found in {issue["found_in"] or "unknown"}'
+            if issue['fixed_in'] != None:
+                versions += f', fixed in {issue["fixed_in"]}'
+            print(f'- [{issue["title"]}]({issue["url"]}) ({issue["state"]}, {versions})')
+        print(f'{len(results)} issues in {elapsed * 1000:.1f}ms')
+        sys.exit(0)
+
+    stage_names = None
+    forced = '--force' in sys.argv
+    if len(sys.argv) > 1 and sys.argv[1] in ('run', 'force'):
+        # run (or force) single stages: python main.py run extract reports [--options]
+        stage_names = []
+        for arg in sys.argv[2:]:
+            if arg.startswith('--'):
+                break
+            stage_names.append(arg)
+        known = [stage['name'] for stage in PIPELINE_STAGES]
+        if not stage_names or any(name not in known for name in stage_names):
+            print(f'Usage: python main.py {sys.argv[1]} STAGE... [options], stages: {", ".join(known)}')
+            sys.exit(1)
+        forced = forced or sys.argv[1] == 'force'
+
+    if get_cli_option('--repos'):
+        # one pipeline per repository of the config file, running at the same time
+        if not run_repositories(read_repositories_config(get_cli_option('--repos')), stage_names, forced):
+            sys.exit(1)
+    else:
+        run_repository_pipeline(stage_names, forced)
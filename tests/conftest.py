@@ -0,0 +1,26 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    # main.py reads and writes its files relative to the working directory and reads its options from sys.argv
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(sys, 'argv', ['main.py'])
+    return tmp_path
+
+
+@pytest.fixture
+def add_issues():
+    import main
+
+    def add_issues(*issues):
+        # fill in the fields the GraphQL query returns, the number comes from the url
+        main.update_issues_json_with_new_issues([[
+            {'title': 'Bug', 'body': '', 'state': 'OPEN', 'updatedAt': '2024-01-01T00:00:00Z', **issue} for issue in issues
+        ]])
+    return add_issues
@@ -0,0 +1,50 @@
+from contextlib import closing
+
+import main
+
+
+def issue(number, title, body, state='OPEN'):
+    return {'url': f'https://github.com/grafana/grafana/issues/{number}', 'title': title, 'body': body, 'state': state}
+
+
+def test_build_issue_aggregate(add_issues):
+    add_issues(
+        issue(1, 'b panel', 'Grafana: 10.1.0', 'CLOSED'),
+        issue(2, 'a panel', 'Grafana: 10.1.0'),
+        issue(3, 'alerting', 'Grafana: 10.1.2'),
+        issue(4, 'graph', 'Grafana: 9.5.0', 'CLOSED'),
+        issue(5, 'no version', 'it broke'),
+        issue(6, 'latest', 'Grafana: latest'),
+    )
+    main.find_grafana_version(workers=1)
+    aggregate = main.build_issue_aggregate()
+
+    assert aggregate['sorted_versions'] == ['10.1.2', '10.1.0', '9.5.0', 'No Version']
+    assert [issue['title'] for issue in aggregate['issues_by_version']['10.1.0']] == ['a panel', 'b panel']
+    # an issue with a version line but no exact version is only counted in the totals
+    assert sum(len(issues) for issues in aggregate['issues_by_version'].values()) == 5
+    assert aggregate['versions']['10.1.0'] == {'OPEN': 1, 'CLOSED': 1, 'total': 2}
+    assert aggregate['major_minor_versions'] == {
+        '10.1': {'OPEN': 2, 'CLOSED': 1, 'total': 3},
+        '9.5': {'OPEN': 0, 'CLOSED': 1, 'total': 1},
+        'No Version': {'OPEN': 1, 'CLOSED': 0, 'total': 1},
+    }
+    assert aggregate['totals'] == {
+        'scanned': 6, 'open': 4, 'closed': 2, 'with_version': 4, 'open_with_version': 2, 'with_version_line': 1,
+    }
+
+
+def test_aggregate_matches_the_store(add_issues):
+    add_issues(*(issue(number, f'issue {number % 7}', f'Grafana: {number % 3}.{number % 4}.0', 'OPEN' if number % 2 else 'CLOSED') for number in range(1, 50)))
+    main.find_grafana_version(workers=1)
+    aggregate = main.build_issue_aggregate()
+
+    with closing(main.open_issue_store()) as store:
+        counts = {
+            (row['found_in'], row['state']): row['count']
+            for row in store.execute('SELECT found_in, state, COUNT(*) AS count FROM issues GROUP BY found_in, state')
+        }
+    for version, version_counts in aggregate['versions'].items():
+        assert version_counts['OPEN'] == counts.get((version, 'OPEN'), 0)
+        assert version_counts['CLOSED'] == counts.get((version, 'CLOSED'), 0)
+    assert aggregate['totals']['scanned'] == sum(counts.values())
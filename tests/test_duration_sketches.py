@@ -0,0 +1,111 @@
+import json
+import math
+import random
+from contextlib import closing
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import main
+
+
+def make_sketch(durations):
+    sketch = {}
+    for seconds in durations:
+        bucket = main.get_sketch_bucket(seconds)
+        sketch[bucket] = sketch.get(bucket, 0) + 1
+    return sketch
+
+
+def test_bucket_relative_accuracy():
+    rng = random.Random(0)
+    for _ in range(10000):
+        seconds = main.SKETCH_MIN_SECONDS * math.exp(rng.uniform(0, 15))
+        estimate = main.get_bucket_seconds(main.get_sketch_bucket(seconds))
+        assert abs(estimate - seconds) <= main.SKETCH_RELATIVE_ACCURACY * seconds * (1 + 1e-9)
+
+
+@pytest.mark.parametrize('quantile', [0, 0.1, 0.5, 0.9, 0.99, 1])
+def test_quantile_error_bound(quantile):
+    rng = random.Random(1)
+    durations = [main.SKETCH_MIN_SECONDS + rng.expovariate(1 / 86400) * rng.choice([1, 10, 100]) for _ in range(5000)]
+    exact = sorted(durations)[int(quantile * (len(durations) - 1))]
+    estimate = main.get_sketch_quantile(make_sketch(durations), quantile)
+    assert abs(estimate - exact) <= main.SKETCH_RELATIVE_ACCURACY * exact * (1 + 1e-9)
+
+
+def test_merged_sketch_is_the_sketch_of_all_durations():
+    rng = random.Random(2)
+    parts = [[rng.uniform(60, 1e7) for _ in range(rng.randint(0, 300))] for _ in range(5)]
+    assert main.merge_sketches(make_sketch(part) for part in parts) == make_sketch([seconds for part in parts for seconds in part])
+    assert main.get_sketch_quantile({}, 0.5) is None
+
+
+def github_date(value):
+    return value.isoformat().replace('+00:00', 'Z')
+
+
+def read_sketches():
+    with closing(main.open_issue_store()) as store:
+        return sorted(tuple(row) for row in store.execute('SELECT metric, version, bucket, count FROM duration_sketches'))
+
+
+def test_incremental_update_matches_a_rebuild(add_issues):
+    rng = random.Random(3)
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    versions = [f'11.{minor}.{patch}' for minor in range(4) for patch in range(3)]
+    dates = {f'v{version}': github_date(start + timedelta(days=7 * index)) for index, version in enumerate(versions)}
+    with open('tags.json', 'w') as file:
+        json.dump({'complete': True, 'tags': list(reversed(dates)), 'dates': dates}, file)
+
+    issues = []
+    for number in range(1, 400):
+        created = start + timedelta(days=rng.uniform(0, 100))
+        closed = rng.random() < 0.6
+        issues.append({
+            'url': f'https://github.com/grafana/grafana/issues/{number}',
+            'body': f'- Grafana: {rng.choice(versions)}' if rng.random() < 0.8 else '',
+            'state': 'CLOSED' if closed else 'OPEN',
+            'createdAt': github_date(created),
+            'closedAt': github_date(created + timedelta(hours=rng.expovariate(1 / 200))) if closed else None,
+        })
+    add_issues(*issues)
+    main.find_grafana_version(workers=1)
+    with closing(main.open_issue_store()) as store:
+        with store:
+            store.execute("UPDATE issues SET fixed_in = '11.3.2' WHERE state = 'CLOSED' AND number % 2 = 0")
+    assert main.update_duration_sketches() > 0
+
+    # reopen, close, move and delete some issues, only those are updated in the sketches
+    with closing(main.open_issue_store()) as store:
+        with store:
+            store.execute("UPDATE issues SET state = 'OPEN', closedAt = NULL WHERE number % 7 = 0 AND state = 'CLOSED'")
+            store.execute("UPDATE issues SET state = 'CLOSED', closedAt = '2024-06-01T00:00:00Z' WHERE number % 11 = 0 AND state = 'OPEN'")
+            store.execute("UPDATE issues SET found_in = '11.1.1' WHERE number % 13 = 0")
+            store.execute('DELETE FROM issues WHERE number % 17 = 0')
+    assert main.update_duration_sketches() > 0
+    assert main.update_duration_sketches() == 0
+    incremental = read_sketches()
+
+    with closing(main.open_issue_store()) as store:
+        with store:
+            store.execute('DELETE FROM duration_sketches')
+            store.execute('DELETE FROM issue_durations')
+    main.update_duration_sketches()
+    assert incremental == read_sketches()
+
+
+def test_release_dates_come_from_the_tags_passed_in(add_issues, monkeypatch):
+    def fetch():
+        raise AssertionError('the tags are fetched by the tags stage')
+    monkeypatch.setattr(main, 'fetch_a_list_of_tags_from_github', fetch)
+    add_issues({'url': 'https://github.com/grafana/grafana/issues/1', 'body': '- Grafana: 11.0.0', 'state': 'CLOSED',
+                'createdAt': '2024-01-02T00:00:00Z', 'closedAt': '2024-01-20T00:00:00Z'})
+    main.find_grafana_version(workers=1)
+    with closing(main.open_issue_store()) as store:
+        with store:
+            store.execute("UPDATE issues SET fixed_in = '11.0.1'")
+
+    tags = {'complete': True, 'tags': ['v11.0.1', 'v11.0.0'], 'dates': {'v11.0.1': '2024-01-15T00:00:00Z', 'v11.0.0': '2024-01-01T00:00:00Z'}}
+    assert main.update_duration_sketches(tags) == 1
+    assert [bucket for metric, _, bucket, _ in read_sketches() if metric == 'fix'] == [main.get_sketch_bucket(14 * 86400)]
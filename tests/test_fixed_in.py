@@ -0,0 +1,100 @@
+import pytest
+import requests
+
+import main
+
+
+class FakeResponse:
+    def __init__(self, payload):
+        self.payload = payload
+        self.headers = {'X-RateLimit-Remaining': '4999', 'X-RateLimit-Limit': '5000'}
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.payload
+
+
+@pytest.fixture
+def graphql(monkeypatch):
+    responses = []
+    monkeypatch.setattr(main, 'github_request', lambda *args, **kwargs: FakeResponse(responses.pop(0)))
+    return responses
+
+
+@pytest.mark.parametrize('lookup', [main.get_linked_issue, main.get_milestone])
+def test_errors_without_data_raise_request_exception(graphql, lookup):
+    graphql.append({'errors': [{'type': 'RATE_LIMITED', 'message': 'API rate limit exceeded'}]})
+    with pytest.raises(requests.exceptions.RequestException):
+        lookup('https://github.com/grafana/grafana/issues/1')
+
+
+def test_get_linked_milestone(graphql):
+    graphql.append({'data': {'repository': {'issue': {'timelineItems': {'nodes': [
+        {'subject': {'url': 'https://github.com/grafana/grafana/pull/2'}},
+    ]}}}}})
+    graphql.append({'data': {'repository': {'pullRequest': {'milestone': {'title': '10.1.0'}}}}})
+    assert main.get_linked_milestone('https://github.com/grafana/grafana/issues/1') == ('https://github.com/grafana/grafana/pull/2', '10.1.0')
+
+
+def test_get_linked_milestone_without_link(graphql):
+    graphql.append({'data': {'repository': {'issue': {'timelineItems': {'nodes': []}}}}})
+    assert main.get_linked_milestone('https://github.com/grafana/grafana/issues/1') == (None, None)
+
+
+ISSUE = 'https://github.com/grafana/grafana/issues/%d'
+PULL = 'https://github.com/grafana/grafana/pull/%d'
+
+
+def batch_payload(issues):
+    return {'data': {
+        'rateLimit': {'cost': 1, 'remaining': 4999, 'resetAt': '2024-01-01T01:00:00Z'},
+        'repository': issues,
+    }}
+
+
+def connected(number, milestone):
+    return {'__typename': 'ConnectedEvent', 'subject': {'url': PULL % number, 'milestone': milestone and {'title': milestone}}}
+
+
+def closed(number, milestone):
+    return {'__typename': 'ClosedEvent', 'closer': {'url': PULL % number, 'milestone': milestone and {'title': milestone}}}
+
+
+def test_batch_prefers_connected_event_over_closer(graphql):
+    graphql.append(batch_payload({'issue_1': {'timelineItems': {'nodes': [
+        closed(10, '10.0.0'), connected(11, '10.1.0'), connected(12, '10.2.0'),
+    ]}}}))
+    assert main.get_fixed_in_versions_batch([ISSUE % 1]) == ({ISSUE % 1: (PULL % 11, '10.1.0')}, 1, 1)
+
+
+def test_batch_falls_back_to_last_closer(graphql):
+    graphql.append(batch_payload({'issue_1': {'timelineItems': {'nodes': [
+        {'__typename': 'ConnectedEvent', 'subject': None}, closed(10, '10.0.0'), {'__typename': 'ClosedEvent', 'closer': None}, closed(11, None),
+    ]}}}))
+    assert main.get_fixed_in_versions_batch([ISSUE % 1]) == ({ISSUE % 1: (PULL % 11, None)}, 1, 0)
+
+
+def test_batch_null_and_unlinked_issues(graphql):
+    graphql.append(batch_payload({'issue_1': None, 'issue_2': {'timelineItems': {'nodes': []}}}))
+    assert main.get_fixed_in_versions_batch([ISSUE % 1, ISSUE % 2]) == ({ISSUE % 1: (None, None), ISSUE % 2: (None, None)}, 1, 0)
+
+
+def test_batch_without_repository_is_unresolved(graphql):
+    graphql.append({'data': {'repository': None}, 'errors': [{'type': 'NOT_FOUND'}]})
+    assert main.get_fixed_in_versions_batch([ISSUE % 1]) == ({}, 0, 0)
+
+
+def test_savings_only_count_connected_links(graphql, monkeypatch):
+    monkeypatch.setattr(main, 'update_rate_budget', lambda *args: None)
+    graphql.append(batch_payload({
+        'issue_1': {'timelineItems': {'nodes': [connected(11, '10.1.0')]}},
+        'issue_2': {'timelineItems': {'nodes': [closed(12, '10.1.0')]}},
+        'issue_3': None,
+    }))
+    totals = {'issues': 0, 'requests': 0, 'points': 0, 'linked': 0}
+    links = main.find_fixed_in_versions_batched([ISSUE % 1, ISSUE % 2, ISSUE % 3], batch_size=3, concurrency=1, totals=totals)
+    assert links[ISSUE % 2] == (PULL % 12, '10.1.0')
+    # the per-issue path would have found the connected PR of issue 1 only
+    assert totals == {'issues': 3, 'requests': 1, 'points': 1, 'linked': 1}
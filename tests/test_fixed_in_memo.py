@@ -0,0 +1,102 @@
+import time
+from contextlib import closing
+
+import pytest
+
+import main
+
+ISSUE = 'https://github.com/grafana/grafana/issues/1'
+OTHER_ISSUE = 'https://github.com/grafana/grafana/issues/2'
+PULL = 'https://github.com/grafana/grafana/pull/3'
+
+
+def test_memo_survives_reopening_the_store(add_issues):
+    add_issues({'url': ISSUE, 'state': 'CLOSED'}, {'url': OTHER_ISSUE, 'state': 'CLOSED'})
+    with closing(main.open_issue_store()) as store:
+        main.write_fixed_in_memo(store, {ISSUE: (PULL, '11.0.0'), OTHER_ISSUE: (None, None)})
+    with closing(main.open_issue_store()) as store:
+        assert main.read_fixed_in_memo(store, [ISSUE, OTHER_ISSUE]) == {ISSUE: (PULL, '11.0.0'), OTHER_ISSUE: (None, None)}
+
+
+def test_memo_is_kept_until_the_issue_is_closed_again(add_issues):
+    add_issues({'url': ISSUE, 'state': 'CLOSED', 'closedAt': '2024-01-01T00:00:00Z'})
+    with closing(main.open_issue_store()) as store:
+        main.write_fixed_in_memo(store, {ISSUE: (PULL, '11.0.0')})
+
+    # a comment or a label updates the issue, but doesn't change what closed it
+    add_issues({'url': ISSUE, 'state': 'CLOSED', 'closedAt': '2024-01-01T00:00:00Z', 'updatedAt': '2024-02-01T00:00:00Z'})
+    with closing(main.open_issue_store()) as store:
+        assert main.read_fixed_in_memo(store, [ISSUE]) == {ISSUE: (PULL, '11.0.0')}
+
+    add_issues({'url': ISSUE, 'state': 'CLOSED', 'closedAt': '2024-03-01T00:00:00Z', 'updatedAt': '2024-03-01T00:00:00Z'})
+    with closing(main.open_issue_store()) as store:
+        assert main.read_fixed_in_memo(store, [ISSUE]) == {}
+
+
+def test_memo_ttls(add_issues, monkeypatch):
+    add_issues({'url': ISSUE, 'state': 'CLOSED'}, {'url': OTHER_ISSUE, 'state': 'CLOSED'})
+    with closing(main.open_issue_store()) as store:
+        main.write_fixed_in_memo(store, {ISSUE: (PULL, '11.0.0'), OTHER_ISSUE: (None, None)})
+        now = time.time()
+
+        # past the negative TTL only the lookup that found no linked PR expires
+        monkeypatch.setattr(time, 'time', lambda: now + (main.MEMO_NEGATIVE_TTL_DAYS + 1) * 86400)
+        assert main.read_fixed_in_memo(store, [ISSUE, OTHER_ISSUE]) == {ISSUE: (PULL, '11.0.0')}
+        main.evict_fixed_in_memo(store)
+        assert [row['url'] for row in store.execute('SELECT url FROM linked_issues')] == [ISSUE]
+
+        monkeypatch.setattr(time, 'time', lambda: now + (main.MEMO_TTL_DAYS + 1) * 86400)
+        assert main.read_fixed_in_memo(store, [ISSUE]) == {}
+        main.evict_fixed_in_memo(store)
+        assert store.execute('SELECT COUNT(*) FROM linked_issues').fetchone()[0] == 0
+        assert store.execute('SELECT COUNT(*) FROM milestones').fetchone()[0] == 0
+
+
+@pytest.fixture
+def lookups(monkeypatch):
+    # every issue is linked to the same PR, record which issues were looked up
+    looked_up = []
+
+    def resolve_fixed_in_chunk(issue_urls, concurrency, batch_size, totals):
+        looked_up.append(sorted(issue_urls))
+        return {url: (PULL, '11.0.0') for url in issue_urls}
+    monkeypatch.setattr(main, 'resolve_fixed_in_chunk', resolve_fixed_in_chunk)
+    return looked_up
+
+
+def get_fixed_in():
+    with closing(main.open_issue_store()) as store:
+        return {row['url']: row['fixed_in'] for row in store.execute("SELECT url, fixed_in FROM issues WHERE state = 'CLOSED'")}
+
+
+def test_incremental_run_uses_the_memo(add_issues, lookups, capsys):
+    closed = {'state': 'CLOSED', 'closedAt': '2024-01-01T00:00:00Z'}
+    add_issues({'url': ISSUE, **closed}, {'url': OTHER_ISSUE, **closed})
+    main.find_fixed_in_version(changed_urls=None)
+    assert lookups == [[ISSUE, OTHER_ISSUE]]
+
+    # an incremental run after a comment on one of the issues
+    add_issues({'url': ISSUE, **closed, 'updatedAt': '2024-02-01T00:00:00Z'})
+    capsys.readouterr()
+    main.find_fixed_in_version(changed_urls={ISSUE})
+    assert 'Fixed-in: 1 issues resolved from the memo, 0 to look up' in capsys.readouterr().out
+    assert lookups == [[ISSUE, OTHER_ISSUE]]
+    assert get_fixed_in() == {ISSUE: '11.0.0', OTHER_ISSUE: '11.0.0'}
+
+
+def test_incremental_run_looks_up_expired_entries(add_issues, lookups, monkeypatch):
+    closed = {'state': 'CLOSED', 'closedAt': '2024-01-01T00:00:00Z'}
+    add_issues({'url': ISSUE, **closed})
+    main.find_fixed_in_version(changed_urls=None)
+    add_issues({'url': OTHER_ISSUE, **closed})
+    main.find_fixed_in_version(changed_urls={OTHER_ISSUE})
+    assert lookups == [[ISSUE], [OTHER_ISSUE]]
+
+    # neither issue changed, but the memo entries expired and nothing else would look them up again
+    now = time.time()
+    monkeypatch.setattr(time, 'time', lambda: now + (main.MEMO_TTL_DAYS + 1) * 86400)
+    main.find_fixed_in_version(changed_urls=set())
+    assert lookups == [[ISSUE], [OTHER_ISSUE], [ISSUE, OTHER_ISSUE]]
+    # and once they are memoized again they are not
+    main.find_fixed_in_version(changed_urls=set())
+    assert len(lookups) == 3
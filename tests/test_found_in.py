@@ -0,0 +1,83 @@
+import random
+import re
+from contextlib import closing
+
+import pytest
+
+import benchmark
+import main
+
+
+def extract_found_in_per_line(body):
+    # the per-line extraction main.py used before the precompiled patterns
+    found_in = None
+    found_in_line = None
+    for line in body.split('\n'):
+        if 'Grafana:' in line or 'Grafana Version:' in line or 'Grafana version:' in line:
+            version_match = re.search(r'\d+\.\d+\.\d+', line)
+            if version_match:
+                found_in = version_match.group()
+            else:
+                found_in_line = line
+            break  # no need to go through the rest of the lines
+    return found_in, found_in_line
+
+
+@pytest.mark.parametrize('body', [
+    'Some text\n- Grafana: 11.4.2\n- OS: Linux',
+    '- Grafana Version: v11.4.2\n',
+    '**Grafana version:** 11.4.2+security-01\n',
+    'Grafana version: 10.0.0-security-01',
+    '- Grafana: latest\n',
+    '- Grafana: latest\r\n- OS: Linux 5.15.0\r\n',
+    '- Grafana: 11.4.2\r\n',
+    'it broke in 1.2.3\n- Grafana: 10.1.0\n- Grafana: 9.0.0\n',
+    'no version here',
+    '',
+    '### Grafana version\n\n11.1.0\n\n- Grafana: 9.0.0',
+    '### Grafana version\n\nlatest\n\n- Grafana: cloud',
+])
+def test_same_as_per_line(body):
+    assert main.extract_found_in(body) == extract_found_in_per_line(body)
+
+
+@pytest.mark.parametrize('body, expected', [
+    ('### Grafana version\n\n11.1.0\n\n### Operating system\n\nLinux', ('11.1.0', None)),
+    ('### Grafana version\r\n\r\nv11.1.0\r\n\r\n', ('11.1.0', None)),
+    ('## Grafana Version\n11.1.0+security-01\n', ('11.1.0', None)),
+    ('### Grafana version\n\nthe one from last week\n\n', (None, 'the one from last week')),
+    ('### Grafana version\n\n_No response_\n\n### Browser\n\nChrome', (None, None)),
+    ('### Grafana version\n\n### Browser\n\nChrome 120.0.0', (None, None)),
+    ('### Grafana version\n\n', (None, None)),
+])
+def test_issue_form_heading(body, expected):
+    # the per-line extraction did not see the heading of the issue form at all
+    assert extract_found_in_per_line(body) == (None, None)
+    assert main.extract_found_in(body) == expected
+
+
+def test_synthetic_bodies():
+    rng = random.Random(0)
+    for index in range(2000):
+        body = benchmark.make_issue_body(rng, index)
+        if '### Grafana version' in body:
+            continue
+        assert main.extract_found_in(body) == extract_found_in_per_line(body)
+
+
+def test_find_grafana_version_only_reads_changed_issues(add_issues):
+    urls = ['https://github.com/grafana/grafana/issues/%d' % number for number in range(1, 1202)]
+    add_issues(*({'url': url, 'body': '- Grafana: 11.0.0'} for url in urls))
+    changed = set(urls[::2]) | {'https://github.com/grafana/grafana/issues/999999'}
+    main.find_grafana_version(changed, workers=1)
+    with closing(main.open_issue_store()) as store:
+        found_in = {row['url'] for row in store.execute("SELECT url FROM issues WHERE found_in = '11.0.0'")}
+    assert found_in == set(urls[::2])
+
+
+def test_patterns_of_another_repository():
+    patterns = main.compile_found_in_patterns('Mimir:|Mimir [Vv]ersion:', 'Mimir [Vv]ersion')
+    assert main.extract_found_in('- Mimir version: 2.10.0\n- Grafana: 11.0.0', patterns) == ('2.10.0', None)
+    assert main.extract_found_in('### Mimir version\n\nmimir-2.9.1\n', patterns) == ('2.9.1', None)
+    assert main.extract_found_in('- Grafana: 11.0.0', patterns) == (None, None)
+    assert main.extract_found_in_chunk([('url', '- Mimir: 2.10.0')], patterns) == [('2.10.0', None, 'url')]
@@ -0,0 +1,52 @@
+import subprocess
+import sys
+
+import pytest
+
+import main
+
+
+def git(repository, *args):
+    subprocess.run(['git', '-C', str(repository), '-c', 'user.name=test', '-c', 'user.email=test@example.com', *args], check=True, capture_output=True)
+
+
+@pytest.fixture
+def repository(tmp_path, monkeypatch):
+    # v1.0.0 -> 3 commits -> v1.0.1, and v1.1.0 on a branch from v1.0.0 with 2 commits
+    repository = tmp_path / 'grafana.git'
+    repository.mkdir()
+    git(repository, 'init', '--quiet', '--initial-branch=main')
+    git(repository, 'commit', '--quiet', '--allow-empty', '-m', 'initial')
+    git(repository, 'tag', 'v1.0.0')
+    for number in range(3):
+        git(repository, 'commit', '--quiet', '--allow-empty', '-m', f'fix {number}')
+    git(repository, 'tag', 'v1.0.1')
+    git(repository, 'checkout', '--quiet', '-b', 'release-1.1', 'v1.0.0')
+    for number in range(2):
+        git(repository, 'commit', '--quiet', '--allow-empty', '-m', f'feature {number}')
+    git(repository, 'tag', 'v1.1.0')
+
+    monkeypatch.delenv('GH_TOKEN', raising=False)
+    monkeypatch.setattr(sys, 'argv', ['main.py', f'--git-mirror={repository}'])
+    return repository
+
+
+def test_commits_between_releases(repository):
+    assert main.get_number_of_commits_between_two_releases('v1.0.1', 'v1.0.0') == 3
+    assert main.get_number_of_commits_between_two_releases('v1.1.0', 'v1.0.0') == 2
+    assert main.get_number_of_commits_between_two_releases('v1.1.0', 'v1.0.1') == 2
+    assert main.get_number_of_commits_between_two_releases('v1.0.0', None) == 0
+
+
+def test_missing_tag_returns_none(repository):
+    # without the tag in the mirror the compare API is asked, which can't be reached without a token
+    assert main.get_number_of_commits_between_two_releases('v1.2.0', 'v1.1.0') is None
+
+
+def test_commit_counts_from_git(repository):
+    release_pairs = [('v1.0.1', 'v1.0.0'), ('v1.1.0', 'v1.0.0'), ('v1.2.0', 'v1.1.0')]
+    assert main.get_commit_counts_from_git(str(repository), release_pairs, concurrency=2) == {
+        ('v1.0.1', 'v1.0.0'): 3,
+        ('v1.1.0', 'v1.0.0'): 2,
+        ('v1.2.0', 'v1.1.0'): None,
+    }
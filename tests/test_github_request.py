@@ -0,0 +1,137 @@
+import json
+import sys
+import threading
+import time
+
+import pytest
+import requests
+
+import main
+
+URL = 'https://api.github.com/repos/grafana/grafana/compare/v1.0.0...v1.0.1'
+GRAPHQL_URL = 'https://api.github.com/graphql'
+
+
+class StubAdapter(requests.adapters.BaseAdapter):
+    """
+    Answers requests with queued (status, headers, payload) responses, or raises a queued exception.
+    """
+    def __init__(self, responses):
+        super().__init__()
+        self.responses = responses
+        self.sent = 0
+
+    def send(self, request, **kwargs):
+        self.sent += 1
+        answer = self.responses.pop(0)
+        if isinstance(answer, Exception):
+            raise answer
+        status, headers, payload = answer
+        response = requests.Response()
+        response.status_code = status
+        response.headers = requests.structures.CaseInsensitiveDict(headers)
+        response._content = json.dumps(payload).encode('utf-8')
+        response.url = request.url
+        response.request = request
+        response.reason = 'Stub'
+        return response
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # a clock that only moves when the code sleeps
+    now = [1000000.0]
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        now[0] += seconds
+    monkeypatch.setattr(time, 'time', lambda: now[0])
+    monkeypatch.setattr(time, 'sleep', sleep)
+    monkeypatch.setattr(main, '_rate_budget', {})
+    return sleeps
+
+
+@pytest.fixture
+def github(monkeypatch):
+    adapter = StubAdapter([])
+    session = requests.Session()
+    session.mount('https://', adapter)
+    monkeypatch.setattr(main, '_github_session', session)
+    return adapter
+
+
+def test_retry_after(clock, github):
+    github.responses += [(403, {'Retry-After': '7'}, {}), (200, {}, {'ok': True})]
+    response = main.github_request('test', 'GET', URL)
+    assert response.status_code == 200
+    assert clock == [7.0]
+
+
+def test_primary_rate_limit_waits_for_the_reset(clock, github):
+    reset = int(time.time()) + 30
+    github.responses += [(403, {'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': str(reset)}, {}), (200, {}, {})]
+    assert main.github_request('test', 'GET', URL).status_code == 200
+    assert clock == [31.0]
+
+
+def test_graphql_rate_limit_is_retried(clock, github, monkeypatch):
+    monkeypatch.setattr(main.random, 'uniform', lambda low, high: high)
+    github.responses += [(200, {}, {'errors': [{'type': 'RATE_LIMITED'}]}), (200, {}, {'data': {}})]
+    assert main.github_request('test', 'POST', GRAPHQL_URL, json={}).json() == {'data': {}}
+    assert clock == [main.RETRY_BASE_DELAY]
+
+
+def test_server_errors_back_off_with_jitter(clock, github, monkeypatch):
+    bounds = []
+
+    def uniform(low, high):
+        bounds.append((low, high))
+        return high / 2
+    monkeypatch.setattr(main.random, 'uniform', uniform)
+    monkeypatch.setattr(main, 'RETRY_MAX_DELAY', 3)
+    github.responses += [(502, {}, {}), (503, {}, {}), (500, {}, {}), (200, {}, {})]
+    assert main.github_request('test', 'GET', URL).status_code == 200
+    # full jitter below an exponential bound, capped at the maximum delay
+    assert bounds == [(0, 1), (0, 2), (0, 3)]
+    assert clock == [0.5, 1.0, 1.5]
+
+
+def test_gives_up_after_max_retries(clock, github, monkeypatch):
+    monkeypatch.setattr(sys, 'argv', ['main.py', '--max-retries=2'])
+    github.responses += [(502, {}, {})] * 3
+    assert main.github_request('test', 'GET', URL).status_code == 502
+    assert github.sent == 3
+
+    github.responses += [requests.exceptions.ConnectionError('reset')] * 3
+    with pytest.raises(requests.exceptions.ConnectionError):
+        main.github_request('test', 'GET', URL)
+    assert github.sent == 6
+
+
+def test_client_errors_are_not_retried(clock, github):
+    github.responses += [(404, {}, {})]
+    assert main.github_request('test', 'GET', URL).status_code == 404
+    assert clock == []
+
+
+def test_budget_is_kept_while_waiting(monkeypatch):
+    # real threads and a real clock: the budget is spent until shortly after the reset, which is waited for
+    # with a second to spare, no worker may send a request before then
+    monkeypatch.setattr(main, '_rate_budget', {'rest': {'remaining': main.RATE_LIMIT_RESERVE, 'reset': time.time() - 0.5}})
+    start = time.time()
+    finished = []
+
+    def worker():
+        main.wait_for_rate_budget('rest')
+        finished.append(time.time() - start)
+    threads = [threading.Thread(target=worker) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(finished) == 3 and min(finished) >= 0.4
+    assert main._rate_budget['rest']['remaining'] == main.RATE_LIMIT_RESERVE - 3
@@ -0,0 +1,107 @@
+import os
+import shutil
+from contextlib import closing
+
+import main
+
+
+def aggregate(**versions):
+    return {'versions': {
+        version.lstrip('v').replace('_', '.'): {'OPEN': open_count, 'CLOSED': closed_count, 'total': open_count + closed_count}
+        for version, (open_count, closed_count) in versions.items()
+    }}
+
+
+def remove_store():
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(main.ISSUE_STORE + suffix):
+            os.remove(main.ISSUE_STORE + suffix)
+
+
+def test_weekly_history():
+    assert main.record_version_history(aggregate(v11_0_0=(3, 1), v11_0_1=(1, 0)), week='2024-01-01') == 2
+    # unchanged versions store nothing
+    assert main.record_version_history(aggregate(v11_0_0=(3, 1), v11_0_1=(2, 0)), week='2024-01-08') == 1
+    # a version without issues any more drops to zero
+    assert main.record_version_history(aggregate(v11_0_0=(2, 3)), week='2024-01-15') == 2
+
+    assert main.get_version_history('11.0.0') == [
+        {'week': '2024-01-01', 'open': 3, 'closed': 1},
+        {'week': '2024-01-15', 'open': 2, 'closed': 3},
+    ]
+    assert main.get_version_history('11.0.1') == [
+        {'week': '2024-01-01', 'open': 1, 'closed': 0},
+        {'week': '2024-01-08', 'open': 2, 'closed': 0},
+        {'week': '2024-01-15', 'open': 0, 'closed': 0},
+    ]
+    assert main.get_version_history(major_minor='11.0') == [
+        {'week': '2024-01-01', 'open': 4, 'closed': 1},
+        {'week': '2024-01-08', 'open': 5, 'closed': 1},
+        {'week': '2024-01-15', 'open': 2, 'closed': 3},
+    ]
+
+
+def test_second_run_in_a_week_updates_it():
+    main.record_version_history(aggregate(v11_0_0=(3, 1)), week='2024-01-01')
+    main.record_version_history(aggregate(v11_0_0=(4, 1)), week='2024-01-08')
+    main.record_version_history(aggregate(v11_0_0=(5, 2)), week='2024-01-08')
+    assert main.get_version_history('11.0.0')[-1] == {'week': '2024-01-08', 'open': 5, 'closed': 2}
+
+    # undoing the change of the week leaves no row for it
+    main.record_version_history(aggregate(v11_0_0=(3, 1)), week='2024-01-08')
+    assert main.get_version_history('11.0.0') == [{'week': '2024-01-01', 'open': 3, 'closed': 1}]
+
+
+def test_older_week_is_not_recorded():
+    main.record_version_history(aggregate(v11_0_0=(3, 1)), week='2024-01-08')
+    assert main.record_version_history(aggregate(v11_0_0=(1, 1)), week='2024-01-01') == 0
+    assert main.get_version_history('11.0.0') == [{'week': '2024-01-08', 'open': 3, 'closed': 1}]
+
+
+def test_history_is_rebuilt_from_the_file():
+    main.record_version_history(aggregate(v11_0_0=(3, 1), v11_0_1=(1, 0)), week='2024-01-01')
+    main.record_version_history(aggregate(v11_0_0=(4, 1), v11_0_1=(1, 0)), week='2024-01-08')
+    with open(main.VERSION_HISTORY_FILE) as file:
+        assert file.read() == (
+            'Week, Version, Open Delta, Closed Delta\n'
+            '2024-01-01, 11.0.0, 3, 1\n'
+            '2024-01-01, 11.0.1, 1, 0\n'
+            '2024-01-08, 11.0.0, 1, 0\n'
+        )
+
+    # a run without the store of the last run, e.g. after the cache was evicted, keeps the history
+    remove_store()
+    assert main.record_version_history(aggregate(v11_0_0=(4, 2), v11_0_1=(1, 0)), week='2024-01-15') == 1
+    assert main.get_version_history('11.0.0') == [
+        {'week': '2024-01-01', 'open': 3, 'closed': 1},
+        {'week': '2024-01-08', 'open': 4, 'closed': 1},
+        {'week': '2024-01-15', 'open': 4, 'closed': 2},
+    ]
+    assert main.get_version_history('11.0.1') == [{'week': '2024-01-01', 'open': 1, 'closed': 0}]
+
+
+def test_older_store_gets_the_rows_appended_since():
+    main.record_version_history(aggregate(v11_0_0=(3, 1)), week='2024-01-01')
+    shutil.copy(main.ISSUE_STORE, 'older.db')
+    main.record_version_history(aggregate(v11_0_0=(4, 1)), week='2024-01-08')
+
+    # the cache restored the store of the week before
+    remove_store()
+    shutil.copy('older.db', main.ISSUE_STORE)
+    assert main.record_version_history(aggregate(v11_0_0=(4, 1)), week='2024-01-15') == 0
+    assert main.get_version_history('11.0.0') == [
+        {'week': '2024-01-01', 'open': 3, 'closed': 1},
+        {'week': '2024-01-08', 'open': 4, 'closed': 1},
+    ]
+
+
+def test_history_of_the_store_is_written_to_a_new_file():
+    main.record_version_history(aggregate(v11_0_0=(3, 1)), week='2024-01-01')
+    os.remove(main.VERSION_HISTORY_FILE)
+    with closing(main.open_issue_store()) as store:
+        with store:
+            store.execute("DELETE FROM sync_state WHERE key = 'history:rows'")
+
+    main.record_version_history(aggregate(v11_0_0=(3, 2)), week='2024-01-08')
+    with open(main.VERSION_HISTORY_FILE) as file:
+        assert file.read().splitlines()[1:] == ['2024-01-01, 11.0.0, 3, 1', '2024-01-08, 11.0.0, 0, 1']
@@ -0,0 +1,54 @@
+from contextlib import closing
+
+import main
+
+ISSUE = 'https://github.com/grafana/grafana/issues/%d'
+
+
+def issue(number, updated_at='2024-01-01T00:00:00Z', **fields):
+    return {'url': ISSUE % number, 'title': 'Bug', 'body': '', 'state': 'OPEN', 'updatedAt': updated_at, **fields}
+
+
+def merge(*pages):
+    counts = {'inserted': 0, 'updated': 0, 'unchanged': 0}
+    changed = []
+    with closing(main.open_issue_store()) as store:
+        for page in pages:
+            changed += main.merge_issue_page(store, page, counts)
+    return changed, counts
+
+
+def read_issue(number):
+    with closing(main.open_issue_store()) as store:
+        return dict(store.execute('SELECT title, state, updatedAt FROM issues WHERE number = ?', (number,)).fetchone())
+
+
+def test_counts():
+    assert merge([issue(1), issue(2)]) == ([ISSUE % 1, ISSUE % 2], {'inserted': 2, 'updated': 0, 'unchanged': 0})
+    changed, counts = merge([issue(1), issue(2, '2024-02-01T00:00:00Z', state='CLOSED'), issue(3)])
+    assert changed == [ISSUE % 2, ISSUE % 3]
+    assert counts == {'inserted': 1, 'updated': 1, 'unchanged': 1}
+
+
+def test_older_issue_does_not_overwrite_newer():
+    merge([issue(1, '2024-02-01T00:00:00Z', title='New title')])
+    assert merge([issue(1, '2024-01-01T00:00:00Z', title='Old title')]) == ([], {'inserted': 0, 'updated': 0, 'unchanged': 1})
+    assert read_issue(1) == {'title': 'New title', 'state': 'OPEN', 'updatedAt': '2024-02-01T00:00:00Z'}
+
+
+def test_duplicates_within_a_page_keep_the_newest():
+    # pages can overlap while issues are updated during the fetch, in either order
+    changed, counts = merge([
+        issue(1, '2024-02-01T00:00:00Z', state='CLOSED'), issue(1, '2024-01-01T00:00:00Z'),
+        issue(2, '2024-01-01T00:00:00Z'), issue(2, '2024-02-01T00:00:00Z', title='Renamed'),
+    ])
+    assert changed == [ISSUE % 1, ISSUE % 2]
+    assert counts == {'inserted': 2, 'updated': 0, 'unchanged': 0}
+    assert read_issue(1) == {'title': 'Bug', 'state': 'CLOSED', 'updatedAt': '2024-02-01T00:00:00Z'}
+    assert read_issue(2) == {'title': 'Renamed', 'state': 'OPEN', 'updatedAt': '2024-02-01T00:00:00Z'}
+
+
+def test_update_issues_json_with_new_issues_returns_changed_urls(capsys):
+    assert main.update_issues_json_with_new_issues([[issue(1)], [issue(2)]]) == {ISSUE % 1, ISSUE % 2}
+    assert main.update_issues_json_with_new_issues([[issue(1)], [issue(2, '2024-02-01T00:00:00Z')]]) == {ISSUE % 2}
+    assert 'Merged issues: 0 inserted, 1 updated, 1 unchanged' in capsys.readouterr().out
@@ -0,0 +1,59 @@
+import json
+import time
+
+import pytest
+
+import main
+
+
+@pytest.fixture
+def run_metrics(monkeypatch):
+    metrics = {
+        'stages': {'fetch': 1.25},
+        'api_calls': {'fetch_github_issues_page': {'graphql': 3}},
+        'errors': {'get_fixed_in_versions_batch': 1},
+        'retries': {'fetch_github_issues_page': 2},
+        'rate_limit_points': 4,
+        'rate_limit_remaining': {'graphql': 4990},
+        'issues_processed': {'find_grafana_version': 120},
+    }
+    monkeypatch.setattr(main, '_run_metrics', metrics)
+    monkeypatch.setattr(main, 'GITHUB_OWNER', 'grafana')
+    monkeypatch.setattr(main, 'GITHUB_REPOSITORY', 'gra"fana')
+    monkeypatch.setattr(time, 'time', lambda: 1700000000.5)
+    return metrics
+
+
+def test_json_summary(run_metrics, workdir):
+    main.write_run_metrics(str(workdir), 'metrics-test')
+    with open(workdir / 'metrics-test.json') as file:
+        summary = json.load(file)
+    assert summary.pop('repository') == 'grafana/gra"fana'
+    assert summary.pop('finished_at')
+    assert summary == run_metrics
+
+
+def test_prometheus_textfile(run_metrics, workdir):
+    main.write_run_metrics(str(workdir), 'metrics-test')
+    with open(workdir / 'metrics-test.prom') as file:
+        lines = file.read().splitlines()
+    assert not (workdir / 'metrics-test.prom.tmp').exists()
+
+    prefix = main.METRICS_PREFIX
+    repository = 'repository="grafana/gra\\"fana"'
+    samples = [line for line in lines if not line.startswith('#')]
+    assert samples == [
+        f'{prefix}_stage_duration_seconds{{{repository},stage="fetch"}} 1.25',
+        f'{prefix}_api_calls{{{repository},function="fetch_github_issues_page",api="graphql"}} 3',
+        f'{prefix}_api_errors{{{repository},function="get_fixed_in_versions_batch"}} 1',
+        f'{prefix}_api_retries{{{repository},function="fetch_github_issues_page"}} 2',
+        f'{prefix}_rate_limit_points{{{repository}}} 4',
+        f'{prefix}_rate_limit_remaining{{{repository},api="graphql"}} 4990',
+        f'{prefix}_issues_processed{{{repository},stage="find_grafana_version"}} 120',
+        f'{prefix}_last_run_timestamp_seconds{{{repository}}} 1700000000',
+    ]
+    # every metric has its HELP and TYPE lines
+    for metric in ['stage_duration_seconds', 'api_calls', 'api_errors', 'api_retries', 'rate_limit_points',
+                   'rate_limit_remaining', 'issues_processed', 'last_run_timestamp_seconds']:
+        assert f'# TYPE {prefix}_{metric} gauge' in lines
+        assert any(line.startswith(f'# HELP {prefix}_{metric} ') for line in lines)
@@ -0,0 +1,133 @@
+import json
+import os
+import sys
+import threading
+from contextlib import closing
+
+import pytest
+
+import main
+
+ISSUE = 'https://github.com/grafana/grafana/issues/1'
+NEW_ISSUE = 'https://github.com/grafana/grafana/issues/2'
+
+
+def new_context():
+    return {'lock': threading.Lock(), 'changed_urls': None, 'aggregate': None, 'tags': None, 'full_pass': set(), 'defer_commit_counts': False}
+
+
+def get_found_in(url):
+    with closing(main.open_issue_store()) as store:
+        return store.execute('SELECT found_in FROM issues WHERE url = ?', (url,)).fetchone()['found_in']
+
+
+def record_stages(*names):
+    # as if the stages last ran with the current code
+    with closing(main.open_issue_store()) as store:
+        with store:
+            for name in names:
+                record = {'inputs': {'code': main.get_code_hash()}, 'outputs': {}, 'complete': True, 'finished_at': None}
+                store.execute('INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)', (f'stage:{name}', json.dumps(record)))
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    # count the runs of the stage functions and what they were asked to go through, and still run them
+    calls = {'extract': [], 'reports': []}
+    find_grafana_version, render_reports = main.find_grafana_version, main.render_reports
+
+    def extract(changed_urls=None):
+        calls['extract'].append(changed_urls)
+        find_grafana_version(changed_urls, workers=1)
+
+    def reports(aggregate=None):
+        calls['reports'].append(True)
+        render_reports(aggregate)
+    monkeypatch.setattr(main, 'find_grafana_version', extract)
+    monkeypatch.setattr(main, 'render_reports', reports)
+    return calls
+
+
+@pytest.fixture
+def incremental(add_issues, monkeypatch):
+    # an earlier run left one issue and its high-water mark, GitHub now returns an issue updated since then
+    add_issues({'url': ISSUE})
+    main.save_last_sync()
+    record_stages('fixed-in', 'extract')
+    monkeypatch.setattr(sys, 'argv', ['main.py', '--no-cache', '--incremental'])
+    page = [{'url': NEW_ISSUE, 'title': 'Bug', 'body': '- Grafana: 11.0.0', 'state': 'OPEN', 'updatedAt': '2024-02-01T00:00:00Z'}]
+    monkeypatch.setattr(main, 'fetch_github_issues', lambda pages, since=None: iter([page]))
+    fixed_in_runs = []
+    monkeypatch.setattr(main, 'find_fixed_in_version', lambda changed_urls=None: fixed_in_runs.append(changed_urls))
+    return fixed_in_runs
+
+
+@pytest.fixture
+def offline(add_issues):
+    # a store with issues and the caches the remote stages read, so a run without --no-cache stays offline
+    add_issues({'url': ISSUE, 'body': '- Grafana: 11.0.0'})
+    with open('tags.json', 'w') as file:
+        json.dump({'complete': True, 'tags': [], 'dates': {}}, file)
+    os.makedirs('reports')
+
+
+def test_failed_run_is_processed_again(incremental, calls, monkeypatch):
+    def fail(changed_urls=None):
+        raise RuntimeError('extract failed')
+    with monkeypatch.context() as patch:
+        patch.setattr(main, 'find_grafana_version', fail)
+        with pytest.raises(RuntimeError):
+            main.run_pipeline(new_context(), ['fetch', 'fixed-in', 'extract', 'sync'])
+    # the fixed-in stage finished but the mark stays until extract did as well
+    assert main.get_last_sync() == '2024-01-01T00:00:00Z'
+
+    # the rerun merges the same page again, the issue is unchanged but still waits to be processed
+    main.run_pipeline(new_context(), ['fetch', 'fixed-in', 'extract', 'sync'])
+    assert incremental[-1] == calls['extract'][-1] == {ISSUE, NEW_ISSUE}
+    assert get_found_in(NEW_ISSUE) == '11.0.0'
+    assert main.get_last_sync() == '2024-02-01T00:00:00Z'
+
+
+def test_unchanged_stages_are_skipped(offline, calls):
+    main.run_pipeline(new_context())
+    assert calls == {'extract': [None], 'reports': [True]}
+
+    main.run_pipeline(new_context())
+    assert calls == {'extract': [None], 'reports': [True]}
+
+
+def test_changed_input_reruns_the_stage_and_what_depends_on_it(offline, calls, add_issues):
+    main.run_pipeline(new_context())
+    add_issues({'url': NEW_ISSUE, 'body': '- Grafana: 11.0.1'})
+
+    main.run_pipeline(new_context())
+    assert len(calls['extract']) == 2
+    # the new found_in version is a new input of the reports
+    assert calls['reports'] == [True, True]
+    with open('reports/all_report.md') as file:
+        assert '11.0.1' in file.read()
+
+
+def test_deleted_output_reruns_the_stage(offline, calls):
+    main.run_pipeline(new_context())
+    os.remove('reports/all_report.md')
+
+    main.run_pipeline(new_context())
+    assert len(calls['extract']) == 1
+    assert calls['reports'] == [True, True]
+    assert os.path.exists('reports/all_report.md')
+
+
+def test_changed_code_reruns_over_every_issue(incremental, calls, monkeypatch):
+    main.run_pipeline(new_context(), ['fetch', 'fixed-in', 'extract', 'sync'])
+    assert incremental[-1] == calls['extract'][-1] == {ISSUE, NEW_ISSUE}
+
+    # an incremental run after a change of the code goes through the issues that didn't change as well
+    monkeypatch.setattr(main, 'get_code_hash', lambda: 'changed')
+    main.run_pipeline(new_context(), ['fetch', 'fixed-in', 'extract', 'sync'])
+    assert incremental[-1] is None and calls['extract'][-1] is None
+
+    # and only the changed ones again once it did, extract is skipped as no issue changed
+    main.run_pipeline(new_context(), ['fetch', 'fixed-in', 'extract', 'sync'])
+    assert incremental[-1] == {NEW_ISSUE}
+    assert len(calls['extract']) == 2
@@ -0,0 +1,26 @@
+import time
+
+import main
+
+
+def test_no_budget_lookup_without_cost(monkeypatch):
+    calls = []
+    monkeypatch.setenv('GH_TOKEN', 'token')
+    monkeypatch.setattr(main, 'fetch_rate_budget', lambda: calls.append(True))
+
+    assert main.estimate_run_cost(False) == {'graphql': 0, 'rest': 0}
+    assert main.plan_rate_budget({'graphql': 0, 'rest': 0}) is False
+    assert calls == []
+
+
+def test_commit_counts_deferred_when_rest_budget_is_short(monkeypatch):
+    calls = []
+    monkeypatch.setattr(main, 'fetch_rate_budget', lambda: calls.append(True))
+    monkeypatch.setattr(main, '_rate_budget', {
+        'graphql': {'remaining': 5000, 'reset': time.time() + 3600},
+        'rest': {'remaining': 100, 'reset': time.time() + 3600},
+    })
+
+    assert main.plan_rate_budget({'graphql': 30, 'rest': 200}) is True
+    assert main.plan_rate_budget({'graphql': 30, 'rest': 10}) is False
+    assert len(calls) == 2
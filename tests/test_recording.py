@@ -0,0 +1,88 @@
+import json
+import os
+import re
+import sys
+from contextlib import closing
+
+import requests
+
+import benchmark
+import main
+
+ISSUE = 'https://github.com/grafana/grafana/issues/%d'
+PULL = 'https://github.com/grafana/grafana/pull/3'
+
+
+def github(request):
+    # answer the requests of a run the way GitHub does, enough for the fetch, fixed-in, tags and releases stages
+    body = json.loads(request.body) if request.body else {}
+    query = body.get('query', '')
+    if request.url.endswith('/rate_limit'):
+        payload = {'resources': {'core': {'remaining': 5000, 'reset': 4102444800}, 'graphql': {'remaining': 5000, 'reset': 4102444800}}}
+    elif 'issues(' in query:
+        payload = {'data': {'rateLimit': {'cost': 1}, 'repository': {'issues': {
+            'pageInfo': {'hasNextPage': False, 'endCursor': None},
+            'nodes': [{'url': ISSUE % 2, 'title': 'Bug', 'body': '- Grafana: 11.0.0', 'state': 'CLOSED',
+                       'updatedAt': '2024-02-01T00:00:00Z', 'createdAt': None, 'closedAt': None}],
+        }}}}
+    elif 'timelineItems' in query:
+        payload = {'data': {'rateLimit': {'cost': 1}, 'repository': {
+            f'issue_{number}': {'timelineItems': {'nodes': []}} for number in re.findall(r'issue_(\d+):', query)
+        }}}
+    else:
+        payload = {'data': {'rateLimit': {'cost': 1}, 'repository': {'refs': {'pageInfo': {'hasNextPage': False, 'endCursor': None}, 'nodes': []}}}}
+
+    response = requests.Response()
+    response.status_code = 200
+    response.headers = requests.structures.CaseInsensitiveDict({
+        'X-RateLimit-Remaining': '4999', 'X-RateLimit-Limit': '5000', 'X-RateLimit-Reset': '4102444800',
+    })
+    response._content = json.dumps(payload).encode('utf-8')
+    response.url = request.url
+    response.request = request
+    return response
+
+
+def test_incremental_run_replays_from_its_recording(add_issues, monkeypatch, tmp_path):
+    monkeypatch.setenv('GH_TOKEN', 'token')
+    monkeypatch.setattr(main, '_github_session', None)
+    monkeypatch.setattr(main, '_rate_budget', {})
+    monkeypatch.setattr(requests.adapters.HTTPAdapter, 'send', lambda self, request, **kwargs: github(request))
+
+    # an earlier run left a closed issue, its memoized link and the high-water mark
+    add_issues({'url': ISSUE % 1, 'state': 'CLOSED'})
+    with closing(main.open_issue_store()) as store:
+        main.write_fixed_in_memo(store, {ISSUE % 1: (PULL, '10.0.0')})
+    main.save_last_sync()
+    os.makedirs('reports')
+
+    recording = str(tmp_path / 'recording')
+    monkeypatch.setattr(sys, 'argv', ['main.py', '--no-cache', '--incremental', '--record', recording])
+    main.run_repository_pipeline(['fetch', 'fixed-in', 'extract', 'tags', 'releases'])
+    with open(os.path.join(recording, 'initial-state', 'options.json')) as file:
+        assert json.load(file) == ['--no-cache', '--incremental']
+
+    # every request of the replay has to be in the recording
+    missing = []
+    send = main.ReplayAdapter.send
+
+    def replay(self, request, **kwargs):
+        try:
+            return send(self, request, **kwargs)
+        except requests.exceptions.ConnectionError as e:
+            missing.append(str(e))
+            raise
+    monkeypatch.setattr(main.ReplayAdapter, 'send', replay)
+    monkeypatch.setattr(main, '_github_session', None)
+    monkeypatch.setattr(main, '_rate_budget', {})
+    benchmark.benchmark_replay(recording, 0)
+    assert missing == []
+
+
+def test_repository_paths_are_absolute(tmp_path):
+    repository = {'owner': 'grafana', 'name': 'mimir'}
+    argv = ['main.py', '--no-cache', '--metrics-dir=metrics', '--record', 'recording', '--incremental']
+    assert main.get_repository_argv(argv, repository) == [
+        'main.py', '--no-cache', f'--metrics-dir={tmp_path / "metrics"}', '--record', str(tmp_path / 'recording' / 'grafana' / 'mimir'), '--incremental',
+    ]
+    assert main.get_repository_argv(['main.py', '--replay=/recording'], repository) == ['main.py', '--replay=/recording/grafana/mimir']
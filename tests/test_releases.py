@@ -0,0 +1,39 @@
+import json
+import os
+
+import pytest
+
+import benchmark
+import main
+
+REPO_TAGS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'tags.json')
+
+
+def read_repo_tags():
+    with open(REPO_TAGS) as file:
+        tags = json.load(file)
+    return tags if isinstance(tags, list) else tags['tags']
+
+
+@pytest.mark.parametrize('releases', [
+    read_repo_tags(),
+    sorted(benchmark.make_release_tags(2000), key=main.parse_version_for_sorting, reverse=True),
+])
+def test_find_prior_release_matches_linear_scan(releases):
+    release_index = main.build_release_index(releases)
+    for release in releases:
+        assert main.find_prior_release(release, release_index) == main.get_prior_release(release, releases), release
+
+
+@pytest.mark.parametrize('release, expected', [
+    ('v11.4.2', 'v11.4.1'),
+    ('v11.4.2+security-01', 'v11.4.1'),
+    ('v11.4.0', 'v11.3.2'),
+    ('v12.0.0', 'v11.4.2'),
+    ('v11.2.0', None),
+    ('v10.0.0', None),
+])
+def test_find_prior_release(release, expected):
+    releases = ['v12.0.0', 'v11.4.2', 'v11.4.2+security-01', 'v11.4.1', 'v11.4.0', 'v11.3.2', 'v11.3.1', 'v11.2.0']
+    assert main.find_prior_release(release, main.build_release_index(releases)) == expected
+    assert main.get_prior_release(release, releases) == expected
@@ -0,0 +1,95 @@
+import os
+import shutil
+from contextlib import closing
+
+import pytest
+
+import main
+
+
+@pytest.fixture
+def issue_store(add_issues):
+    add_issues(*(
+        {
+            'url': f'https://github.com/grafana/grafana/issues/{number}',
+            'title': f'Panel {number % 11} ünicode [{number}]',
+            'body': f'- Grafana: {number % 3 + 9}.{number % 4}.{number % 2}' if number % 10 else 'no version',
+            'state': 'CLOSED' if number % 3 == 0 else 'OPEN',
+        }
+        for number in range(1, 200)
+    ))
+    main.find_grafana_version(workers=1)
+    with closing(main.open_issue_store()) as store:
+        with store:
+            store.execute("UPDATE issues SET fixed_in = '11.0.0' WHERE state = 'CLOSED' AND number % 2 = 0")
+    os.makedirs('reports')
+
+
+def render_with_create_report_md(directory):
+    # the reports create_report_md writes on its own, one call per report
+    aggregate = main.build_issue_aggregate()
+    for view in main.REPORT_VIEWS:
+        main.create_report_md(view['showClosed'], view['showOpen'], view['filename'], aggregate)
+    shutil.move('reports', directory)
+    os.makedirs('reports')
+
+
+def read_reports(directory):
+    reports = {}
+    for view in main.REPORT_VIEWS:
+        with open(os.path.join(directory, view['filename']), 'rb') as file:
+            reports[view['filename']] = file.read()
+    return reports
+
+
+def test_render_reports_matches_create_report_md(issue_store):
+    render_with_create_report_md('expected')
+    main.render_reports()
+    assert read_reports('reports') == read_reports('expected')
+
+
+def write(path, text):
+    with open(path, 'wb') as file:
+        file.write(text.encode('utf-8'))
+
+
+@pytest.mark.parametrize('other, same', [
+    ('# Grafana Bug Report\n## Date: 2024-02-08\n## 11.0.0\n- [Bug](url)\n', True),
+    ('# Grafana Bug Report\n## Date: 2024-02-08\n## 11.0.0\n- [Bug](url2)\n', False),
+    ('# Grafana Bug Report\n## Date: 2024-02-01\n## 11.0.1\n- [Bug](url)\n', False),
+    ('# Grafana Bug Report\n## Date: 2024-02-01\n## 11.0.0\n- [Bug](url)\n## Date: 2024-02-08\n', False),
+])
+def test_same_report_content_ignores_only_the_date(other, same):
+    write('report.md', '# Grafana Bug Report\n## Date: 2024-02-01\n## 11.0.0\n- [Bug](url)\n')
+    write('other.md', other)
+    assert main.same_report_content('report.md', 'other.md') == same
+
+
+def test_same_report_content_csv_date():
+    write('stats.csv', 'Date: 2024-02-01\nVersion, Total\n11.0.0, 3\n')
+    write('other.csv', 'Date: 2024-02-08\nVersion, Total\n11.0.0, 3\n')
+    assert main.same_report_content('stats.csv', 'other.csv')
+    write('other.csv', 'Date: 2024-02-08\nVersion, Total\n11.0.0, 4\n')
+    assert not main.same_report_content('stats.csv', 'other.csv')
+
+
+def test_unchanged_report_is_not_rewritten(issue_store):
+    main.render_reports()
+    path = f'reports/{main.REPORT_VIEWS[0]["filename"]}'
+    os.utime(path, (0, 0))
+    main.render_reports()
+    assert os.path.getmtime(path) == 0
+
+
+def test_copied_sections_match_a_fresh_render(issue_store):
+    main.render_reports()
+    with closing(main.open_issue_store()) as store:
+        with store:
+            store.execute("UPDATE issues SET title = 'Renamed', state = 'CLOSED' WHERE number = 7")
+    # the sections of the other versions are copied from the previous reports
+    main.render_reports()
+    shutil.move('reports', 'rendered')
+    os.makedirs('reports')
+    os.remove(main.REPORT_MANIFEST)
+    render_with_create_report_md('expected')
+    assert read_reports('rendered') == read_reports('expected')
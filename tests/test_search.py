@@ -0,0 +1,83 @@
+import re
+
+import pytest
+
+import benchmark
+import main
+
+
+def words(text):
+    return re.findall(r'\w+', text.lower())
+
+
+def contains(haystack, needle):
+    return any(haystack[start:start + len(needle)] == needle for start in range(len(haystack) - len(needle) + 1))
+
+
+def brute_force_search(issues, text, found_in=None, major_minor=None, state=None):
+    # every quoted phrase and every other word has to be in the title or body, newest issues first
+    terms = [words(phrase or token) for phrase, token in re.findall(r'"([^"]*)"|(\S+)', text)]
+    matches = []
+    for issue in issues:
+        if found_in is not None and issue['found_in'] != found_in:
+            continue
+        if state is not None and issue['state'] != state.upper():
+            continue
+        if major_minor is not None and not (issue['found_in'] or '').startswith(f'{major_minor}.'):
+            continue
+        # title and body are separate columns of the index, a phrase can't span them
+        if all(contains(words(issue['title']), term) or contains(words(issue['body']), term) for term in terms if term):
+            matches.append(issue['url'])
+    return sorted(matches, key=main.get_issue_number, reverse=True)
+
+
+@pytest.fixture
+def corpus(add_issues):
+    issues = [issue for page in benchmark.generate_issue_pages(500) for issue in page]
+    add_issues(*issues)
+    main.find_grafana_version(workers=1)
+    for issue in issues:
+        issue['found_in'] = main.extract_found_in(issue['body'])[0]
+    return issues
+
+
+@pytest.mark.parametrize('text, options', [
+    ('panel', {}),
+    ('"panel shows no data"', {}),
+    ('"panel shows no data"', {'state': 'open'}),
+    ('linux crashes', {}),
+    ('linux crashes', {'major_minor': '11.4'}),
+    ('"stuck in pending" alert', {'state': 'closed'}),
+    ('"data shows no panel"', {}),
+    ('nothingmatches', {}),
+])
+def test_search_matches_brute_force(corpus, text, options):
+    expected = brute_force_search(corpus, text, **options)
+    assert expected or text in ('nothingmatches', '"data shows no panel"')
+    assert [issue['url'] for issue in main.search_issues(text, limit=len(corpus), **options)] == expected
+
+
+def test_found_in_filter(corpus):
+    version = next(issue['found_in'] for issue in corpus if issue['found_in'] and 'crashes' in issue['body'])
+    results = main.search_issues('crashes', found_in=version, limit=len(corpus))
+    assert results and all(issue['found_in'] == version for issue in results)
+    assert [issue['url'] for issue in results] == brute_force_search(corpus, 'crashes', found_in=version)
+
+
+def test_limit_and_rank(corpus):
+    newest = main.search_issues('panel', limit=5)
+    assert [issue['url'] for issue in newest] == brute_force_search(corpus, 'panel')[:5]
+    ranked = main.search_issues('"panel shows no data"', limit=len(corpus), rank=True)
+    assert sorted(issue['url'] for issue in ranked) == sorted(brute_force_search(corpus, '"panel shows no data"'))
+
+
+def test_updated_issue_is_reindexed(corpus, add_issues):
+    url = corpus[0]['url']
+    add_issues({**corpus[0], 'title': 'Renamed', 'body': 'uniqueword', 'updatedAt': '2027-01-01T00:00:00Z'})
+    assert [issue['url'] for issue in main.search_issues('uniqueword')] == [url]
+    assert url not in [issue['url'] for issue in main.search_issues('"dashboard fails to load"', limit=len(corpus))]
+
+
+@pytest.mark.parametrize('text', ['', '   ', '"', '""'])
+def test_empty_search(corpus, text):
+    assert main.search_issues(text) == []
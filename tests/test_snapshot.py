@@ -0,0 +1,72 @@
+import os
+from contextlib import closing
+
+import main
+
+
+def fill_store(add_issues, title='Panel crash'):
+    add_issues(
+        {'url': 'https://github.com/grafana/grafana/issues/1', 'title': title, 'body': '- Grafana: 11.0.0'},
+        {'url': 'https://github.com/grafana/grafana/issues/2', 'title': 'Ünicode 🐛 title', 'body': '- Grafana: latest', 'state': 'CLOSED'},
+        {'url': 'https://github.com/grafana/grafana/issues/03', 'title': '', 'body': '', 'state': 'CLOSED'},
+        {'url': 'https://github.com/grafana/loki/issues/4', 'title': 'Other repo', 'body': '- Grafana: 10.4.1'},
+    )
+    main.find_grafana_version(workers=1)
+    with closing(main.open_issue_store()) as store:
+        with store:
+            store.execute("UPDATE issues SET fixed_in = '11.0.1' WHERE number = 3")
+
+
+def read_store_rows():
+    with closing(main.open_issue_store()) as store:
+        return [tuple(row) for row in store.execute(main.AGGREGATE_QUERY)]
+
+
+def test_snapshot_round_trip(add_issues, monkeypatch):
+    fill_store(add_issues)
+    main.write_issue_snapshot()
+    snapshot = main.read_issue_snapshot()
+
+    assert snapshot['count'] == 4
+    assert list(main.get_snapshot_rows(snapshot)) == read_store_rows()
+
+    aggregate = main.build_issue_aggregate(snapshot)
+    main.close_issue_snapshot(snapshot)
+    assert snapshot['mapping'].closed
+    # the same aggregate from the issue store, even though a current snapshot exists
+    monkeypatch.setattr(main, 'read_current_issue_snapshot', lambda: None)
+    assert aggregate == main.build_issue_aggregate()
+
+
+def test_snapshot_is_only_used_while_current(add_issues):
+    fill_store(add_issues)
+    main.write_issue_snapshot()
+    main.close_issue_snapshot(main.read_current_issue_snapshot())
+
+    add_issues({'url': 'https://github.com/grafana/grafana/issues/5', 'title': 'New'})
+    assert main.read_current_issue_snapshot() is None
+    assert main.build_issue_aggregate()['totals']['scanned'] == 5
+
+
+def test_missing_or_foreign_snapshot(add_issues):
+    assert main.read_issue_snapshot() is None
+    with open(main.ISSUE_SNAPSHOT, 'wb') as file:
+        file.write(b'not a snapshot at all')
+    assert main.read_issue_snapshot() is None
+
+
+def test_snapshot_of_a_replaced_store(add_issues):
+    fill_store(add_issues)
+    main.write_issue_snapshot()
+
+    # a new store filled the same way has the same revisions as the one the snapshot was made from
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(main.ISSUE_STORE + suffix):
+            os.remove(main.ISSUE_STORE + suffix)
+    fill_store(add_issues, 'Replaced')
+    snapshot = main.read_issue_snapshot()
+    assert snapshot['revisions'] == main.get_pipeline_values(main.REPORT_INPUTS)
+    main.close_issue_snapshot(snapshot)
+
+    assert main.read_current_issue_snapshot() is None
+    assert 'Replaced' in [issue['title'] for issue in main.build_issue_aggregate()['issues_by_version']['11.0.0']]
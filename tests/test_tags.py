@@ -0,0 +1,115 @@
+import json
+import sys
+
+import pytest
+
+import main
+
+DATES = {'v10.1.0': '2024-02-01T00:00:00Z', 'v10.0.1': '2024-01-15T00:00:00Z', 'v10.0.0': '2024-01-01T00:00:00Z'}
+
+
+@pytest.fixture
+def tag_pages(monkeypatch):
+    requests = []
+
+    def fetch_tags_page(cursor, page_size):
+        requests.append(cursor)
+        return ['v10.1.0', 'v10.0.1', 'v10.0.0'], {'hasNextPage': False, 'endCursor': None}, DATES
+    monkeypatch.setattr(main, 'fetch_tags_page', fetch_tags_page)
+    return requests
+
+
+def test_legacy_list_is_used_offline(tag_pages):
+    with open('tags.json', 'w') as file:
+        json.dump(['v10.0.1', 'v10.0.0'], file)
+
+    assert main.fetch_a_list_of_tags_from_github() == ['v10.0.1', 'v10.0.0']
+    assert tag_pages == []
+    # reading the cache doesn't rewrite it
+    with open('tags.json') as file:
+        assert json.load(file) == ['v10.0.1', 'v10.0.0']
+
+
+def test_legacy_list_fetches_the_full_history_with_no_cache(tag_pages, monkeypatch):
+    with open('tags.json', 'w') as file:
+        json.dump(['v10.0.1', 'v10.0.0'], file)
+    monkeypatch.setattr(sys, 'argv', ['main.py', '--no-cache'])
+
+    assert main.fetch_a_list_of_tags_from_github() == ['v10.1.0', 'v10.0.1', 'v10.0.0']
+    assert tag_pages == [None]
+    with open('tags.json') as file:
+        assert json.load(file) == {'complete': True, 'tags': ['v10.1.0', 'v10.0.1', 'v10.0.0'], 'dates': DATES}
+
+
+def test_cache_without_dates_fetches_the_full_history(tag_pages, monkeypatch):
+    with open('tags.json', 'w') as file:
+        json.dump({'checked_at': None, 'complete': True, 'tags': ['v10.1.0', 'v10.0.1', 'v10.0.0']}, file)
+    monkeypatch.setattr(sys, 'argv', ['main.py', '--no-cache'])
+
+    main.fetch_a_list_of_tags_from_github()
+    assert main.read_tags_cache()['dates'] == DATES
+
+
+def test_migrated_cache_with_empty_dates_is_backfilled(tag_pages, monkeypatch):
+    with open('tags.json', 'w') as file:
+        json.dump({'complete': True, 'tags': ['v10.1.0', 'v10.0.1', 'v10.0.0'], 'dates': {}}, file)
+    assert not main.read_tags_cache()['complete']
+    monkeypatch.setattr(sys, 'argv', ['main.py', '--no-cache'])
+
+    main.fetch_a_list_of_tags_from_github()
+    assert main.read_tags_cache() == {'complete': True, 'tags': ['v10.1.0', 'v10.0.1', 'v10.0.0'], 'dates': DATES}
+    assert main.get_release_dates(main.read_tags_cache()) == {'10.1.0': DATES['v10.1.0'], '10.0.1': DATES['v10.0.1'], '10.0.0': DATES['v10.0.0']}
+
+
+def test_tag_without_a_date_is_not_fetched_again(monkeypatch):
+    monkeypatch.setattr(sys, 'argv', ['main.py', '--no-cache'])
+    requests = []
+
+    def fetch_tags_page(cursor, page_size):
+        requests.append(page_size)
+        return ['v10.0.1', 'v10.0.0'], {'hasNextPage': False, 'endCursor': None}, {'v10.0.1': '2024-01-15T00:00:00Z'}
+    monkeypatch.setattr(main, 'fetch_tags_page', fetch_tags_page)
+    monkeypatch.setattr(main, 'TAGS_RECHECK_SECONDS', 0)
+
+    main.fetch_a_list_of_tags_from_github()
+    main.fetch_a_list_of_tags_from_github()
+    # the full fetch once, then only the newest tags
+    assert requests == [100, 10]
+    assert main.read_tags_cache()['dates'] == {'v10.0.1': '2024-01-15T00:00:00Z', 'v10.0.0': None}
+    assert main.get_release_dates(main.read_tags_cache()) == {'10.0.1': '2024-01-15T00:00:00Z'}
+
+
+def test_recheck_does_not_change_tags_json(tag_pages, monkeypatch):
+    monkeypatch.setattr(sys, 'argv', ['main.py', '--no-cache'])
+    main.fetch_a_list_of_tags_from_github()
+    with open('tags.json') as file:
+        written = file.read()
+
+    # a run a moment later doesn't check again
+    main.fetch_a_list_of_tags_from_github()
+    assert tag_pages == [None]
+
+    # and once it does, the file only changes with the tags
+    monkeypatch.setattr(main, 'TAGS_RECHECK_SECONDS', 0)
+    main.fetch_a_list_of_tags_from_github()
+    assert tag_pages == [None, None]
+    with open('tags.json') as file:
+        assert file.read() == written
+
+
+def test_tag_prefix_of_another_repository(monkeypatch):
+    monkeypatch.setattr(main, 'TAG_PREFIX', 'mimir-')
+    monkeypatch.setattr(sys, 'argv', ['main.py', '--no-cache'])
+    queries = []
+
+    def fetch_tags_page(cursor, page_size):
+        queries.append(main.TAG_PREFIX)
+        return ['mimir-2.10.1', 'mimir-2.10.0', 'helm-chart-5.0.0', 'mimir-2.9.0-rc.1'], {'hasNextPage': False, 'endCursor': None}, {}
+    monkeypatch.setattr(main, 'fetch_tags_page', fetch_tags_page)
+
+    tags = main.fetch_a_list_of_tags_from_github()
+    assert tags == ['mimir-2.10.1', 'mimir-2.10.0', 'mimir-2.9.0-rc.1']
+    assert [main.normalize_version_for_comparison(tag) for tag in tags] == ['2.10.1', '2.10.0', '2.9.0']
+    assert main.find_prior_release('mimir-2.10.1', main.build_release_index(tags)) == 'mimir-2.10.0'
+    # found-in versions and milestones have no prefix
+    assert main.parse_version_for_sorting('2.10.1') == main.parse_version_for_sorting('mimir-2.10.1') == (2, 10, 1)